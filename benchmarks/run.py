@@ -0,0 +1,329 @@
+'''Offline benchmark of both scrapers, stage by stage.
+
+Uses the HTML fixtures in `benchmarks/fixtures/` (or recorded pages with the
+same names from `--fixtures`), scales the SOC table and the GitHub Jobs
+listing by repeating their rows, serves them from a local stand-in server and
+times every stage on its own. Results are printed (or written) as JSON so runs
+can be compared between releases.
+
+    python -m benchmarks.run --scales 1 10 100 --repeat 5 --output bench.json
+'''
+
+import argparse
+import copy
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+import requests
+
+from depauw_courses import codes, main as depauw
+from depauw_courses.schedule import parse_schedule
+from github_jobs import main as github_jobs
+from scrape.parsing import available_backends, parse_html
+
+_FIXTURES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+_SOC_VIEW_FIXTURE = 'soc_view.html'
+_NOTES_FIXTURE = 'notes.html'
+_GITHUB_JOBS_FIXTURE = 'github_jobs.html'
+
+_TABLES_ONLY = SoupStrainer('table')
+
+_SOC_VIEW_PATH = '/e/reg/soc-view/index.asp'
+_NOTES_PATH = '/e/reg/soc-view/notes.asp'
+_GITHUB_JOBS_PATH = '/positions'
+
+_DEFAULT_SCALES = (1, 10, 100)
+_DEFAULT_REPEAT = 5
+
+
+def _read_fixture(directory, name) -> str:
+    with open(os.path.join(directory, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def _scale_soc_view(html, factor) -> str:
+    '''Repeats the course rows of a SOC page `factor` times with fresh SOC numbers and links.'''
+
+    bs = BeautifulSoup(html, 'html.parser')
+    table = bs.find_all('table')[2]
+    list_trs = table.find_all('tr')[2:]
+
+    for copy_number in range(1, factor):
+        for tr in list_trs:
+            clone = copy.copy(tr)
+            td = clone.find('td')
+            if clone.attrs and td is not None and td.text.strip().isdigit():
+                td.string = str(int(td.text.strip()) + copy_number * 1000000)
+            for a in clone.find_all('a', href=True):
+                a['href'] = f"{a['href']}&copy={copy_number}"
+            table.append(clone)
+
+    return str(bs)
+
+
+def _scale_github_jobs(html, factor) -> str:
+    '''Repeats the job rows of a GitHub Jobs listing `factor` times with fresh links.'''
+
+    bs = BeautifulSoup(html, 'html.parser')
+    list_trs = bs.find_all('tr', class_='job')
+
+    for copy_number in range(1, factor):
+        for tr in list_trs:
+            clone = copy.copy(tr)
+            clone.td.h4.a['href'] = f"{clone.td.h4.a['href']}-{copy_number}"
+            list_trs[-1].parent.append(clone)
+
+    return str(bs)
+
+
+class _StandInServer(object):
+    '''Serves fixture pages on localhost in a background thread.'''
+
+    def __init__(self, dict_pages) -> None:
+        dict_bodies = {path: body.encode('utf-8') for path, body in dict_pages.items()}
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = dict_bodies.get(self.path.split('?')[0])
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> '_StandInServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _measure(function, repeat) -> list:
+    list_seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        list_seconds.append(time.perf_counter() - start)
+    return list_seconds
+
+
+def _result(scraper, scale, stage, items, list_seconds, n_bytes=None) -> dict:
+    median = statistics.median(list_seconds)
+    dict_result = {
+        'scraper': scraper,
+        'scale': scale,
+        'stage': stage,
+        'items': items,
+        'seconds': {
+            'min': min(list_seconds),
+            'median': median,
+            'mean': statistics.mean(list_seconds),
+            'max': max(list_seconds)
+        },
+        'items_per_second': items / median if median > 0 else None
+    }
+    if n_bytes is not None:
+        dict_result['bytes'] = n_bytes
+    return dict_result
+
+
+def _bench_depauw(server, soc_html, notes_html, scale, repeat) -> list:
+    session = requests.Session()
+    list_results = []
+
+    soc_url = server.base_url + _SOC_VIEW_PATH
+    list_seconds = _measure(lambda: session.get(soc_url).content, repeat)
+    list_results.append(_result('depauw', scale, 'fetch_soc_view', 1, list_seconds, n_bytes=len(soc_html.encode('utf-8'))))
+
+    list_seconds = _measure(lambda: BeautifulSoup(soc_html, 'html.parser'), repeat)
+    list_results.append(_result('depauw', scale, 'html_parse', 1, list_seconds))
+
+    for backend in available_backends():
+        list_seconds = _measure(lambda: parse_html(soc_html, parse_only=_TABLES_ONLY, backend=backend), repeat)
+        list_results.append(_result('depauw', scale, f'html_parse_targeted[{backend}]', 1, list_seconds))
+
+    list_seconds = _measure(lambda: list(depauw._iter_html_rows(soc_html)), repeat)
+    list_rows = list(depauw._iter_html_rows(soc_html))
+    list_results.append(_result('depauw', scale, 'html_stream_rows', len(list_rows), list_seconds))
+
+    def _extract_rows():
+        return list(depauw._iter_pending_courses(list_rows))
+
+    list_seconds = _measure(_extract_rows, repeat)
+    list_pending = _extract_rows()
+    list_results.append(_result('depauw', scale, 'row_extraction', len(list_rows), list_seconds))
+
+    list_notes_urls = list(dict.fromkeys(server.base_url + _NOTES_PATH + '?' + pending['notes_link'].split('?', 1)[-1]
+                                         for pending in list_pending if pending['notes_link']))
+    list_seconds = _measure(lambda: [session.get(url).content for url in list_notes_urls], repeat)
+    list_results.append(_result('depauw', scale, 'fetch_notes', len(list_notes_urls), list_seconds,
+                                n_bytes=len(notes_html.encode('utf-8')) * len(list_notes_urls)))
+
+    list_seconds = _measure(lambda: [depauw._parse_notes(notes_html) for _ in list_notes_urls], repeat)
+    list_results.append(_result('depauw', scale, 'notes_parse', len(list_notes_urls), list_seconds))
+
+    list_time_days = [pending['contents'][5] for pending in list_pending] \
+        + [pending['lab'][5] for pending in list_pending if pending['lab'] is not None]
+
+    def _organize_schedules():
+        parse_schedule.cache_clear()
+        for str_time_days in list_time_days:
+            depauw._organize_schedules(str_time_days=str_time_days)
+
+    list_seconds = _measure(_organize_schedules, repeat)
+    list_results.append(_result('depauw', scale, 'organize_schedules', len(list_time_days), list_seconds))
+
+    dict_course_notes = depauw._parse_notes(notes_html)
+
+    def _collect_codes():
+        codes.clear_caches()
+        for pending in list_pending:
+            soc_number = pending['contents'][0]
+            depauw._collect_restrictions(list_restrictions=pending['restrictions'],
+                                         soc_number=soc_number,
+                                         dict_notes={soc_number: dict_course_notes},
+                                         dict_restrictions={})
+            depauw._collect_priorities(list_priorities=pending['priorities'], dict_priorities={})
+
+    list_seconds = _measure(_collect_codes, repeat)
+    list_results.append(_result('depauw', scale, 'collect_restrictions_priorities', len(list_pending), list_seconds))
+
+    list_seconds = _measure(lambda: [depauw._build_course(pending, dict_course_notes) for pending in list_pending],
+                            repeat)
+    list_results.append(_result('depauw', scale, 'object_construction', len(list_pending), list_seconds))
+
+    session.close()
+
+    return list_results
+
+
+def _bench_github_jobs(server, jobs_html, scale, repeat) -> list:
+    session = requests.Session()
+    list_results = []
+
+    jobs_url = server.base_url + _GITHUB_JOBS_PATH
+    list_seconds = _measure(lambda: session.get(jobs_url).content, repeat)
+    list_results.append(_result('github_jobs', scale, 'fetch_listing', 1, list_seconds,
+                                n_bytes=len(jobs_html.encode('utf-8'))))
+
+    list_seconds = _measure(lambda: BeautifulSoup(jobs_html, 'html.parser'), repeat)
+    list_results.append(_result('github_jobs', scale, 'html_parse', 1, list_seconds))
+
+    for backend in available_backends():
+        list_seconds = _measure(lambda: parse_html(jobs_html, parse_only=github_jobs._JOB_ROWS_ONLY, backend=backend),
+                                repeat)
+        list_results.append(_result('github_jobs', scale, f'html_parse_targeted[{backend}]', 1, list_seconds))
+
+    list_trs = BeautifulSoup(jobs_html, 'html.parser').find_all('tr', class_='job')
+
+    # Rows are extracted and built one at a time, as `github_jobs.main._iter_job_fields` and `iter_jobs` do
+    list_seconds = _measure(lambda: [github_jobs._JOB_SCHEMA.record(tr) for tr in list_trs], repeat)
+    list_results.append(_result('github_jobs', scale, 'row_extraction', len(list_trs), list_seconds))
+
+    list_fields = list(github_jobs._iter_job_fields(jobs_html))
+    today = date.today()
+
+    def _construct():
+        for dict_fields in list_fields:
+            github_jobs._build_job(dict_fields, today)
+
+    list_seconds = _measure(_construct, repeat)
+    list_results.append(_result('github_jobs', scale, 'object_construction', len(list_fields), list_seconds))
+
+    session.close()
+
+    return list_results
+
+
+def run(fixtures_directory=_FIXTURES_DIRECTORY, scales=_DEFAULT_SCALES, repeat=_DEFAULT_REPEAT) -> dict:
+    '''Runs the benchmark.
+
+    Args:
+        fixtures_directory [str]: Directory with `soc_view.html`, `notes.html` and `github_jobs.html`.
+        scales [iterable]: Row multipliers to run.
+        repeat [int]: Timed runs per stage.
+
+    Returns:
+        dict_report [dict]: Environment and per-stage results.
+    '''
+
+    soc_html = _read_fixture(fixtures_directory, _SOC_VIEW_FIXTURE)
+    notes_html = _read_fixture(fixtures_directory, _NOTES_FIXTURE)
+    jobs_html = _read_fixture(fixtures_directory, _GITHUB_JOBS_FIXTURE)
+
+    list_results = []
+    for scale in scales:
+        scaled_soc_html = _scale_soc_view(soc_html, scale)
+        scaled_jobs_html = _scale_github_jobs(jobs_html, scale)
+
+        dict_pages = {
+            _SOC_VIEW_PATH: scaled_soc_html,
+            _NOTES_PATH: notes_html,
+            _GITHUB_JOBS_PATH: scaled_jobs_html
+        }
+        with _StandInServer(dict_pages) as server:
+            list_results.extend(_bench_depauw(server, scaled_soc_html, notes_html, scale=scale, repeat=repeat))
+            list_results.extend(_bench_github_jobs(server, scaled_jobs_html, scale=scale, repeat=repeat))
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'fixtures': os.path.abspath(fixtures_directory),
+            'repeat': repeat
+        },
+        'results': list_results
+    }
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description='Offline stage-by-stage benchmark of the scrapers.')
+    parser.add_argument('--fixtures', default=_FIXTURES_DIRECTORY, help='Directory with recorded pages.')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(_DEFAULT_SCALES), help='Row multipliers.')
+    parser.add_argument('--repeat', type=int, default=_DEFAULT_REPEAT, help='Timed runs per stage.')
+    parser.add_argument('--output', help='JSON file to write. Printed if omitted.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = _parse_args(argv)
+
+    dict_report = run(fixtures_directory=args.fixtures, scales=args.scales, repeat=args.repeat)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict_report, f, indent=2)
+    else:
+        json.dump(dict_report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
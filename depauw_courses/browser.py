@@ -0,0 +1,243 @@
+'''Long-lived Chrome session reused across scrapes.
+
+Starting Chrome and loading the SOC page for the first time dominate short
+runs such as enrollment polls. A `BrowserSession` starts one headless Chrome,
+warms it on the SOC page and lends it to every scrape until it is closed,
+restarting it when a health check fails or it has served too long.
+
+    with BrowserSession() as browser:
+        for _ in range(10):
+            list_courses = browser.scrape()
+'''
+
+import threading
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from depauw_courses.main import _MODE_BROWSER, _MODE_PAGE_SOURCE, _SOC_VIEW_URL, _new_driver, iter_courses
+
+
+class BrowserSession(object):
+    '''Keeps a warmed Chrome running for many scrapes.
+
+    Scrapes through one session run one at a time: a scrape from another
+    thread waits for the running one, and starting a second scrape on the
+    thread of a running one raises instead of driving the same Chrome.
+
+    Attributes:
+        headless: Runs Chrome without a window.
+        max_uses: Scrapes served before Chrome is restarted. Never restarted for this reason if None.
+        max_age: Seconds Chrome runs before it is restarted. Never restarted for this reason if None.
+        restarts: Number of times Chrome was restarted.
+    '''
+
+    def __init__(self, headless: bool = True, max_uses: int = None, max_age: float = None) -> None:
+        self.headless = headless
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.restarts = 0
+
+        self._lock = threading.Lock()  # Guards the driver
+        self._scrape_lock = threading.Lock()  # Held by the running scrape, across its yields
+        self._scraping_thread = None  # Identifier of the thread running a scrape
+        self._driver = None
+        self._started_at = None
+        self._uses = 0
+
+    @property
+    def driver(self):
+        '''Returns a healthy Chrome driver, starting or restarting it if needed.'''
+
+        with self._lock:
+            if self._driver is not None and not self._is_usable():
+                self._quit()
+                self.restarts += 1
+
+            if self._driver is None:
+                self._start()
+
+            return self._driver
+
+    def is_alive(self) -> bool:
+        '''Checks that Chrome and its driver still answer.'''
+
+        with self._lock:
+            return self._is_alive()
+
+    def restart(self) -> None:
+        '''Quits Chrome once the running scrape is done; the next scrape starts a new one.'''
+
+        self._check_not_scraping()
+        with self._scrape_lock:
+            self._restart()
+
+    def iter_courses(self, mode: str = _MODE_PAGE_SOURCE, **kwargs):
+        '''Scrapes with the session's Chrome, returning an iterator that yields each course as soon as it is built.
+
+        The session is claimed by this call, after any scrape of another thread
+        is done, and held until the iterator is exhausted or closed. Chrome is
+        restarted before the next scrape if it raised a WebDriver error.
+
+        Raises:
+            ValueError: The mode does not use a browser.
+            RuntimeError: A scrape of the session is already running on this thread.
+
+        Args:
+            mode [str]: 'browser' or 'page_source'. See `depauw_courses.main.iter_courses`.
+            **kwargs: Other arguments of `depauw_courses.main.iter_courses`.
+
+        Returns:
+            courses [iterator]: Courses in table order, with their labs attached.
+        '''
+
+        if mode not in (_MODE_BROWSER, _MODE_PAGE_SOURCE):
+            raise ValueError(f'BrowserSession cannot scrape in mode: {mode}')
+
+        self._check_not_scraping()
+        self._scrape_lock.acquire()
+        self._scraping_thread = threading.get_ident()
+        try:
+            driver = self.driver
+            with self._lock:
+                self._uses += 1
+            courses = iter_courses(mode=mode, driver=driver, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+
+        return _Scrape(self, courses)
+
+    def scrape(self, mode: str = _MODE_PAGE_SOURCE, retries: int = 1, **kwargs) -> list:
+        '''Scrapes with the session's Chrome, restarting it and retrying after a WebDriver error.
+
+        Args:
+            mode [str]: 'browser' or 'page_source'. See `depauw_courses.main.iter_courses`.
+            retries [int]: Number of retries on a fresh Chrome.
+            **kwargs: Other arguments of `depauw_courses.main.iter_courses`.
+
+        Returns:
+            list_courses [list]: A list of courses.
+        '''
+
+        for attempt in range(retries + 1):
+            try:
+                return list(self.iter_courses(mode=mode, **kwargs))
+            except WebDriverException:
+                if attempt == retries:
+                    raise
+
+    def close(self) -> None:
+        '''Quits Chrome once the running scrape is done.'''
+
+        self._check_not_scraping()
+        with self._scrape_lock, self._lock:
+            if self._driver is not None:
+                self._quit()
+
+    def __enter__(self) -> 'BrowserSession':
+        self.driver
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _is_usable(self) -> bool:
+        if self.max_uses is not None and self._uses >= self.max_uses:
+            return False
+        if self.max_age is not None and time.monotonic() - self._started_at >= self.max_age:
+            return False
+        return self._is_alive()
+
+    def _is_alive(self) -> bool:
+        if self._driver is None:
+            return False
+
+        process = getattr(self._driver.service, 'process', None)
+        if process is not None and process.poll() is not None:
+            return False
+
+        try:
+            self._driver.execute_script('return 1')
+        except WebDriverException:
+            return False
+        return True
+
+    def _check_not_scraping(self) -> None:
+        # The scrape lock is not re-entrant, so waiting for a scrape of this thread would never end
+        if self._scraping_thread == threading.get_ident():
+            raise RuntimeError('A scrape of this BrowserSession is still running on this thread')
+
+    def _release(self) -> None:
+        self._scraping_thread = None
+        self._scrape_lock.release()
+
+    def _restart(self) -> None:
+        with self._lock:
+            if self._driver is not None:
+                self._quit()
+                self.restarts += 1
+
+    def _start(self) -> None:
+        driver = _new_driver(headless=self.headless)
+        try:
+            # Warm up DNS, TLS and the HTTP cache with the first page load
+            driver.get(_SOC_VIEW_URL)
+        except WebDriverException:
+            driver.quit()
+            raise
+
+        self._driver = driver
+        self._started_at = time.monotonic()
+        self._uses = 0
+
+    def _quit(self) -> None:
+        driver, self._driver = self._driver, None
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+class _Scrape(object):
+    '''Iterates over the courses of one scrape, holding its `BrowserSession` until exhausted or closed.
+
+    Unlike a generator, it releases the session even if it is dropped before
+    its first course.
+    '''
+
+    __slots__ = ('_session', '_courses')
+
+    def __init__(self, session, courses) -> None:
+        self._session = session
+        self._courses = courses
+
+    def __iter__(self) -> '_Scrape':
+        return self
+
+    def __next__(self):
+        if self._session is None:
+            raise StopIteration
+
+        try:
+            return next(self._courses)
+        except WebDriverException:
+            self._session._restart()
+            self.close()
+            raise
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        '''Stops the scrape and releases the session.'''
+
+        session, self._session = self._session, None
+        if session is not None:
+            try:
+                self._courses.close()
+            finally:
+                session._release()
+
+    def __del__(self) -> None:
+        self.close()
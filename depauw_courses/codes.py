@@ -0,0 +1,312 @@
+'''Parses the priority and restriction codes of SOC rows.
+
+The notes cell of a row holds restriction codes (`+ @ 3,4`) on its first line
+and priorities (`1=FR,SO MAJ;JR NEEDS MAJ/2=SR`) on its second. Hundreds of
+sections share the same strings, so each distinct string is tokenized and
+parsed once into an immutable result that every course shares.
+
+Priority targets grammar, one clause per `;`:
+
+    clause := year (',' year)+ [criterion]    every listed year gets criterion (default ALL)
+            | year 'NEEDS' criterion
+            | target                          target gets ALL
+            | year criterion | criterion year
+            | year criterion criterion        year gets both criteria as one entry
+
+A year named by several clauses keeps the criteria of the last one.
+'''
+
+from collections.abc import Mapping
+from functools import lru_cache
+import re
+
+_DICT_CLASSIFICATIONS = {
+    'FR': 'Freshman',
+    'SO': 'Sophomore',
+    'JR': 'Junior',
+    'SR': 'Senior'
+}
+
+_DICT_RESTRICTION_DESCRIPTIONS = {
+    '+': 'Not offered pass/fail',
+    '@': 'Examinations given at night',
+    '*': 'Confer with instructor no later than the second day of classes',
+    '~': 'Internships are graded S (Satisfactory) or U (Unsatisfactory)',
+    '$': 'Additional fees associated with this class will be charged to your tuition account.  Check with the department for the exact amount.',
+    '[': 'Will be a competence course pending instructor completing appropriate competence workshop.',
+    'S-P': 'SPAC required'
+}
+
+_CACHE_SIZE = 4096
+
+_RE_TOKEN = re.compile(r'[;,]|[^\s;,]+')
+
+_CRITERION_ALL = 'ALL'
+_WORD_NEEDS = 'NEEDS'
+
+_KIND_DESCRIPTION = 'description'
+_KIND_NOTE = 'note'
+_KIND_FLAG = 'flag'
+
+
+class FrozenMapping(Mapping):
+    '''Immutable, hashable mapping that prints like a dictionary.'''
+
+    __slots__ = ('_dict', '_hash')
+
+    def __init__(self, items=()) -> None:
+        self._dict = dict(items)
+        self._hash = None
+
+    def __getitem__(self, key):
+        return self._dict[key]
+
+    def __iter__(self):
+        return iter(self._dict)
+
+    def __len__(self) -> int:
+        return len(self._dict)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(tuple(self._dict.items()))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return repr(self._dict)
+
+
+class PriorityTargets(FrozenMapping):
+    '''Maps classifications (or other targets) to a tuple of criteria.'''
+
+    __slots__ = ()
+
+
+class Priorities(FrozenMapping):
+    '''Maps priority keys (e.g. '1') to their `PriorityTargets`.'''
+
+    __slots__ = ()
+
+
+class RestrictionCodes(object):
+    '''Stores parsed restriction codes.
+
+    Attributes:
+        codes: A tuple of (key, kind, value) in the order they appear.
+            'description' codes map a symbol to its description, 'note' codes
+            reference a numbered note of the course's note page and 'flag'
+            codes are set to True.
+    '''
+
+    __slots__ = ('codes',)
+
+    def __init__(self, codes) -> None:
+        self.codes = tuple(codes)
+
+    @property
+    def needs_notes(self) -> bool:
+        return any(kind == _KIND_NOTE for _, kind, _ in self.codes)
+
+    def resolve(self, dict_course_notes) -> dict:
+        '''Resolves the codes against the notes of a course.
+
+        Args:
+            dict_course_notes [dict]: Notes of the course's note page.
+                Only read if a code references a note.
+
+        Returns:
+            dict_restrictions [dict]: A dictionary of restrictions.
+        '''
+
+        dict_restrictions = {}
+        for key, kind, value in self.codes:
+            if kind == _KIND_NOTE:
+                dict_restrictions[key] = dict_course_notes[value]
+            else:
+                dict_restrictions[key] = value
+        return dict_restrictions
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RestrictionCodes) and self.codes == other.codes
+
+    def __hash__(self) -> int:
+        return hash(self.codes)
+
+    def __repr__(self) -> str:
+        return f'RestrictionCodes({self.codes!r})'
+
+
+def _tokenize(str_target) -> list:
+    return _RE_TOKEN.findall(str_target)
+
+
+def _split_clauses(list_tokens) -> list:
+    list_clauses = [[]]
+    for token in list_tokens:
+        if token == ';':
+            list_clauses.append([])
+        else:
+            list_clauses[-1].append(token)
+    return list_clauses
+
+
+def _add_criterion(dict_targets, year, criterion) -> None:
+    if year not in _DICT_CLASSIFICATIONS:
+        raise KeyError(year)
+    # A later clause naming the same year replaces its criteria, as the original parser did
+    dict_targets[year] = [criterion]
+
+
+def _parse_clause(list_tokens, str_clause, dict_targets) -> None:
+    if ',' in list_tokens:
+        list_years = []
+        index = 0
+        while index < len(list_tokens):
+            list_years.append(list_tokens[index])
+            if index + 1 < len(list_tokens) and list_tokens[index + 1] == ',':
+                index += 2
+            else:
+                index += 1
+                break
+
+        list_rest = list_tokens[index:]
+        criterion = list_rest[0] if len(list_rest) == 1 else _CRITERION_ALL
+
+        for year in list_years:
+            _add_criterion(dict_targets, year, criterion)
+        return
+
+    if _WORD_NEEDS in list_tokens:
+        year, _, criterion = list_tokens
+        _add_criterion(dict_targets, year, criterion)
+    elif len(list_tokens) == 1:
+        dict_targets[list_tokens[0]] = [_CRITERION_ALL]
+    elif len(list_tokens) == 2:
+        tmp_year, tmp_criterion = list_tokens
+        if tmp_year in _DICT_CLASSIFICATIONS:
+            _add_criterion(dict_targets, tmp_year, tmp_criterion)
+        elif tmp_criterion in _DICT_CLASSIFICATIONS:
+            _add_criterion(dict_targets, tmp_criterion, tmp_year)
+        else:
+            raise NotImplementedError(f'ERROR1 in _organize_priorities:\nkey:{tmp_year}, value: {tmp_criterion}')
+    elif len(list_tokens) == 3:
+        _add_criterion(dict_targets, list_tokens[0], tuple(list_tokens[1:]))
+    else:
+        raise NotImplementedError(f'Error2 in _organize_priorities: {str_clause}')
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_targets(str_target) -> PriorityTargets:
+    '''Parses the targets of one priority, e.g. `FR,SO MAJ;JR NEEDS MAJ`.
+
+    Args:
+        str_target [str]: Targets.
+
+    Returns:
+        targets [PriorityTargets]: Shared immutable targets.
+    '''
+
+    dict_targets = {}
+    list_str_clauses = str_target.split(';')
+    for index, list_tokens in enumerate(_split_clauses(_tokenize(str_target))):
+        _parse_clause(list_tokens, list_str_clauses[index], dict_targets)
+
+    return PriorityTargets((year, tuple(list_criteria)) for year, list_criteria in dict_targets.items())
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_priority(str_priority) -> tuple:
+    '''Parses one priority, e.g. `1=FR,SO MAJ`.
+
+    Args:
+        str_priority [str]: Priority.
+
+    Returns:
+        priority [tuple]: (key, targets), or None for an empty priority.
+    '''
+
+    list_temp = str_priority.split('=')
+
+    if list_temp == ['']:
+        return None
+
+    priority_key, str_target = list_temp
+
+    return priority_key, parse_targets(str_target)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_priorities(str_priorities) -> Priorities:
+    '''Parses the priorities line of a row, e.g. `1=FR,SO MAJ/2=SR`.
+
+    Args:
+        str_priorities [str]: Priorities separated by '/'.
+
+    Returns:
+        priorities [Priorities]: Shared immutable priorities.
+    '''
+
+    list_priorities = [parse_priority(str_priority) for str_priority in str_priorities.strip().split('/')]
+
+    return Priorities(priority for priority in list_priorities if priority is not None)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_restrictions(str_restrictions) -> RestrictionCodes:
+    '''Parses the restriction codes of a row, e.g. `+ @ 3,4`.
+
+    Args:
+        str_restrictions [str]: Restriction codes separated by whitespace.
+
+    Returns:
+        restrictions [RestrictionCodes]: Shared immutable codes.
+    '''
+
+    list_codes = []
+    for restriction in str_restrictions.split():
+        if restriction == 'Fn:':
+            continue
+        elif restriction in _DICT_RESTRICTION_DESCRIPTIONS:
+            list_codes.append((restriction, _KIND_DESCRIPTION, _DICT_RESTRICTION_DESCRIPTIONS[restriction]))
+        elif ',' in restriction:
+            for _restriction in restriction.split(','):
+                if _restriction.isdigit():
+                    list_codes.append((int(_restriction), _KIND_NOTE, _restriction))
+                else:
+                    list_codes.append((int(_restriction), _KIND_FLAG, True))
+        elif restriction.isdigit():
+            list_codes.append((int(restriction), _KIND_NOTE, restriction))
+        else:
+            raise ValueError(restriction)
+
+    return RestrictionCodes(list_codes)
+
+
+def parse_stats() -> dict:
+    '''Returns cache statistics of the parsers.
+
+    Returns:
+        dict_stats [dict]: A dictionary of statistics.
+            key [str]: Parser name.
+            value [dict]: Hits, misses, hit rate, distinct strings held and cache size.
+    '''
+
+    dict_stats = {}
+    for parser in (parse_targets, parse_priority, parse_priorities, parse_restrictions):
+        info = parser.cache_info()
+        calls = info.hits + info.misses
+        dict_stats[parser.__name__] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'hit_rate': info.hits / calls if calls else 0.0,
+            'distinct': info.currsize,
+            'maxsize': info.maxsize
+        }
+    return dict_stats
+
+
+def clear_caches() -> None:
+    '''Drops every cached parse result and resets the statistics.'''
+
+    for parser in (parse_targets, parse_priority, parse_priorities, parse_restrictions):
+        parser.cache_clear()
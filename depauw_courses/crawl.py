@@ -0,0 +1,342 @@
+'''Crawls several SOC form selections (terms, departments) in parallel.
+
+Each selection is one submission of the SOC form, e.g. one term or one
+department of a term. Selections are scraped by a pool of worker threads, each
+borrowing a reusable headless Chrome in the browser modes, or by worker
+processes when parsing dominates. Results are merged in selection order, so a
+crawl returns the same list however its selections were scheduled.
+'''
+
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import product
+from multiprocessing.util import Finalize
+import os
+import queue
+import threading
+
+import requests
+
+from depauw_courses.main import (_MODE_REQUESTS, _MODES, _NOTES_MAX_WORKERS, _RETRY_METHODS, _SOC_VIEW_URL, _new_driver,
+                                 iter_courses)
+from scrape.metrics import NULL_METRICS, Metrics
+from scrape.parsing import LazyStrainer, parse_html
+from scrape.scheduler import FetchScheduler
+
+_EXECUTOR_THREAD = 'thread'
+_EXECUTOR_PROCESS = 'process'
+_EXECUTORS = (_EXECUTOR_THREAD, _EXECUTOR_PROCESS)
+
+_SELECTS_ONLY = LazyStrainer('select')  # Fields of the SOC form
+
+_PROCESS_DRIVER_POOL = None  # Driver pool of a worker process
+
+
+class DriverPool(object):
+    '''Lends reusable Chrome drivers to worker threads.
+
+    Drivers are started on demand, up to `size`, and kept running between
+    selections. A driver that raised a WebDriver error is quit instead of
+    being returned to the pool.
+
+    Attributes:
+        size: Maximum number of drivers.
+        headless: Runs Chrome without a window.
+    '''
+
+    def __init__(self, size: int, headless: bool = True) -> None:
+        self.size = size
+        self.headless = headless
+
+        self._lock = threading.Lock()
+        self._idle = queue.LifoQueue()
+        self._n_started = 0
+        self._list_drivers = []
+
+    @contextmanager
+    def driver(self):
+        '''Borrows a driver for the duration of a `with` block.'''
+
+        driver = self._acquire()
+
+        # Selenium is only imported once a driver runs, so requests-only crawls never load it
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            yield driver
+        except WebDriverException:
+            self._discard(driver)
+            raise
+        except BaseException:
+            self._idle.put(driver)
+            raise
+        else:
+            self._idle.put(driver)
+
+    def close(self) -> None:
+        '''Quits every driver the pool started.'''
+
+        with self._lock:
+            list_drivers, self._list_drivers = self._list_drivers, []
+            self._n_started = 0
+            self._idle = queue.LifoQueue()
+
+        if not list_drivers:
+            return
+
+        from selenium.common.exceptions import WebDriverException
+
+        for driver in list_drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+
+    def __enter__(self) -> 'DriverPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            start = self._n_started < self.size
+            if start:
+                self._n_started += 1
+
+        if not start:
+            return self._idle.get()
+
+        try:
+            driver = _new_driver(headless=self.headless)
+        except BaseException:
+            with self._lock:
+                self._n_started -= 1
+            raise
+
+        with self._lock:
+            self._list_drivers.append(driver)
+        return driver
+
+    def _discard(self, driver) -> None:
+        from selenium.common.exceptions import WebDriverException
+
+        with self._lock:
+            self._n_started -= 1
+            if driver in self._list_drivers:
+                self._list_drivers.remove(driver)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+def soc_selections(fields=('term',), session=None, include_blank: bool = False) -> list:
+    '''Lists the selections of the SOC form, one per combination of options.
+
+    Args:
+        fields [tuple]: Names of the `select` fields to split the crawl on, e.g. ('term', 'dept').
+        session [requests.Session]: Session to reuse. A new request is made if None.
+        include_blank [bool]: Keeps options with an empty value (e.g. 'All Departments').
+
+    Returns:
+        list_selections [list]: A list of dictionaries of form field values, in the form's option order.
+    '''
+
+    http = session if session is not None else requests
+
+    request = http.get(_SOC_VIEW_URL)
+    request.raise_for_status()
+    bs = parse_html(request.text, parse_only=_SELECTS_ONLY)
+
+    list_values = []
+    for name in fields:
+        select = bs.find('select', attrs={'name': name})
+        if select is None:
+            raise KeyError(name)
+
+        list_options = []
+        for option in select.find_all('option'):
+            value = option.get('value', option.text.strip())
+            if value or include_blank:
+                list_options.append(value)
+        list_values.append(list_options)
+
+    return [dict(zip(fields, values)) for values in product(*list_values)]
+
+
+def _term(course):
+    return course.selection.get('term') if course.selection is not None else None
+
+
+def merge_courses(list_course_lists, dedupe: bool = True) -> list:
+    '''Merges the courses of several selections.
+
+    SOC numbers are only unique within a term, so sections of different
+    terms (`course.selection['term']`) are never merged.
+
+    Args:
+        list_course_lists [list]: A list of lists of courses, in selection order.
+        dedupe [bool]: Keeps only the first course of each SOC number of a term, e.g. of a section
+            cross-listed in several departments.
+
+    Returns:
+        list_courses [list]: A list of courses in selection order, then table order.
+    '''
+
+    list_courses = []
+    set_keys = set()
+    for list_selection_courses in list_course_lists:
+        for course in list_selection_courses:
+            if dedupe:
+                key = (_term(course), course._soc_number)
+                if key in set_keys:
+                    continue
+                set_keys.add(key)
+            list_courses.append(course)
+    return list_courses
+
+
+def _results(list_futures) -> list:
+    '''Returns the results of futures in order, cancelling the pending ones as soon as one raises.'''
+
+    _, set_pending = wait(list_futures, return_when=FIRST_EXCEPTION)
+    for future in set_pending:
+        future.cancel()
+
+    for future in list_futures:
+        if future.done() and not future.cancelled() and future.exception() is not None:
+            raise future.exception()
+    return [future.result() for future in list_futures]
+
+
+def _scrape_selection(mode, selection, max_workers, cache, metrics, driver_pool, scheduler=None) -> list:
+    if mode == _MODE_REQUESTS:
+        return list(iter_courses(mode=mode,
+                                 max_workers=max_workers,
+                                 cache=cache,
+                                 metrics=metrics,
+                                 selection=selection,
+                                 scheduler=scheduler))
+
+    with driver_pool.driver() as driver:
+        return list(iter_courses(mode=mode,
+                                 max_workers=max_workers,
+                                 cache=cache,
+                                 metrics=metrics,
+                                 selection=selection,
+                                 driver=driver,
+                                 scheduler=scheduler))
+
+
+def _init_process(headless) -> None:
+    global _PROCESS_DRIVER_POOL
+
+    _PROCESS_DRIVER_POOL = DriverPool(size=1, headless=headless)
+    Finalize(_PROCESS_DRIVER_POOL, _PROCESS_DRIVER_POOL.close, exitpriority=10)
+
+
+def _scrape_selection_in_process(mode, selection, max_workers, cache, record_metrics) -> tuple:
+    metrics = Metrics() if record_metrics else NULL_METRICS
+    list_courses = _scrape_selection(mode=mode,
+                                     selection=selection,
+                                     max_workers=max_workers,
+                                     cache=cache,
+                                     metrics=metrics,
+                                     driver_pool=_PROCESS_DRIVER_POOL)
+    return list_courses, metrics.snapshot()
+
+
+def crawl(selections,
+          mode: str = _MODE_REQUESTS,
+          workers: int = None,
+          executor: str = _EXECUTOR_THREAD,
+          max_workers: int = _NOTES_MAX_WORKERS,
+          cache=None,
+          metrics=None,
+          headless: bool = True,
+          dedupe: bool = True,
+          scheduler=None) -> list:
+    '''Scrapes several SOC form selections in parallel.
+
+    Args:
+        selections [list]: A list of dictionaries of form field values, e.g. from `soc_selections`.
+        mode [str]: How each course table is read. See `depauw_courses.main.iter_courses`.
+        workers [int]: Number of selections scraped at a time. Defaults to the number of CPUs.
+        executor [str]: How selections are scheduled.
+            'thread': Worker threads sharing one pool of `workers` headless Chrome drivers.
+            'process': Worker processes, each with its own driver. Parsing runs on every core.
+        max_workers [int]: Maximum number of note pages fetched concurrently per selection.
+        cache [scrape.http_cache.HttpCache]: Response cache for the note pages.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters of every selection.
+        headless [bool]: Runs Chrome without a window.
+        dedupe [bool]: Keeps only the first course of each SOC number of a term. See `merge_courses`.
+        scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP requests of every worker thread, so
+            per-host rate limits hold for the whole crawl. One is created if None. Worker processes each
+            create their own.
+
+    Returns:
+        list_courses [list]: A list of courses in selection order, then table order.
+
+    Raises:
+        Exception: The first error of a selection. Selections not started yet are cancelled.
+    '''
+
+    if mode not in _MODES:
+        raise ValueError(f'Unknown mode: {mode}')
+    if executor not in _EXECUTORS:
+        raise ValueError(f'Unknown executor: {executor}')
+
+    if metrics is None:
+        metrics = NULL_METRICS
+
+    list_selections = list(selections)
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(list_selections)))
+
+    if executor == _EXECUTOR_PROCESS:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_process, initargs=(headless,)) as pool:
+            list_futures = [pool.submit(_scrape_selection_in_process,
+                                        mode=mode,
+                                        selection=selection,
+                                        max_workers=max_workers,
+                                        cache=cache,
+                                        record_metrics=metrics.enabled)
+                            for selection in list_selections]
+
+            list_course_lists = []
+            for list_courses, dict_snapshot in _results(list_futures):
+                metrics.merge(dict_snapshot)
+                list_course_lists.append(list_courses)
+    else:
+        own_scheduler = scheduler is None
+        if own_scheduler:
+            scheduler = FetchScheduler(max_concurrency=workers * max_workers,
+                                       pool_size=workers * max_workers,
+                                       retry_methods=_RETRY_METHODS,
+                                       metrics=metrics)
+
+        try:
+            with DriverPool(size=workers, headless=headless) as driver_pool, \
+                    ThreadPoolExecutor(max_workers=workers) as pool:
+                list_futures = [pool.submit(_scrape_selection,
+                                            mode=mode,
+                                            selection=selection,
+                                            max_workers=max_workers,
+                                            cache=cache,
+                                            metrics=metrics,
+                                            driver_pool=driver_pool,
+                                            scheduler=scheduler)
+                                for selection in list_selections]
+
+                list_course_lists = _results(list_futures)
+        finally:
+            if own_scheduler:
+                scheduler.close()
+
+    return merge_courses(list_course_lists, dedupe=dedupe)
@@ -1,23 +1,28 @@
-from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import os
 import re
-from typing import Dict, List
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
 import requests
-from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+
+from depauw_courses.codes import PriorityTargets, parse_priority, parse_restrictions
+from depauw_courses.notes import LazyRestrictions, NotesResolver
+from depauw_courses.schedule import Schedule, parse_schedule
+from scrape.extract import Cell, Field, RowSchema
+from scrape.metrics import NULL_METRICS
+from scrape.parsing import LazyStrainer, parse_html
+from scrape.scheduler import FetchScheduler
+from scrape.streaming import ResponseChunks, iter_table_rows
+
+_LOGGER = logging.getLogger(__name__)
 
 _DEPAUW_URL = 'https://my.depauw.edu'
 _SOC_VIEW_URL = f'{_DEPAUW_URL}/e/reg/soc-view/'
 
-_DICT_CLASSIFICATIONS = {
-    'FR': 'Freshman',
-    'SO': 'Sophomore',
-    'JR': 'Junior',
-    'SR': 'Senior'
-}
-
 _DICT_CLASSIFICATION_NUMBERS = {
     1: 'Freshman',
     2: 'Sophomore',
@@ -25,31 +30,32 @@ _DICT_CLASSIFICATION_NUMBERS = {
     4: 'Senior'
 }
 
-_DICT_DAYS = {
-    'M': 'Monday',
-    'T': 'Tuesday',
-    'W': 'Wednesday',
-    'R': 'Thursday',
-    'F': 'Friday',
-    'S': 'Saturday'
-}
-
-_DICT_RESTRICTION_DESCRIPTIONS = {
-    '+': 'Not offered pass/fail',
-    '@': 'Examinations given at night',
-    '*': 'Confer with instructor no later than the second day of classes',
-    '~': 'Internships are graded S (Satisfactory) or U (Unsatisfactory)',
-    '$': 'Additional fees associated with this class will be charged to your tuition account.  Check with the department for the exact amount.',
-    '[': 'Will be a competence course pending instructor completing appropriate competence workshop.',
-    'S-P': 'SPAC required'
-}
-
 _DICT_COURSE_PRIORITY_LEVELS = {
     0: 'Excludes students from the class',
     1: 'Have first access to the class',
     2: 'Have access to the class only after all students fitting priority 1 have had a chance to enroll'
 }
 
+_MODE_BROWSER = 'browser'
+_MODE_PAGE_SOURCE = 'page_source'
+_MODE_REQUESTS = 'requests'
+_MODES = (_MODE_BROWSER, _MODE_PAGE_SOURCE, _MODE_REQUESTS)
+
+_NOTES_MAX_WORKERS = 8
+_RETRY_METHODS = ('GET', 'POST')  # The SOC form POST only runs a search, so resending it is harmless
+
+_FORMS_ONLY = LazyStrainer('form')
+
+_SOC_TABLE_INDEX = 2  # Course table of the SOC page
+_SOC_HEADER_ROWS = 2
+_NOTES_TABLE_INDEX = 3  # Table nested in the third table of a note page
+_NOTES_ROW_INDEX = 1
+_NOTES_CELL_INDEX = 2
+
+_RE_NOTE_LINE = re.compile(r'^[0-9]+.\s.*$')
+_RE_NOTE_NUMBER = re.compile(r'^[0-9]+')
+_RE_SENTENCE = re.compile(r'([A-Z][^\.!?]*[\.!?])')
+
 _HOME_DIRECTORY = os.path.expanduser('~')
 _CHROME_DRIVER_PATH = os.path.join(_HOME_DIRECTORY, 'chromedriver')
 
@@ -76,6 +82,10 @@ def _string_validation(value) -> str:
 
 
 class Course(object):
+    __slots__ = ('_soc_number', '_department', '_course', '_description', '_credit', '_method', '_schedule',
+                 '_area', '_competency', '_interdisciplinary_program', '_pass_fail', '_enrolled', '_capacity',
+                 '_instructor', '_room', '_restrictions', '_priorities', '_book_link', '_lab', '_selection')
+
     def __init__(self, soc_number, department, course, description, credit, method, schedule, area, competency, interdisciplinary_program, pass_fail, enrolled, capacity, instructor, room, restrictions, priorities, book_link) -> None:
         self._soc_number = _int_validation(soc_number)
         self._department = _string_validation(department)
@@ -96,6 +106,7 @@ class Course(object):
         self._priorities = priorities
         self._book_link = _string_validation(book_link)
         self._lab = None
+        self._selection = None
 
     @property
     def lab(self) -> object:
@@ -105,12 +116,86 @@ class Course(object):
     def lab(self, value) -> None:
         self._lab = value
 
+    @property
+    def selection(self) -> dict:
+        '''SOC form field values of the course list the course was scraped from, e.g. {'term': '202120'}.'''
+
+        return self._selection
+
+    @selection.setter
+    def selection(self, value) -> None:
+        self._selection = value
+
+    def __setstate__(self, state) -> None:
+        # Courses pickled before `selection` existed (e.g. in old snapshots) have no value for it
+        self._selection = None
+        _, dict_slots = state
+        for name, value in dict_slots.items():
+            setattr(self, name, value)
+
     def __str__(self) -> str:
         return self.detailed_string()
 
     def __repr__(self) -> str:
         return self.detailed_string()
 
+    def to_dict(self) -> dict:
+        '''Returns the fields (without the leading underscore) as plain values.'''
+
+        return {
+            'soc_number': self._soc_number,
+            'department': self._department,
+            'course': self._course,
+            'description': self._description,
+            'credit': self._credit,
+            'method': self._method,
+            'schedule': _schedule_dict(self._schedule),
+            'area': self._area,
+            'competency': self._competency,
+            'interdisciplinary_program': self._interdisciplinary_program,
+            'pass_fail': self._pass_fail,
+            'enrolled': self._enrolled,
+            'capacity': self._capacity,
+            'instructor': self._instructor,
+            'room': self._room,
+            'restrictions': dict(self._restrictions) if self._restrictions is not None else None,
+            'priorities': _priorities_dict(self._priorities),
+            'book_link': self._book_link,
+            'lab': self._lab.to_dict() if self._lab is not None else None,
+            'selection': dict(self._selection) if self._selection is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, dict_fields) -> 'Course':
+        '''Rebuilds a course from `to_dict`, also as read back from NDJSON or CSV by `scrape.export`.
+
+        Numbers may be strings and times ISO strings, since CSV cells keep no types.
+        '''
+
+        course = cls(soc_number=dict_fields['soc_number'],
+                     department=dict_fields['department'],
+                     course=dict_fields['course'],
+                     description=dict_fields['description'],
+                     credit=dict_fields['credit'],
+                     method=dict_fields['method'],
+                     schedule=_schedule_from_dict(dict_fields['schedule']),
+                     area=dict_fields['area'],
+                     competency=dict_fields['competency'],
+                     interdisciplinary_program=dict_fields['interdisciplinary_program'],
+                     pass_fail=dict_fields['pass_fail'],
+                     enrolled=dict_fields['enrolled'],
+                     capacity=dict_fields['capacity'],
+                     instructor=dict_fields['instructor'],
+                     room=dict_fields['room'],
+                     restrictions=_restrictions_from_dict(dict_fields['restrictions']),
+                     priorities=_priorities_from_dict(dict_fields['priorities']),
+                     book_link=dict_fields['book_link'])
+
+        if dict_fields.get('lab') is not None:
+            course.lab = Lab.from_dict(dict_fields['lab'])
+        course.selection = dict_fields.get('selection')
+        return course
+
     def detailed_string(self) -> str:
         return ('Course(\n'
                 f'\tSoc#: {self._soc_number},\n'
@@ -136,6 +221,8 @@ class Course(object):
 
 
 class Lab(object):
+    __slots__ = ('_course', '_description', '_schedule', '_room')
+
     def __init__(self, course, description, schedule, room) -> None:
         self._course = _string_validation(course)
         self._description = description
@@ -148,6 +235,25 @@ class Lab(object):
     def __repr__(self) -> str:
         return self.detailed_string()
 
+    def to_dict(self) -> dict:
+        '''Returns the fields (without the leading underscore) as plain values.'''
+
+        return {
+            'course': self._course,
+            'description': self._description,
+            'schedule': _schedule_dict(self._schedule),
+            'room': self._room
+        }
+
+    @classmethod
+    def from_dict(cls, dict_fields) -> 'Lab':
+        '''Rebuilds a lab from `to_dict`. See `Course.from_dict`.'''
+
+        return cls(course=dict_fields['course'],
+                   description=dict_fields['description'],
+                   schedule=_schedule_from_dict(dict_fields['schedule']),
+                   room=dict_fields['room'])
+
     def detailed_string(self) -> str:
         return ('Lab(\n'
                 f'\tCrse: {self._course},\n'
@@ -157,343 +263,811 @@ class Lab(object):
                 ')')
 
 
+def _schedule_dict(schedule) -> dict:
+    return schedule.as_dict() if isinstance(schedule, Schedule) else schedule
+
+
+def _schedule_from_dict(dict_schedules) -> Schedule:
+    return Schedule.from_dict(dict_schedules) if dict_schedules is not None else None
+
+
+def _restrictions_from_dict(dict_restrictions) -> dict:
+    if dict_restrictions is None:
+        return None
+    # Note numbers are int keys, which JSON turns into strings
+    return {int(key) if isinstance(key, str) and key.isdigit() else key: value
+            for key, value in dict_restrictions.items()}
+
+
+def _priorities_dict(dict_priorities) -> dict:
+    if dict_priorities is None:
+        return None
+    return {key: dict(targets) for key, targets in dict_priorities.items()}
+
+
+def _priorities_from_dict(dict_priorities) -> dict:
+    if dict_priorities is None:
+        return None
+    return {key: PriorityTargets((target, tuple(criteria)) for target, criteria in dict_targets.items())
+            for key, dict_targets in dict_priorities.items()}
+
+
 def _organize_schedules(str_time_days) -> dict:
-    list_time_days = str_time_days.split()
-
-    start_time = None
-    end_time = None
-    days = None
-
-    if len(list_time_days) == 1:
-        start_time = None
-        end_time = None
-        days = []
-    elif len(list_time_days) == 2:
-        list_time = list_time_days[0].split('-')
-        start_time = datetime.strptime(list_time[0], '%H:%M').time()
-        if start_time < datetime.strptime('7:00', '%H:%M').time():
-            start_time \
-                = (datetime.strptime(list_time[0], '%H:%M') + timedelta(hours=12)).time()
-        end_time = datetime.strptime(list_time[1], '%H:%M').time()
-        if end_time < datetime.strptime('7:00', '%H:%M').time():
-            end_time \
-                = (datetime.strptime(list_time[1], '%H:%M') + timedelta(hours=12)).time()
-        days = list(list_time_days[1])
-    elif len(list_time_days) == 3:
-        list_time = list_time_days[0].split('-')
-        am_pm = list_time_days[1]
-        days = list(list_time_days[2])
-
-        if am_pm == 'PM':
-            start_time \
-                = (datetime.strptime(list_time[0], '%H:%M') + timedelta(hours=12)).time()
-            end_time \
-                = (datetime.strptime(list_time[1], '%H:%M') + timedelta(hours=12)).time()
+    return parse_schedule(str_time_days).as_dict()
+
+
+def _new_scheduler(max_workers: int = _NOTES_MAX_WORKERS, metrics=NULL_METRICS) -> FetchScheduler:
+    '''Creates a fetch scheduler whose keep-alive connection pool fits `max_workers` threads.'''
+
+    return FetchScheduler(max_concurrency=max_workers,
+                          pool_size=max_workers,
+                          retry_methods=_RETRY_METHODS,
+                          metrics=metrics)
+
+
+def _explore_notes(url, session=None, cache=None, metrics=NULL_METRICS) -> dict:
+    if cache is not None:
+        start = time.perf_counter()
+        response = cache.fetch(url, session=session, parse=_parse_notes)
+        if response.from_cache:
+            metrics.increment('cache_hits')
         else:
-            raise NotImplementedError(f'Error in _organize_schedules: {am_pm}')
-    else:
-        raise NotImplementedError(f'Error in _organize_schedules: {list_time_days}')
+            metrics.record_fetch(url, time.perf_counter() - start, response.n_bytes, response.status_code)
+            if response.revalidated:
+                metrics.increment('cache_revalidated')
+        response.raise_for_status()
+        return response.parsed
+
+    http = session if session is not None else requests
+    start = time.perf_counter()
+    request = http.get(url, stream=True)
+    if not request.ok:
+        metrics.record_fetch(url, time.perf_counter() - start, len(request.content), request.status_code)
+        request.raise_for_status()
+
+    # The page is parsed while it downloads, so the fetch time includes parsing
+    chunks = ResponseChunks(request)
+    with metrics.stage('notes_parse'):
+        dict_course_notes = _parse_notes(chunks)
+    metrics.record_fetch(url, time.perf_counter() - start, chunks.n_bytes, request.status_code)
+
+    return dict_course_notes
+
 
-    dict_schedules = {
-        _DICT_DAYS[day]: [{
-            'start': start_time,
-            'end': end_time
-        }]
-        for day in days
-    }
+def _parse_notes(html) -> dict:
+    '''Parses a note page.
 
-    return dict_schedules
+    Args:
+        html [str]: HTML, or an iterable of its text chunks.
 
+    Returns:
+        dict_course_notes [dict]: A dictionary of notes. Empty if the page has no notes table.
+    '''
 
-def _explore_notes(url) -> dict:
-    request = requests.get(url)
-    bs = BeautifulSoup(request.text, 'html.parser')
+    for index, row in enumerate(iter_table_rows(html, table_index=_NOTES_TABLE_INDEX)):
+        if index == _NOTES_ROW_INDEX:
+            return _extract_notes(row.strings[_NOTES_CELL_INDEX])
 
-    list_tables = bs.find_all('table')
+    return {}
 
-    if len(list_tables) == 0:
-        return {}
 
-    target_table = list_tables[2].table
+def _extract_notes(list_strings) -> dict:
+    '''Extracts the numbered notes of a note page's notes cell.
 
-    list_trs = target_table.find_all('tr')
-    target_tr = list_trs[1]
+    Every text node is read line by line, so a note is found wherever the
+    page breaks its lines (`<br>`, newlines or inline tags).
 
-    list_tds = target_tr.find_all('td')
-    target_td = list_tds[2].font
+    Args:
+        list_strings [list]: Text nodes of the cell holding the notes.
 
-    list_lines = [line.strip() for line in target_td.prettify().split('\n')]
+    Returns:
+        dict_course_notes [dict]: A dictionary of notes.
+            key [str]: Note number.
+            value [str]: Note text without its number.
+    '''
 
     dict_course_notes = {}
-    for line in list_lines:
-        match = re.match(r'^[0-9]+.\s.*$', line)
-        key = None
-        description = None
-        if match:
-            key = re.match(r'^[0-9]+', line)
-            list_description = re.split(r'([A-Z][^\.!?]*[\.!?])', line)
-            description = ''.join(list_description[1:])
-            dict_course_notes[key.group()] = description
+    for string in list_strings:
+        for line in string.split('\n'):
+            line = line.strip()
+            if _RE_NOTE_LINE.match(line):
+                key = _RE_NOTE_NUMBER.match(line)
+                list_description = _RE_SENTENCE.split(line)
+                dict_course_notes[key.group()] = ''.join(list_description[1:])
 
     return dict_course_notes
 
 
 def _collect_restrictions(list_restrictions: List[str], soc_number: int, dict_notes: Dict, dict_restrictions: Dict) -> dict:
-    for restriction in list_restrictions:
-        if restriction == 'Fn:':
-            continue
-        elif restriction in _DICT_RESTRICTION_DESCRIPTIONS.keys():
-            dict_restrictions[restriction] = _DICT_RESTRICTION_DESCRIPTIONS[restriction]
-        elif restriction in _DICT_COURSE_PRIORITY_LEVELS.keys():
-            dict_restrictions[restriction] = _DICT_COURSE_PRIORITY_LEVELS[restriction]
-        elif ',' in restriction:
-            list_splitted_restrictions = restriction.split(',')
-            for _restriction in list_splitted_restrictions:
-                if _restriction.isdigit():
-                    dict_restrictions[int(_restriction)] = dict_notes[soc_number][_restriction]
-                else:
-                    dict_restrictions[int(_restriction)] = True
-        elif restriction.isdigit():
-            dict_restrictions[int(restriction)] = dict_notes[soc_number][restriction]
-        else:
-            raise ValueError(restriction)
+    restrictions = parse_restrictions(' '.join(list_restrictions))
+
+    if restrictions.needs_notes:
+        dict_restrictions.update(restrictions.resolve(dict_notes[soc_number]))
+    else:
+        dict_restrictions.update(restrictions.resolve(None))
 
 
 def _collect_priorities(list_priorities: List[str], dict_priorities: Dict) -> dict:
     for priority in list_priorities:
-        list_temp = priority.split('=')
+        parsed = parse_priority(priority)
 
-        if list_temp == ['']:
+        if parsed is None:
             continue
 
-        priority_key, str_target = list_temp
+        priority_key, targets = parsed
+        dict_priorities[priority_key] = targets
+
+
+class _LinkNotFound(LookupError):
+    '''Raised when a row has no link with the requested text.'''
+
+
+class _DriverRow(object):
+    '''Course table row read through WebDriver, one round trip per lookup.'''
+
+    def __init__(self, tr) -> None:
+        self._tr = tr
+        self.has_attributes = bool(tr.get_property('attributes'))
+        self.contents = [td.text for td in tr.find_elements_by_tag_name('td')]
+
+    def link(self, text) -> str:
+        from selenium.common.exceptions import NoSuchElementException
+
+        try:
+            element = self._tr.find_element_by_link_text(text)
+        except NoSuchElementException:
+            raise _LinkNotFound(text)
+
+        for attribute in element.get_property('attributes'):
+            if attribute['nodeName'] == 'href':
+                return attribute['value']
+        return None
+
+
+class _HtmlRow(object):
+    '''Course table row streamed from the page's HTML.
+
+    Cell and link texts are rendered the way WebDriver's `.text` does, so rows
+    read the same as `_DriverRow`s.
+    '''
+
+    def __init__(self, row) -> None:
+        self._list_links = row.links
+        self.has_attributes = bool(row.attrs)
+        self.contents = row.cells
 
-        list_targets \
-            = _organize_priorities(str_target=str_target, dict_final_targets={})
+    def link(self, text) -> str:
+        for link_text, href in self._list_links:
+            if link_text == text:
+                return href
+        raise _LinkNotFound(text)
 
-        if isinstance(priority_key, int):
-            dict_priorities[int(priority_key)] = list_targets
+
+def _iter_driver_rows(driver, metrics=NULL_METRICS):
+    '''Yields the course table rows of the submitted SOC page in Chrome.'''
+
+    # Get a table with courses listed
+    list_tables = driver.find_elements_by_tag_name('table')
+    table = list_tables[2]
+
+    # Get a list of courses
+    list_trs = table.find_elements_by_tag_name('tr')
+
+    for tr in list_trs[2:]:  # Avoid 2 header lines
+        with metrics.stage('driver_row'):
+            row = _DriverRow(tr)
+        yield row
+
+
+def _iter_html_rows(html, metrics=NULL_METRICS):
+    '''Yields the course table rows of the submitted SOC page's HTML as they are parsed.
+
+    No document tree is built: each row is yielded as soon as it closes and
+    dropped afterwards, so memory holds one row however large the page is.
+
+    Args:
+        html [str]: HTML, or an iterable of its text chunks (e.g. while it downloads).
+        metrics [scrape.metrics.Metrics]: Times the 'html_parse' stage.
+    '''
+
+    rows = iter_table_rows(html, table_index=_SOC_TABLE_INDEX)
+    index = 0
+
+    while True:
+        with metrics.stage('html_parse'):
+            row = next(rows, None)
+        if row is None:
+            return
+
+        if index >= _SOC_HEADER_ROWS:
+            yield _HtmlRow(row)
+        index += 1
+
+
+def _soc_form_fields(form, submit) -> List[Tuple[str, str]]:
+    '''Collects the fields a browser would send when `submit` is clicked.
+
+    Args:
+        form [bs4.element.Tag]: SOC form.
+        submit [bs4.element.Tag]: Submit button clicked.
+
+    Returns:
+        list_fields [list]: A list of (name, value) pairs.
+    '''
+
+    list_fields = []
+    for element in form.find_all(['input', 'select', 'textarea']):
+        name = element.get('name')
+        if not name or element.has_attr('disabled'):
+            continue
+
+        if element.name == 'select':
+            list_options = element.find_all('option')
+            list_selected = [option for option in list_options if option.has_attr('selected')]
+            if not list_selected and not element.has_attr('multiple'):
+                list_selected = list_options[:1]
+            for option in list_selected:
+                list_fields.append((name, option.get('value', option.text.strip())))
+        elif element.name == 'textarea':
+            list_fields.append((name, element.text))
         else:
-            dict_priorities[priority_key] = list_targets
+            input_type = element.get('type', 'text').lower()
+            if input_type in ('checkbox', 'radio') and not element.has_attr('checked'):
+                continue
+            if input_type in ('submit', 'image', 'button', 'reset') and element is not submit:
+                continue
+            list_fields.append((name, element.get('value', 'on' if input_type in ('checkbox', 'radio') else '')))
+
+    return list_fields
 
 
-def _organize_priorities(str_target, dict_final_targets={}) -> dict:
-    '''Organizes notes.
+def _apply_selection(list_fields, selection) -> List[Tuple[str, str]]:
+    '''Replaces the values of the selected form fields.
 
     Args:
-        str_target [str]: Target.
-        dict_final_targets [dict]: A dictionary of final targets.
-            key [str]: Year.
-            value [list]: A list of targets.
+        list_fields [list]: A list of (name, value) pairs from `_soc_form_fields`.
+        selection [dict]: A dictionary of form field values, e.g. {'term': '202120'}.
 
     Returns:
-        dict_final_targets [dict]: A dictionary of final targets.
-            key [str]: Year.
-            value [list]: A list of targets.
+        list_fields [list]: A list of (name, value) pairs.
     '''
 
-    if ';' in str_target:
-        for target in str_target.split(';'):
-            _organize_priorities(str_target=target, dict_final_targets=dict_final_targets)
-    elif ',' in str_target:
-        list_str_target_splitted = str_target.split()
+    if not selection:
+        return list_fields
 
-        criterion = 'ALL'
+    list_selected = [(name, value) for name, value in list_fields if name not in selection]
+    list_selected.extend(selection.items())
+    return list_selected
 
-        if len(list_str_target_splitted) == 2:
-            criterion = list_str_target_splitted[1]
 
-        for target in list_str_target_splitted[0].split(','):
-            if _DICT_CLASSIFICATIONS[target] in dict_final_targets:
-                dict_final_targets[target].append(criterion)
+def _submit_soc_form(session=None, selection=None, stream: bool = False):
+    '''Submits the SOC form without a browser.
+
+    Args:
+        session [scrape.scheduler.FetchScheduler]: Scheduler (or session) to reuse. A new request is made if None.
+        selection [dict]: Form field values overriding the defaults, e.g. {'term': '202120', 'dept': 'CSC'}.
+        stream [bool]: Returns the course list page as it downloads instead of once it has.
+
+    Returns:
+        html [str]: HTML of the course list page, or a `scrape.streaming.ResponseChunks` of it if `stream`.
+
+    Raises:
+        requests.HTTPError: The form or the course list page answered with a 4xx or 5xx status.
+    '''
+
+    http = session if session is not None else requests
+
+    request = http.get(_SOC_VIEW_URL)
+    request.raise_for_status()
+    bs = parse_html(request.text, parse_only=_FORMS_ONLY)
+
+    submit = bs.find('input', attrs={'name': 'submit', 'value': 'Submit'})
+    form = submit.find_parent('form')
+
+    list_fields = _apply_selection(_soc_form_fields(form=form, submit=submit), selection)
+    action = urljoin(request.url, form.get('action', ''))
+
+    if form.get('method', 'get').lower() == 'post':
+        request = http.post(action, data=list_fields, stream=stream)
+    else:
+        request = http.get(action, params=list_fields, stream=stream)
+    # An error page would otherwise read as a course list without courses
+    request.raise_for_status()
+
+    return ResponseChunks(request) if stream else request.text
+
+
+def _new_driver(headless: bool = False):
+    '''Starts Chrome.
+
+    Args:
+        headless [bool]: Runs Chrome without a window.
+
+    Returns:
+        driver [selenium.webdriver.Chrome]: Chrome driver.
+    '''
+
+    # Selenium is only imported by the browser modes, so requests-only runs start faster
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+
+    return webdriver.Chrome(executable_path=_CHROME_DRIVER_PATH, options=options)
+
+
+def _select_soc_form(driver, selection) -> None:
+    '''Selects form field values in Chrome before the SOC form is submitted.'''
+
+    from selenium.webdriver.support.ui import Select
+
+    for name, value in (selection or {}).items():
+        Select(driver.find_element_by_name(name)).select_by_value(value)
+
+
+def _split_priorities(str_priorities) -> List[str]:
+    if str_priorities is None:
+        return []
+    return str_priorities.strip().split('/')
+
+
+# Cells of a course row read before its note page is fetched
+_ROW_SCHEMA = RowSchema([
+    Field('soc_number', Cell(0)),
+    Field('department_course', Cell(1)),
+    Field('restrictions', Cell(12, line=0), convert=str.strip),
+    Field('priorities', Cell(12, line=1), convert=_split_priorities, default=None),
+])
+
+
+def _iter_pending_courses(rows, metrics=NULL_METRICS):
+    '''Reads course table rows into pending courses with their lab rows attached.
+
+    A pending course is yielded once the next course row starts (or the table
+    ends), so its lab row, if any, is already attached.
+
+    Args:
+        rows [iterable]: Rows from `_iter_driver_rows` or `_iter_html_rows`.
+        metrics [scrape.metrics.Metrics]: Receives row counters.
+
+    Yields:
+        pending [dict]: Raw cells, restriction codes, priorities and links of a course.
+    '''
+
+    pending = None
+
+    for row in rows:
+        list_contents = row.contents
+        metrics.increment('rows_read')
+
+        if row.has_attributes:
+            if list_contents[0] == '':
+                metrics.increment('rows_skipped_blank')
             else:
-                dict_final_targets[target] = [criterion]
-    elif 'NEEDS' in str_target:
-        year, _, criterion = str_target.split()
-        if _DICT_CLASSIFICATIONS[year] in dict_final_targets:
-            dict_final_targets[year].append(criterion)
+                dict_row = _ROW_SCHEMA.record(list_contents)
+                _LOGGER.debug('soc_number: %s', dict_row['soc_number'])
+
+                department_course = dict_row['department_course']
+                str_restrictions = dict_row['restrictions']
+                list_priorities = dict_row['priorities']
+
+                notes_link = None
+                try:
+                    href = row.link(str_restrictions)
+                    if href is not None:
+                        notes_link = _SOC_VIEW_URL + href
+                except _LinkNotFound:
+                    metrics.increment('rows_skipped_no_notes_link')
+                    continue
+
+                book_link = None
+                try:
+                    href = row.link(department_course)
+                    if href is not None:
+                        book_link = _DEPAUW_URL + href
+                except _LinkNotFound:
+                    metrics.increment('tables_truncated_no_book_link')
+                    break
+
+                metrics.increment('course_rows')
+                if pending is not None:
+                    yield pending
+
+                pending = {
+                    'contents': list_contents,
+                    'restrictions': str_restrictions.split(),
+                    'priorities': list_priorities,
+                    'notes_link': notes_link,
+                    'book_link': book_link,
+                    'lab': None
+                }
         else:
-            dict_final_targets[year] = [criterion]
-    elif len(str_target.split()) == 1:
-        dict_final_targets[str_target.strip()] = ['ALL']
-    elif len(str_target.split()) == 2:
-        tmp_year, tmp_criterion = str_target.split()
-        if tmp_year in _DICT_CLASSIFICATIONS:
-            year, criterion = tmp_year, tmp_criterion
-            if _DICT_CLASSIFICATIONS[year] in dict_final_targets:
-                dict_final_targets[year].append(criterion)
-            else:
-                dict_final_targets[year] = [criterion]
-        elif tmp_criterion in _DICT_CLASSIFICATIONS:
-            year, criterion = tmp_criterion, tmp_year
-            if _DICT_CLASSIFICATIONS[year] in dict_final_targets:
-                dict_final_targets[year].append(criterion)
+            if list_contents == ['']:
+                metrics.increment('rows_skipped_blank')
+                continue
             else:
-                dict_final_targets[year] = [criterion]
+                metrics.increment('lab_rows')
+                if pending is None:
+                    raise IndexError('Lab row without a course.')
+                elif pending['lab'] is None:
+                    pending['lab'] = list_contents
+                else:
+                    raise NotImplementedError('Lab already exists.')
+
+    if pending is not None:
+        yield pending
+
+
+def _parse_status(str_status) -> Tuple[str, str]:
+    '''Parses the status cell of a row, e.g. `12/25` or `25/25 Full`.
+
+    Returns:
+        status [tuple]: (enrolled, capacity), or (None, None) if the cell is empty.
+    '''
+
+    list_statuses = str_status.split()
+    enrolled = None
+    capacity = None
+    if len(list_statuses) == 1:
+        list_enrollments = list_statuses[0].split('/')
+        enrolled = list_enrollments[0]
+        capacity = list_enrollments[1]
+    elif len(list_statuses) == 2:
+        list_enrollments = list_statuses[0].split('/')
+        # fill = list_statuses[1]
+        enrolled = list_enrollments[0]
+        capacity = list_enrollments[1]
+    return enrolled, capacity
+
+
+def _split_department_course(department_course) -> Tuple[str, str]:
+    '''Splits the 'Dept Crse' cell, e.g. `UNIV 109A`, into (department, course).'''
+
+    list_words = department_course.split()
+    return ' '.join(list_words[:-1]), list_words[-1]
+
+
+# Cells of a course row and of a lab row. Values are converted by `Course` and `Lab`.
+_COURSE_SCHEMA = RowSchema([
+    Field('soc_number', Cell(0)),
+    Field(('department', 'course'), Cell(1), convert=_split_department_course),
+    Field('description', Cell(2)),
+    Field('credit', Cell(3)),
+    Field('method', Cell(4)),
+    Field('time_days', Cell(5)),
+    Field('area', Cell(6)),
+    Field('competency', Cell(7)),
+    Field('interdisciplinary_program', Cell(8)),
+    Field('pass_fail', Cell(9)),
+    Field(('enrolled', 'capacity'), Cell(10), convert=_parse_status),
+    Field('instructor', Cell(11, line=0)),
+    Field('room', Cell(11, line=1)),
+])
+
+_LAB_SCHEMA = RowSchema([
+    Field('course', Cell(1)),
+    Field('description', Cell(2)),
+    Field('time_days', Cell(5)),
+    Field('room', Cell(10)),
+])
+
+
+def _build_course(pending, dict_course_notes, metrics=NULL_METRICS, resolver=None) -> Course:
+    '''Builds a course and its lab from a pending course.
+
+    Args:
+        pending [dict]: Pending course from `_iter_pending_courses`.
+        dict_course_notes [dict]: Notes of the course's note page, or None if it has none.
+        metrics [scrape.metrics.Metrics]: Times the 'schedules' and 'codes' stages.
+        resolver [depauw_courses.notes.NotesResolver]: Resolves the restrictions on first access instead.
+
+    Returns:
+        course [Course]: Course.
+    '''
+
+    dict_fields = _COURSE_SCHEMA.record(pending['contents'])
+    soc_number = dict_fields['soc_number']
+
+    with metrics.stage('schedules'):
+        schedule = parse_schedule(dict_fields.pop('time_days'))
+
+    dict_notes = {}
+    if dict_course_notes is not None:
+        dict_notes[soc_number] = dict_course_notes
+
+    with metrics.stage('codes'):
+        if resolver is not None:
+            dict_restrictions = LazyRestrictions(codes=parse_restrictions(' '.join(pending['restrictions'])),
+                                                 notes_link=pending['notes_link'],
+                                                 resolver=resolver)
         else:
-            raise NotImplementedError(f'ERROR1 in _organize_priorities:\nkey:{tmp_year}, value: {tmp_criterion}')
-    elif len(str_target.split()) == 3:
-        list_target = str_target.split()
-        year, criterion = list_target[0], list_target[1:]
-        if _DICT_CLASSIFICATIONS[year] in dict_final_targets:
-            dict_final_targets[year].append(criterion)
+            dict_restrictions = {}
+            _collect_restrictions(list_restrictions=pending['restrictions'],
+                                  soc_number=soc_number,
+                                  dict_notes=dict_notes,
+                                  dict_restrictions=dict_restrictions)
+
+        dict_priorities = {}
+        _collect_priorities(list_priorities=pending['priorities'], dict_priorities=dict_priorities)
+
+    course = Course(schedule=schedule,
+                    restrictions=dict_restrictions,
+                    priorities=dict_priorities,
+                    book_link=pending['book_link'],
+                    **dict_fields)
+
+    if pending['lab'] is not None:
+        dict_lab_fields = _LAB_SCHEMA.record(pending['lab'])
+        with metrics.stage('schedules'):
+            lab_schedule = parse_schedule(dict_lab_fields.pop('time_days'))
+        course.lab = Lab(schedule=lab_schedule, **dict_lab_fields)
+
+    return course
+
+
+def _iter_courses_from_rows(rows,
+                            max_workers: int = _NOTES_MAX_WORKERS,
+                            session=None,
+                            cache=None,
+                            metrics=NULL_METRICS,
+                            reuse=None,
+                            resolver=None):
+    '''Builds courses from course table rows while their note pages download.
+
+    Note pages are fetched by a bounded worker pool as soon as their rows are
+    read. At most `2 * max_workers` courses wait for their notes, so memory
+    stays flat however long the table is.
+
+    Args:
+        rows [iterable]: Rows from `_iter_driver_rows` or `_iter_html_rows`.
+        max_workers [int]: Maximum number of note pages in flight.
+        session [scrape.scheduler.FetchScheduler]: Scheduler (or session) used for the note pages.
+            A pooled one is created if None.
+        cache [scrape.http_cache.HttpCache]: Response cache for the note pages.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters.
+        reuse [callable]: Called with every pending course. Returns an already built course to yield
+            instead, skipping its note page, or None to build it.
+        resolver [depauw_courses.notes.NotesResolver]: Leaves the note pages to this resolver, which
+            fetches them when restrictions are first read. They are fetched here if None.
+
+    Yields:
+        course [Course]: Course in table order, with its lab attached.
+    '''
+
+    own_session = session is None
+    if own_session:
+        session = _new_scheduler(max_workers=max_workers, metrics=metrics)
+
+    window_size = 2 * max_workers
+    deque_window = deque()
+    dict_in_flight = {}  # notes link -> [future, number of waiting courses]
+
+    def _pop():
+        pending, notes_link, reused = deque_window.popleft()
+        if reused is not None:
+            metrics.increment('courses_reused')
+            return reused
+
+        if notes_link is None:
+            dict_course_notes = None
         else:
-            dict_final_targets[year] = [criterion]
-    else:
-        raise NotImplementedError(f'Error2 in _organize_priorities: {str_target}')
+            in_flight = dict_in_flight[notes_link]
+            in_flight[1] -= 1
+            if in_flight[1] == 0:
+                del dict_in_flight[notes_link]
+
+            with metrics.stage('notes_wait'):
+                dict_course_notes = in_flight[0].result()
+
+        with metrics.stage('course_build'):
+            course = _build_course(pending, dict_course_notes=dict_course_notes, metrics=metrics, resolver=resolver)
+        metrics.increment('courses_built')
+        return course
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
 
-    return dict_final_targets
+    try:
+        for pending in _iter_pending_courses(rows, metrics=metrics):
+            reused = reuse(pending) if reuse is not None else None
+            notes_link = pending['notes_link'] if reused is None and resolver is None else None
+            if notes_link:
+                if notes_link in dict_in_flight:
+                    dict_in_flight[notes_link][1] += 1
+                    metrics.increment('notes_deduplicated')
+                else:
+                    future = executor.submit(_explore_notes,
+                                             url=notes_link,
+                                             session=session,
+                                             cache=cache,
+                                             metrics=metrics)
+                    dict_in_flight[notes_link] = [future, 1]
+            else:
+                notes_link = None
+
+            deque_window.append((pending, notes_link, reused))
+
+            while len(deque_window) > window_size:
+                yield _pop()
+
+        while deque_window:
+            yield _pop()
+    finally:
+        for future, _ in dict_in_flight.values():
+            future.cancel()
+        executor.shutdown(wait=True)
+        if own_session:
+            session.close()
+
+
+def iter_courses(mode: str = _MODE_BROWSER,
+                 max_workers: int = _NOTES_MAX_WORKERS,
+                 cache=None,
+                 metrics=None,
+                 selection=None,
+                 driver=None,
+                 reuse=None,
+                 scheduler=None,
+                 lazy_notes: bool = False):
+    '''Scrapes the schedule of courses, yielding each course as soon as it is built.
+
+    Unlike `entry_point`, errors are raised to the caller.
+
+    Args:
+        mode [str]: How the course table is read.
+            'browser': Reads every cell through WebDriver.
+            'page_source': Submits the form in Chrome and parses the page's HTML once.
+            'requests': Submits the form over plain HTTP without starting a browser.
+        max_workers [int]: Maximum number of note pages fetched concurrently.
+        cache [scrape.http_cache.HttpCache]: Response cache for the note pages.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters. Nothing is recorded if None.
+        selection [dict]: SOC form field values overriding the defaults, e.g. {'term': '202120', 'dept': 'CSC'}.
+            Only `select` fields can be set in the browser modes.
+        driver [selenium.webdriver.Chrome]: Chrome to reuse in the browser modes. It is left running.
+            A new one is started and quit if None.
+        reuse [callable]: Called with every pending course. Returns an already built course to yield
+            instead, skipping its note page, or None to build it. See `depauw_courses.snapshot`.
+        scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP requests within per-host rate limits,
+            with timeouts and retries. One allowing `max_workers` concurrent requests is created if None.
+        lazy_notes [bool]: Skips the note pages while scraping. Each course's restrictions are then
+            resolved on first access, and the first access fetches the note pages of every course scraped
+            so far in one batch. Runs that never read restrictions make no note page requests.
+
+    Yields:
+        course [Course]: Course in table order, with its lab attached and `selection` set to the
+            selection's field values if one was given.
+    '''
+
+    if mode not in _MODES:
+        raise ValueError(f'Unknown mode: {mode}')
+
+    if metrics is None:
+        metrics = NULL_METRICS
 
+    return _iter_courses(mode=mode,
+                         max_workers=max_workers,
+                         cache=cache,
+                         metrics=metrics,
+                         selection=selection,
+                         driver=driver,
+                         reuse=reuse,
+                         scheduler=scheduler,
+                         lazy_notes=lazy_notes)
 
-def entry_point():
-    '''Entry point.'''
 
-    driver = webdriver.Chrome(executable_path=_CHROME_DRIVER_PATH)
-    # driver.implicitly_wait(10)
-    driver.get(_SOC_VIEW_URL)
+def _iter_courses(mode, max_workers, cache, metrics, selection, driver, reuse, scheduler, lazy_notes):
+    own_driver = driver is None
+    own_scheduler = scheduler is None
+    if own_scheduler:
+        scheduler = _new_scheduler(max_workers=max_workers, metrics=metrics)
+
+    # The resolver outlives this generator, so it only shares a scheduler the caller owns
+    resolver = NotesResolver(fetch=_explore_notes,
+                             max_workers=max_workers,
+                             cache=cache,
+                             metrics=metrics,
+                             scheduler=None if own_scheduler else scheduler) if lazy_notes else None
 
     try:
-        # Move to the course list page
-        submit_button = driver.find_element_by_xpath("//input[@name='submit' and @value='Submit']")
-        submit_button.click()
+        if mode == _MODE_REQUESTS:
+            with metrics.stage('soc_fetch'):
+                chunks = _submit_soc_form(session=scheduler, selection=selection, stream=True)
+            rows = _iter_html_rows(chunks, metrics=metrics)
+        else:
+            with metrics.stage('browser_start'):
+                if own_driver:
+                    driver = _new_driver()
+                # driver.implicitly_wait(10)
+                driver.get(_SOC_VIEW_URL)
+
+            # Move to the course list page
+            with metrics.stage('soc_fetch'):
+                _select_soc_form(driver, selection)
+                submit_button = driver.find_element_by_xpath("//input[@name='submit' and @value='Submit']")
+                submit_button.click()
+
+            if mode == _MODE_PAGE_SOURCE:
+                with metrics.stage('page_source'):
+                    html = driver.page_source
+                rows = _iter_html_rows(html, metrics=metrics)
+            else:
+                rows = _iter_driver_rows(driver, metrics=metrics)
+
+        courses = _iter_courses_from_rows(rows,
+                                          max_workers=max_workers,
+                                          session=scheduler,
+                                          cache=cache,
+                                          metrics=metrics,
+                                          reuse=reuse,
+                                          resolver=resolver)
+        for course in courses:
+            if selection is not None:
+                course.selection = dict(selection)
+            yield course
+    finally:
+        if own_scheduler:
+            scheduler.close()
+        if own_driver and driver is not None:
+            driver.quit()
+
 
-        # Get a table with courses listed
-        list_tables = driver.find_elements_by_tag_name('table')
-        table = list_tables[2]
+def entry_point(mode: str = _MODE_BROWSER,
+                max_workers: int = _NOTES_MAX_WORKERS,
+                cache=None,
+                metrics=None,
+                browser=None,
+                scheduler=None,
+                lazy_notes: bool = False):
+    '''Entry point.
 
-        # Get a list of courses
-        list_trs = table.find_elements_by_tag_name('tr')
+    Args:
+        mode [str]: How the course table is read. See `iter_courses`.
+        max_workers [int]: Maximum number of note pages fetched concurrently.
+        cache [scrape.http_cache.HttpCache]: Response cache for the note pages.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters, and is flushed
+            to its sinks at the end of the run. Nothing is recorded if None.
+        browser [depauw_courses.browser.BrowserSession]: Warm Chrome reused by the browser modes.
+            A new Chrome is started and quit if None.
+        scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP requests. See `iter_courses`.
+        lazy_notes [bool]: Resolves restrictions on first access. See `iter_courses`.
 
-        list_courses = []
+    Returns:
+        list_courses [list]: A list of courses.
+    '''
 
-        for _, tr in enumerate(list_trs[2:]):  # Avoid 2 header lines
-            list_tds = tr.find_elements_by_tag_name('td')
-            list_contents = [td.text for td in list_tds]
+    if metrics is None:
+        metrics = NULL_METRICS
 
-            if tr.get_property('attributes'):
-                if list_contents[0] == '':
-                    pass
-                else:
-                    soc_number = list_contents[0]
-                    print('soc_number:', soc_number)
-
-                    department_course = list_contents[1]
-                    department_abbrev = ' '.join(department_course.split()[:-1])
-                    course_abbrev = department_course.split()[-1]
-
-                    description = list_contents[2]
-                    credit = list_contents[3]
-                    method = list_contents[4]
-
-                    str_time_days = list_contents[5]
-                    dict_schedules = _organize_schedules(str_time_days=str_time_days)
-
-                    area = list_contents[6]
-                    competency = list_contents[7]
-                    interdisciplinary_program = list_contents[8]
-                    pass_fail = list_contents[9]
-
-                    list_statuses = list_contents[10].split()
-                    enrolled = None
-                    capacity = None
-                    if len(list_statuses) == 1:
-                        list_enrollments = list_statuses[0].split('/')
-                        enrolled = list_enrollments[0]
-                        capacity = list_enrollments[1]
-                    elif len(list_statuses) == 2:
-                        list_enrollments = list_statuses[0].split('/')
-                        # fill = list_statuses[1]
-                        enrolled = list_enrollments[0]
-                        capacity = list_enrollments[1]
-
-                    list_instructor_room = list_contents[11].split('\n')
-                    instructor = list_instructor_room[0]
-                    room = list_instructor_room[1]
-
-                    notes = list_contents[12].split('\n')
-                    str_restrictions = notes[0].strip()
-                    list_restrictions = str_restrictions.split()
-                    if len(notes) < 2:
-                        list_priorities = []
-                    else:
-                        list_priorities = notes[1].strip().split('/')
-
-                    notes_link = None
-                    dict_notes = {}
-                    try:
-                        list_links = tr.find_element_by_link_text(str_restrictions)
-                        for link in list_links.get_property('attributes'):
-                            if link['nodeName'] == 'href':
-                                notes_link = _SOC_VIEW_URL + link['value']
-                                dict_notes[soc_number] = _explore_notes(url=notes_link)
-                                break
-                    except NoSuchElementException:
-                        continue
-
-                    dict_restrictions = {}
-                    _collect_restrictions(list_restrictions=list_restrictions,
-                                          soc_number=soc_number,
-                                          dict_notes=dict_notes,
-                                          dict_restrictions=dict_restrictions)
-
-                    dict_priorities = {}
-                    _collect_priorities(list_priorities=list_priorities, dict_priorities=dict_priorities)
-
-                    book_link = None
-                    try:
-                        list_links = tr.find_element_by_link_text(department_course)
-                        for link in list_links.get_property('attributes'):
-                            if link['nodeName'] == 'href':
-                                book_link = _DEPAUW_URL + link['value']
-                                break
-                    except NoSuchElementException:
-                        break
-
-                    course = Course(soc_number=soc_number,
-                                    department=department_abbrev,
-                                    course=course_abbrev,
-                                    description=description,
-                                    credit=credit,
-                                    method=method,
-                                    schedule=dict_schedules,
-                                    area=area,
-                                    competency=competency,
-                                    interdisciplinary_program=interdisciplinary_program,
-                                    pass_fail=pass_fail,
-                                    enrolled=enrolled,
-                                    capacity=capacity,
-                                    instructor=instructor,
-                                    room=room,
-                                    restrictions=dict_restrictions,
-                                    priorities=dict_priorities,
-                                    book_link=book_link)
-                    list_courses.append(course)
+    list_courses = []
+    try:
+        with metrics.stage('total'):
+            # The session claims its Chrome, which may fail to start, when called
+            if browser is not None and mode != _MODE_REQUESTS:
+                courses = browser.iter_courses(mode=mode,
+                                               max_workers=max_workers,
+                                               cache=cache,
+                                               metrics=metrics,
+                                               scheduler=scheduler,
+                                               lazy_notes=lazy_notes)
             else:
-                if list_contents == ['']:
-                    continue
-                else:
-                    course = list_contents[1]
-                    description = list_contents[2]
-
-                    str_time_days = list_contents[5]
-                    dict_schedules = _organize_schedules(str_time_days=str_time_days)
-
-                    room = list_contents[10]
-
-                    if list_courses[-1].lab is None:
-                        lab = Lab(course=course,
-                                  description=description,
-                                  schedule=dict_schedules,
-                                  room=room)
-                        list_courses[-1].lab = lab
-                    else:
-                        raise NotImplementedError('Lab already exists.')
+                courses = iter_courses(mode=mode,
+                                       max_workers=max_workers,
+                                       cache=cache,
+                                       metrics=metrics,
+                                       scheduler=scheduler,
+                                       lazy_notes=lazy_notes)
+
+            for course in courses:
+                list_courses.append(course)
     except:
-        pass
+        _LOGGER.exception('Scraping failed after %d courses', len(list_courses))
+        metrics.increment('errors')
+        metrics.increment('courses_discarded_by_error', len(list_courses))
     else:
         return list_courses
     finally:
-        driver.quit()
+        metrics.flush()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,168 @@
+'''Lazy resolution of restriction codes against course note pages.
+
+A restriction code such as `3` refers to the third note of the course's note
+page. With lazy notes, a course keeps its parsed codes in a
+`LazyRestrictions` and no note page is fetched while scraping. The first
+time any course's restrictions are read, the `NotesResolver` fetches every
+note page registered so far in one concurrent batch, once, so consumers
+that only read schedules or enrollment never touch the note pages.
+
+Pickling keeps restrictions that were not read yet unresolved: the resolver
+is pickled with its fetch function, the notes it already holds and the
+links still pending, but without its cache, metrics or scheduler, which
+belong to the process that scraped. The unpickled copy fetches the missing
+note pages on first access like the original would have, with a scheduler
+of its own.
+'''
+
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from scrape.metrics import NULL_METRICS
+from scrape.scheduler import FetchScheduler
+
+_NOTES_MAX_WORKERS = 8
+
+
+class NotesResolver(object):
+    '''Fetches note pages in batches on first use and keeps them.
+
+    Attributes:
+        max_workers: Maximum number of note pages fetched concurrently.
+    '''
+
+    def __init__(self, fetch, max_workers: int = _NOTES_MAX_WORKERS, cache=None, metrics=None, scheduler=None) -> None:
+        '''
+        Args:
+            fetch [callable]: Fetches and parses one note page, called as
+                `fetch(url=url, session=scheduler, cache=cache, metrics=metrics)`.
+            max_workers [int]: Maximum number of note pages fetched concurrently.
+            cache [scrape.http_cache.HttpCache]: Response cache for the note pages.
+            metrics [scrape.metrics.Metrics]: Receives fetches and counters.
+            scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP requests. One is created per batch if None.
+        '''
+
+        self.max_workers = max_workers
+
+        self._fetch = fetch
+        self._cache = cache
+        self._metrics = metrics if metrics is not None else NULL_METRICS
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._dict_notes = {}  # notes link -> notes
+        self._dict_pending = {}  # notes links registered but not fetched yet, in registration order
+
+    def register(self, url) -> None:
+        '''Adds a note page to the next batch.'''
+
+        with self._lock:
+            if url not in self._dict_notes:
+                self._dict_pending[url] = None
+
+    def notes(self, url) -> dict:
+        '''Returns the notes of a note page, fetching every registered page first if it is missing.'''
+
+        with self._lock:
+            if url not in self._dict_notes:
+                self._dict_pending[url] = None
+                self._fetch_pending()
+            return self._dict_notes[url]
+
+    def __len__(self) -> int:
+        return len(self._dict_notes)
+
+    def __getstate__(self) -> dict:
+        # The lock, cache, metrics and scheduler stay with this process
+        with self._lock:
+            return {
+                'fetch': self._fetch,
+                'max_workers': self.max_workers,
+                'dict_notes': dict(self._dict_notes),
+                'list_pending': list(self._dict_pending)
+            }
+
+    def __setstate__(self, dict_state) -> None:
+        self.__init__(dict_state['fetch'], max_workers=dict_state['max_workers'])
+        self._dict_notes.update(dict_state['dict_notes'])
+        self._dict_pending.update(dict.fromkeys(dict_state['list_pending']))
+
+    def _fetch_pending(self) -> None:
+        list_urls = list(self._dict_pending)
+        self._metrics.increment('notes_batches')
+
+        own_scheduler = self._scheduler is None
+        scheduler = FetchScheduler(max_concurrency=self.max_workers,
+                                   pool_size=self.max_workers,
+                                   metrics=self._metrics) if own_scheduler else self._scheduler
+
+        def fetch(url):
+            return self._fetch(url=url, session=scheduler, cache=self._cache, metrics=self._metrics)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list_notes = list(executor.map(fetch, list_urls))
+        finally:
+            if own_scheduler:
+                scheduler.close()
+
+        for url, dict_course_notes in zip(list_urls, list_notes):
+            self._dict_notes[url] = dict_course_notes
+            del self._dict_pending[url]
+
+
+class LazyRestrictions(Mapping):
+    '''Restrictions of a course, resolved against its note page on first access.
+
+    Reads like the dictionary of restrictions it resolves to. Pickling
+    stores the plain dictionary once resolved, and the codes, note link and
+    resolver otherwise, so pickling never fetches a note page.
+
+    Attributes:
+        codes: Parsed restriction codes (`depauw_courses.codes.RestrictionCodes`).
+        notes_link: Link of the course's note page, or None if it has none.
+    '''
+
+    __slots__ = ('codes', 'notes_link', '_resolver', '_dict')
+
+    def __init__(self, codes, notes_link, resolver) -> None:
+        self.codes = codes
+        self.notes_link = notes_link
+        self._resolver = resolver
+        self._dict = None
+
+        if codes.needs_notes and notes_link:
+            resolver.register(notes_link)
+
+    @property
+    def resolved(self) -> bool:
+        return self._dict is not None
+
+    def _restrictions(self) -> dict:
+        if self._dict is None:
+            if self.codes.needs_notes:
+                if not self.notes_link:
+                    raise KeyError('Restrictions refer to notes but the course has no note page')
+                dict_course_notes = self._resolver.notes(self.notes_link)
+            else:
+                dict_course_notes = None
+            self._dict = self.codes.resolve(dict_course_notes)
+            self._resolver = None
+        return self._dict
+
+    def __getitem__(self, key):
+        return self._restrictions()[key]
+
+    def __iter__(self):
+        return iter(self._restrictions())
+
+    def __len__(self) -> int:
+        return len(self._restrictions())
+
+    def __repr__(self) -> str:
+        return repr(self._restrictions())
+
+    def __reduce__(self):
+        if self._dict is not None:
+            return dict, (self._dict,)
+        return LazyRestrictions, (self.codes, self.notes_link, self._resolver)
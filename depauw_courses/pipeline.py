@@ -0,0 +1,176 @@
+'''Scrapes SOC form selections as a pipeline that overlaps fetching with parsing.
+
+    selection -> fetch_soc (threads) -> parse_soc (processes) -> fetch_notes (threads)
+              -> build (processes) -> sink
+
+Course pages of several selections (see `depauw_courses.crawl.soc_selections`)
+download while earlier ones are parsed in worker processes, note pages
+download while courses are built, and the sink writes courses as they are
+ready:
+
+    with NdjsonWriter('courses.ndjson') as writer:
+        run(soc_selections(('term', 'dept')), sink=writer)
+
+Courses arrive in completion order. Note pages shared by several courses are
+fetched once per run.
+'''
+
+from concurrent.futures import Future
+import threading
+
+from depauw_courses.main import (_NOTES_MAX_WORKERS, _build_course, _explore_notes, _iter_html_rows,
+                                 _iter_pending_courses, _new_scheduler, _submit_soc_form)
+from scrape.metrics import NULL_METRICS
+from scrape.pipeline import Pipeline, Stage, default_processes
+
+_MAX_PAGES_IN_FLIGHT = 2  # Course list pages, which are large, fetched at a time
+
+
+def _parse_soc(item, metrics=NULL_METRICS) -> list:
+    '''Reads the pending courses of (selection, course list page). Runs in a worker process.'''
+
+    selection, html = item
+    list_pending = list(_iter_pending_courses(_iter_html_rows(html, metrics=metrics), metrics=metrics))
+    for pending in list_pending:
+        pending['selection'] = selection
+    return list_pending
+
+
+def _build(item, metrics=NULL_METRICS):
+    '''Builds a course from (pending course, notes). Runs in a worker process.'''
+
+    pending, dict_course_notes = item
+    with metrics.stage('course_build'):
+        course = _build_course(pending, dict_course_notes=dict_course_notes, metrics=metrics)
+    if pending['selection'] is not None:
+        course.selection = dict(pending['selection'])
+    metrics.increment('courses_built')
+    return course
+
+
+class _SocFetcher(object):
+    '''Submits the SOC form of a selection and returns (selection, course list page).'''
+
+    def __init__(self, scheduler) -> None:
+        self._scheduler = scheduler
+
+    def __call__(self, selection, metrics=NULL_METRICS) -> tuple:
+        with metrics.stage('soc_fetch'):
+            return selection, _submit_soc_form(session=self._scheduler, selection=selection)
+
+
+class _NotesFetcher(object):
+    '''Pairs pending courses with their notes, fetching each note page once.'''
+
+    def __init__(self, scheduler, cache) -> None:
+        self._scheduler = scheduler
+        self._cache = cache
+
+        self._lock = threading.Lock()
+        self._dict_futures = {}  # notes link -> Future of its notes
+
+    def __call__(self, pending, metrics=NULL_METRICS) -> tuple:
+        notes_link = pending['notes_link']
+        if not notes_link:
+            return pending, None
+
+        with self._lock:
+            future = self._dict_futures.get(notes_link)
+            own_future = future is None
+            if own_future:
+                future = self._dict_futures[notes_link] = Future()
+
+        if own_future:
+            try:
+                future.set_result(_explore_notes(url=notes_link,
+                                                 session=self._scheduler,
+                                                 cache=self._cache,
+                                                 metrics=metrics))
+            except BaseException as e:
+                future.set_exception(e)
+        else:
+            metrics.increment('notes_deduplicated')
+
+        with metrics.stage('notes_wait'):
+            return pending, future.result()
+
+
+def _new_pipeline(scheduler, max_workers, max_processes, queue_size, cache, metrics) -> Pipeline:
+    if max_processes is None:
+        max_processes = default_processes()
+    n_cpu_workers = max(1, max_processes)  # Items in flight in the process pool per stage
+
+    return Pipeline([Stage('fetch_soc', _SocFetcher(scheduler), workers=_MAX_PAGES_IN_FLIGHT, metrics=True),
+                     Stage('parse_soc', _parse_soc, workers=n_cpu_workers, processes=True, flat=True, metrics=True),
+                     Stage('fetch_notes', _NotesFetcher(scheduler, cache), workers=max_workers, metrics=True),
+                     Stage('build', _build, workers=n_cpu_workers, processes=True, metrics=True)],
+                    queue_size=queue_size,
+                    max_processes=max_processes,
+                    metrics=metrics)
+
+
+def iter_courses(selections=(None,),
+                 max_workers: int = _NOTES_MAX_WORKERS,
+                 max_processes: int = None,
+                 queue_size: int = None,
+                 cache=None,
+                 metrics=None,
+                 scheduler=None):
+    '''Scrapes SOC form selections through the pipeline, yielding courses as they are built.
+
+    Args:
+        selections [iterable]: Form field values of each course list page, e.g. from
+            `depauw_courses.crawl.soc_selections`. None submits the form's defaults.
+        max_workers [int]: Maximum number of note pages fetched concurrently.
+        max_processes [int]: Worker processes parsing pages and building courses. Defaults to one per
+            CPU, or none on a single CPU. Everything runs in threads if 0.
+        queue_size [int]: Maximum number of items waiting between two stages. Defaults to `2 * max_workers`.
+        cache [scrape.http_cache.HttpCache]: Response cache for the note pages.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters, those of the
+            worker processes included. Nothing is recorded if None.
+        scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP requests. One is created if None.
+
+    Yields:
+        course [depauw_courses.main.Course]: Course, with its lab attached and `selection` set, in completion order.
+    '''
+
+    if metrics is None:
+        metrics = NULL_METRICS
+
+    own_scheduler = scheduler is None
+    if own_scheduler:
+        scheduler = _new_scheduler(max_workers=max_workers + _MAX_PAGES_IN_FLIGHT, metrics=metrics)
+
+    pipeline = _new_pipeline(scheduler=scheduler,
+                             max_workers=max_workers,
+                             max_processes=max_processes,
+                             queue_size=queue_size or 2 * max_workers,
+                             cache=cache,
+                             metrics=metrics)
+
+    try:
+        yield from pipeline.iter_results(selections)
+    finally:
+        if own_scheduler:
+            scheduler.close()
+
+
+def run(selections, sink, **kwargs) -> int:
+    '''Scrapes SOC form selections through the pipeline into a sink.
+
+    Args:
+        selections [iterable]: Form field values of each course list page. See `iter_courses`.
+        sink: Object with a `write(course)` (e.g. `scrape.export.NdjsonWriter`), or a callable.
+        **kwargs: Other arguments of `iter_courses`.
+
+    Returns:
+        n_courses [int]: Courses written to the sink.
+    '''
+
+    write = sink.write if hasattr(sink, 'write') else sink
+
+    n_courses = 0
+    for course in iter_courses(selections, **kwargs):
+        write(course)
+        n_courses += 1
+    return n_courses
@@ -0,0 +1,183 @@
+'''Parses SOC meeting times such as `10:00-11:00 MWF` or `7:00-9:00 PM R`.
+
+A term has only a few dozen distinct time/day strings, so `parse_schedule`
+memoizes them and every course meeting at the same time shares one immutable
+`Schedule`. A `Schedule` reads like the dictionary `_organize_schedules` used
+to build (`{'Monday': [{'start': time, 'end': time}], ...}`) and also exposes
+its meetings as minutes-of-week intervals.
+'''
+
+from collections.abc import Mapping
+from datetime import time
+from functools import lru_cache
+
+_DICT_DAYS = {
+    'M': 'Monday',
+    'T': 'Tuesday',
+    'W': 'Wednesday',
+    'R': 'Thursday',
+    'F': 'Friday',
+    'S': 'Saturday'
+}
+
+_LIST_DAYS = list(_DICT_DAYS.values())
+_DICT_DAY_INDICES = {day: index for index, day in enumerate(_LIST_DAYS)}
+_DICT_LETTER_INDICES = {letter: _DICT_DAY_INDICES[day] for letter, day in _DICT_DAYS.items()}
+
+_MINUTES_PER_DAY = 24 * 60
+_NOON = 12 * 60
+_EARLIEST_MORNING = 7 * 60  # Earlier times without PM are afternoon times
+
+_SCHEDULE_CACHE_SIZE = 1024
+
+
+class Schedule(Mapping):
+    '''Stores the weekly meetings of a course or lab.
+
+    Maps day names to lists of `{'start': time, 'end': time}`, the shape
+    `_organize_schedules` returns. Instances are immutable and shared.
+
+    Attributes:
+        intervals: A tuple of (start, end) minutes of the week. Monday 0:00 is 0.
+    '''
+
+    __slots__ = ('_intervals',)
+
+    def __init__(self, intervals=()) -> None:
+        self._intervals = tuple(intervals)
+
+    @classmethod
+    def from_dict(cls, dict_schedules) -> 'Schedule':
+        '''Builds a schedule from an `_organize_schedules` dictionary, times given as `time` or ISO strings.'''
+
+        if isinstance(dict_schedules, Schedule):
+            return dict_schedules
+
+        list_intervals = []
+        for day, list_times in dict_schedules.items():
+            offset = _DICT_DAY_INDICES[day] * _MINUTES_PER_DAY
+            for dict_time in list_times:
+                start, end = _as_time(dict_time['start']), _as_time(dict_time['end'])
+                list_intervals.append((offset + start.hour * 60 + start.minute,
+                                       offset + end.hour * 60 + end.minute))
+        return cls(list_intervals)
+
+    @property
+    def intervals(self) -> tuple:
+        return self._intervals
+
+    def as_dict(self) -> dict:
+        '''Returns a mutable copy in the `_organize_schedules` dictionary shape.'''
+
+        return {day: self[day] for day in self}
+
+    def __getitem__(self, day) -> list:
+        day_index = _DICT_DAY_INDICES[day]
+        list_times = [{'start': _to_time(start - day_index * _MINUTES_PER_DAY),
+                       'end': _to_time(end - day_index * _MINUTES_PER_DAY)}
+                      for start, end in self._intervals if start // _MINUTES_PER_DAY == day_index]
+        if not list_times:
+            raise KeyError(day)
+        return list_times
+
+    def __iter__(self):
+        list_days = []
+        for start, _ in self._intervals:
+            day = _LIST_DAYS[start // _MINUTES_PER_DAY]
+            if day not in list_days:
+                list_days.append(day)
+        return iter(list_days)
+
+    def __len__(self) -> int:
+        return len({start // _MINUTES_PER_DAY for start, _ in self._intervals})
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Schedule):
+            return self._intervals == other._intervals
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self) -> int:
+        return hash(self._intervals)
+
+    def __repr__(self) -> str:
+        return repr(self.as_dict())
+
+
+_EMPTY_SCHEDULE = Schedule()
+
+
+def _as_time(value) -> time:
+    return time.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _to_time(minutes) -> time:
+    return time(*divmod(minutes, 60))
+
+
+def _parse_minutes(str_time) -> int:
+    '''Parses `H:MM` or `HH:MM` into minutes after midnight.'''
+
+    str_hours, _, str_minutes = str_time.partition(':')
+    is_digits = str_time.isascii() and str_hours.isdigit() and str_minutes.isdigit()
+    if not is_digits or len(str_hours) > 2 or len(str_minutes) > 2:
+        raise ValueError(f"time data '{str_time}' does not match format '%H:%M'")
+
+    hours = int(str_hours)
+    minutes = int(str_minutes)
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"time data '{str_time}' does not match format '%H:%M'")
+
+    return hours * 60 + minutes
+
+
+@lru_cache(maxsize=_SCHEDULE_CACHE_SIZE)
+def parse_schedule(str_time_days) -> Schedule:
+    '''Parses a SOC meeting time string.
+
+    Times before 7:00 are taken as afternoon times; `PM` moves both times by
+    12 hours.
+
+    Args:
+        str_time_days [str]: Meeting times and days, e.g. `10:00-11:00 MWF`.
+
+    Returns:
+        schedule [Schedule]: Shared immutable schedule.
+    '''
+
+    list_time_days = str_time_days.split()
+
+    if len(list_time_days) == 1:
+        return _EMPTY_SCHEDULE
+    elif len(list_time_days) == 2:
+        list_time = list_time_days[0].split('-')
+        start = _parse_minutes(list_time[0])
+        if start < _EARLIEST_MORNING:
+            start += _NOON
+        end = _parse_minutes(list_time[1])
+        if end < _EARLIEST_MORNING:
+            end += _NOON
+        days = list_time_days[1]
+    elif len(list_time_days) == 3:
+        list_time = list_time_days[0].split('-')
+        am_pm = list_time_days[1]
+        days = list_time_days[2]
+
+        if am_pm == 'PM':
+            start = (_parse_minutes(list_time[0]) + _NOON) % _MINUTES_PER_DAY
+            end = (_parse_minutes(list_time[1]) + _NOON) % _MINUTES_PER_DAY
+        else:
+            raise NotImplementedError(f'Error in _organize_schedules: {am_pm}')
+    else:
+        raise NotImplementedError(f'Error in _organize_schedules: {list_time_days}')
+
+    list_intervals = []
+    list_day_indices = []
+    for day in days:
+        day_index = _DICT_LETTER_INDICES.get(day)
+        if day_index is None:
+            raise KeyError(day)
+        if day_index not in list_day_indices:
+            list_day_indices.append(day_index)
+            list_intervals.append((day_index * _MINUTES_PER_DAY + start, day_index * _MINUTES_PER_DAY + end))
+
+    return Schedule(list_intervals)
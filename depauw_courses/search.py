@@ -0,0 +1,39 @@
+'''Keyword search over courses.
+
+    index = CourseIndex(list_courses)
+    index.search('intro comp sci')  # Courses, best match first
+    index.update(list_new_courses)  # Sections already indexed are replaced
+
+A course is indexed under its SOC number with its description, department
+and course number, instructor and area, and the description of its lab.
+'''
+
+from scrape.search import TextIndex
+
+
+def _department_course(course) -> str:
+    return f'{course._department or ""} {course._course or ""}'
+
+
+def _lab_description(course) -> str:
+    return course.lab._description if course.lab is not None else ''
+
+
+class CourseIndex(TextIndex):
+    '''Inverted index of courses keyed by SOC number.
+
+    Attributes:
+        prefix: Whether query terms also match tokens they are a prefix of.
+        max_prefix_expansions: Maximum number of longer tokens a query term matches as a prefix. Unbounded if None.
+    '''
+
+    _FIELDS = (
+        ('description', lambda course: course._description, 3.0),
+        ('department', _department_course, 2.0),
+        ('instructor', lambda course: course._instructor, 2.0),
+        ('area', lambda course: course._area, 1.0),
+        ('lab', _lab_description, 1.0)
+    )
+
+    def _key(self, course):
+        return course._soc_number
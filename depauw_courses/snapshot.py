@@ -0,0 +1,234 @@
+'''Incremental scraping that emits only the sections that changed.
+
+A `SnapshotStore` keeps the courses of the last run keyed by SOC number,
+together with a hash of each row's raw cells. The next run compares every row
+with the store before building it:
+
+- unchanged rows reuse the stored course without fetching their note page,
+- rows whose only change is the status cell reuse the stored course with the
+  new enrollment and capacity,
+- other rows are built from scratch.
+
+`iter_deltas` then yields one `Delta` per added, removed or changed section,
+so polling during registration only pays for what moved.
+
+    store = SnapshotStore('soc.snapshot')
+    for delta in iter_deltas(store, mode='requests'):
+        print(delta)
+'''
+
+from collections import deque
+import copy
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from depauw_courses.main import _MODE_BROWSER, _int_validation, _parse_status, iter_courses
+
+_VERSION = 1
+
+_KIND_ADDED = 'added'
+_KIND_REMOVED = 'removed'
+_KIND_CHANGED = 'changed'
+
+_STATUS_CELL = 10
+
+# Compared between runs, in the order they are reported
+_FIELDS = ('_department', '_course', '_description', '_credit', '_method', '_schedule', '_area', '_competency',
+           '_interdisciplinary_program', '_pass_fail', '_enrolled', '_capacity', '_instructor', '_room',
+           '_restrictions', '_priorities', '_book_link')
+
+
+class Delta(object):
+    '''Stores one change between two runs.
+
+    Attributes:
+        kind: 'added', 'removed' or 'changed'.
+        soc_number: SOC number of the section.
+        course: New course, or the last known one if the section was removed.
+        changes: A dictionary of changed fields (without the leading underscore) to (old, new) values.
+            Empty unless the section changed.
+    '''
+
+    __slots__ = ('kind', 'soc_number', 'course', 'changes')
+
+    def __init__(self, kind, soc_number, course, changes=None) -> None:
+        self.kind = kind
+        self.soc_number = soc_number
+        self.course = course
+        self.changes = changes if changes is not None else {}
+
+    def __repr__(self) -> str:
+        if self.kind == _KIND_CHANGED:
+            return f'Delta({self.kind}, {self.soc_number}, {self.changes!r})'
+        return f'Delta({self.kind}, {self.soc_number})'
+
+
+class _Entry(object):
+    __slots__ = ('digest', 'status', 'course')
+
+    def __init__(self, digest, status, course) -> None:
+        self.digest = digest
+        self.status = status
+        self.course = course
+
+
+class SnapshotStore(object):
+    '''Stores the courses of the last run with a hash of their rows.
+
+    Attributes:
+        path: Pickle file the store is loaded from and saved to. Kept in memory only if None.
+    '''
+
+    def __init__(self, path=None) -> None:
+        self.path = path
+        self._dict_entries = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                dict_state = pickle.load(f)
+            if dict_state.get('version') == _VERSION:
+                self._dict_entries = {soc_number: _Entry(*entry)
+                                      for soc_number, entry in dict_state['entries'].items()}
+
+    def get(self, soc_number):
+        '''Returns the stored course of a SOC number, or None.'''
+
+        entry = self._dict_entries.get(soc_number)
+        return entry.course if entry is not None else None
+
+    def courses(self) -> list:
+        '''Returns the stored courses in the order they were last scraped.'''
+
+        return [entry.course for entry in self._dict_entries.values()]
+
+    def save(self) -> None:
+        '''Writes the store to `path` atomically.'''
+
+        if self.path is None:
+            return
+
+        dict_state = {
+            'version': _VERSION,
+            'entries': {soc_number: (entry.digest, entry.status, entry.course)
+                        for soc_number, entry in self._dict_entries.items()}
+        }
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(dict_state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def __contains__(self, soc_number) -> bool:
+        return soc_number in self._dict_entries
+
+    def __len__(self) -> int:
+        return len(self._dict_entries)
+
+
+def _row_digest(pending) -> str:
+    '''Hashes every raw cell of a pending course except its status cell.'''
+
+    list_contents = list(pending['contents'])
+    list_contents[_STATUS_CELL] = None
+    list_fields = [list_contents, pending['restrictions'], pending['priorities'],
+                   pending['notes_link'], pending['book_link'], pending['lab']]
+
+    return hashlib.sha1(json.dumps(list_fields).encode('utf-8')).hexdigest()
+
+
+def _with_status(course, str_status):
+    '''Copies a course with the enrollment and capacity of a new status cell.'''
+
+    enrolled, capacity = _parse_status(str_status)
+
+    course = copy.copy(course)
+    course._enrolled = _int_validation(enrolled)
+    course._capacity = _int_validation(capacity)
+    return course
+
+
+def _changes(old, new) -> dict:
+    dict_changes = {}
+    for field in _FIELDS:
+        old_value = getattr(old, field)
+        new_value = getattr(new, field)
+        if old_value != new_value:
+            dict_changes[field[1:]] = (old_value, new_value)
+
+    if repr(old.lab) != repr(new.lab):
+        dict_changes['lab'] = (old.lab, new.lab)
+
+    return dict_changes
+
+
+def iter_deltas(store, mode: str = _MODE_BROWSER, **kwargs):
+    '''Scrapes the schedule of courses, yielding only what changed since the store was saved.
+
+    Rows whose cells are unchanged reuse their stored course and skip their note
+    page. The store is updated and saved once the whole table has been read;
+    an interrupted run leaves it untouched. Scrape the same selection every
+    run, since sections missing from the table are reported as removed.
+
+    Args:
+        store [SnapshotStore]: Courses of the last run.
+        mode [str]: How the course table is read. See `depauw_courses.main.iter_courses`.
+        **kwargs: Other arguments of `depauw_courses.main.iter_courses`.
+
+    Yields:
+        delta [Delta]: Added and changed sections in table order, then removed sections.
+    '''
+
+    dict_rows = {}  # SOC number -> (digest, status) of rows read but not yet yielded
+
+    def _reuse(pending):
+        list_contents = pending['contents']
+        soc_number = _int_validation(list_contents[0])
+        digest = _row_digest(pending)
+        status = list_contents[_STATUS_CELL]
+        dict_rows.setdefault(soc_number, deque()).append((digest, status))
+
+        entry = store._dict_entries.get(soc_number)
+        if entry is None or entry.digest != digest:
+            return None
+        if entry.status == status:
+            return entry.course
+        return _with_status(entry.course, status)
+
+    dict_entries = {}
+    for course in iter_courses(mode=mode, reuse=_reuse, **kwargs):
+        soc_number = course._soc_number
+        digest, status = dict_rows[soc_number].popleft()
+        dict_entries[soc_number] = _Entry(digest, status, course)
+
+        entry = store._dict_entries.get(soc_number)
+        if entry is None:
+            yield Delta(_KIND_ADDED, soc_number, course)
+        elif entry.course is not course:
+            dict_changes = _changes(entry.course, course)
+            if dict_changes:
+                yield Delta(_KIND_CHANGED, soc_number, course, dict_changes)
+
+    for soc_number, entry in store._dict_entries.items():
+        if soc_number not in dict_entries:
+            yield Delta(_KIND_REMOVED, soc_number, entry.course)
+
+    store._dict_entries = dict_entries
+    store.save()
+
+
+def poll(store, mode: str = _MODE_BROWSER, **kwargs) -> list:
+    '''Scrapes the schedule of courses once and returns what changed. See `iter_deltas`.
+
+    Returns:
+        list_deltas [list]: A list of deltas.
+    '''
+
+    return list(iter_deltas(store, mode=mode, **kwargs))
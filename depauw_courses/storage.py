@@ -0,0 +1,243 @@
+'''Stores scraped courses in SQLite.
+
+One row per section is upserted into `courses` keyed by SOC number; labs,
+meetings, restrictions and priorities go into child tables that are replaced
+whenever their section is saved. Every save is a run, and `enrollments`
+keeps each run's enrollment and capacity, so a year of polls can be queried
+without scraping again.
+
+    with CourseStore('courses.sqlite3') as store:
+        store.save(list_courses)
+        store.enrollment_history(1003)
+'''
+
+from datetime import time
+
+from depauw_courses.schedule import _DICT_DAY_INDICES, _MINUTES_PER_DAY, Schedule
+from scrape.sqlite import SqliteStore, batches
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS courses (
+    soc_number INTEGER PRIMARY KEY,
+    department TEXT,
+    course TEXT,
+    description TEXT,
+    credit REAL,
+    method TEXT,
+    area TEXT,
+    competency TEXT,
+    interdisciplinary_program TEXT,
+    pass_fail TEXT,
+    enrolled INTEGER,
+    capacity INTEGER,
+    instructor TEXT,
+    room TEXT,
+    book_link TEXT,
+    first_seen_run INTEGER NOT NULL REFERENCES runs (run_id),
+    last_seen_run INTEGER NOT NULL REFERENCES runs (run_id)
+);
+CREATE INDEX IF NOT EXISTS courses_department ON courses (department, course);
+CREATE INDEX IF NOT EXISTS courses_instructor ON courses (instructor);
+
+CREATE TABLE IF NOT EXISTS labs (
+    soc_number INTEGER PRIMARY KEY REFERENCES courses (soc_number) ON DELETE CASCADE,
+    course TEXT,
+    description TEXT,
+    room TEXT
+);
+
+CREATE TABLE IF NOT EXISTS meetings (
+    soc_number INTEGER NOT NULL REFERENCES courses (soc_number) ON DELETE CASCADE,
+    is_lab INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS meetings_day_time ON meetings (day, start_minute, end_minute);
+CREATE INDEX IF NOT EXISTS meetings_soc_number ON meetings (soc_number);
+
+CREATE TABLE IF NOT EXISTS restrictions (
+    soc_number INTEGER NOT NULL REFERENCES courses (soc_number) ON DELETE CASCADE,
+    code TEXT NOT NULL,
+    value
+);
+CREATE INDEX IF NOT EXISTS restrictions_soc_number ON restrictions (soc_number);
+
+CREATE TABLE IF NOT EXISTS priorities (
+    soc_number INTEGER NOT NULL REFERENCES courses (soc_number) ON DELETE CASCADE,
+    priority TEXT NOT NULL,
+    target TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    criterion TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS priorities_soc_number ON priorities (soc_number);
+
+CREATE TABLE IF NOT EXISTS enrollments (
+    soc_number INTEGER NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    enrolled INTEGER,
+    capacity INTEGER,
+    PRIMARY KEY (soc_number, run_id)
+) WITHOUT ROWID;
+'''
+
+_SQL_UPSERT_COURSE = '''
+INSERT INTO courses (soc_number, department, course, description, credit, method, area, competency,
+                     interdisciplinary_program, pass_fail, enrolled, capacity, instructor, room, book_link,
+                     first_seen_run, last_seen_run)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (soc_number) DO UPDATE SET
+    department = excluded.department,
+    course = excluded.course,
+    description = excluded.description,
+    credit = excluded.credit,
+    method = excluded.method,
+    area = excluded.area,
+    competency = excluded.competency,
+    interdisciplinary_program = excluded.interdisciplinary_program,
+    pass_fail = excluded.pass_fail,
+    enrolled = excluded.enrolled,
+    capacity = excluded.capacity,
+    instructor = excluded.instructor,
+    room = excluded.room,
+    book_link = excluded.book_link,
+    last_seen_run = excluded.last_seen_run
+'''
+
+_SQL_DELETE_LAB = 'DELETE FROM labs WHERE soc_number = ?'
+_SQL_DELETE_MEETINGS = 'DELETE FROM meetings WHERE soc_number = ?'
+_SQL_DELETE_RESTRICTIONS = 'DELETE FROM restrictions WHERE soc_number = ?'
+_SQL_DELETE_PRIORITIES = 'DELETE FROM priorities WHERE soc_number = ?'
+
+_SQL_INSERT_LAB = 'INSERT INTO labs (soc_number, course, description, room) VALUES (?, ?, ?, ?)'
+_SQL_INSERT_MEETING = '''
+INSERT INTO meetings (soc_number, is_lab, day, start_minute, end_minute) VALUES (?, ?, ?, ?, ?)
+'''
+_SQL_INSERT_RESTRICTION = 'INSERT INTO restrictions (soc_number, code, value) VALUES (?, ?, ?)'
+_SQL_INSERT_PRIORITY = '''
+INSERT INTO priorities (soc_number, priority, target, position, criterion) VALUES (?, ?, ?, ?, ?)
+'''
+_SQL_UPSERT_ENROLLMENT = '''
+INSERT OR REPLACE INTO enrollments (soc_number, run_id, enrolled, capacity) VALUES (?, ?, ?, ?)
+'''
+
+_SQL_ENROLLMENT_HISTORY = '''
+SELECT runs.scraped_at, enrollments.enrolled, enrollments.capacity
+FROM enrollments JOIN runs USING (run_id)
+WHERE enrollments.soc_number = ?
+ORDER BY enrollments.run_id
+'''
+
+_SQL_MEETING_AT = '''
+SELECT DISTINCT soc_number FROM meetings
+WHERE day = ? AND start_minute <= ? AND end_minute > ?
+ORDER BY soc_number
+'''
+
+
+def _minutes(value) -> int:
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    return value
+
+
+def _meeting_rows(soc_number, schedule, is_lab) -> list:
+    list_rows = []
+    for start, end in Schedule.from_dict(schedule or {}).intervals:
+        day, start_minute = divmod(start, _MINUTES_PER_DAY)
+        list_rows.append((soc_number, is_lab, day, start_minute, end - day * _MINUTES_PER_DAY))
+    return list_rows
+
+
+def _criterion_text(criterion) -> str:
+    # A clause such as `SR MAJ MIN` keeps both criteria in one entry
+    return ' '.join(criterion) if isinstance(criterion, tuple) else criterion
+
+
+class CourseStore(SqliteStore):
+    '''Stores courses, their labs and their history in SQLite.
+
+    Attributes:
+        path: Database file, or ':memory:'.
+        batch_size: Courses written per transaction.
+    '''
+
+    _SCHEMA = _SCHEMA
+
+    def save(self, courses, scraped_at=None) -> int:
+        '''Saves the courses of one scrape as a new run.
+
+        Args:
+            courses [iterable]: Courses. Courses without a SOC number are skipped.
+            scraped_at [datetime.datetime]: Time of the scrape. Defaults to now.
+
+        Returns:
+            run_id [int]: Run the courses were saved as.
+        '''
+
+        run_id = self._start_run(scraped_at)
+
+        for list_batch in batches((course for course in courses if course._soc_number is not None),
+                                  self.batch_size):
+            list_courses, list_soc_numbers = [], []
+            list_labs, list_meetings, list_restrictions, list_priorities, list_enrollments = [], [], [], [], []
+
+            for course in list_batch:
+                soc_number = course._soc_number
+                list_soc_numbers.append((soc_number,))
+                list_courses.append((soc_number, course._department, course._course, course._description,
+                                     course._credit, course._method, course._area, course._competency,
+                                     course._interdisciplinary_program, course._pass_fail, course._enrolled,
+                                     course._capacity, course._instructor, course._room, course._book_link,
+                                     run_id, run_id))
+                list_enrollments.append((soc_number, run_id, course._enrolled, course._capacity))
+                list_meetings.extend(_meeting_rows(soc_number, course._schedule, is_lab=0))
+
+                lab = course._lab
+                if lab is not None:
+                    list_labs.append((soc_number, lab._course, lab._description, lab._room))
+                    list_meetings.extend(_meeting_rows(soc_number, lab._schedule, is_lab=1))
+
+                for code, value in (course._restrictions or {}).items():
+                    list_restrictions.append((soc_number, str(code), value))
+
+                for priority, targets in (course._priorities or {}).items():
+                    for target, criteria in targets.items():
+                        for position, criterion in enumerate(criteria):
+                            list_priorities.append((soc_number, priority, target, position,
+                                                    _criterion_text(criterion)))
+
+            with self._connection:
+                self._connection.executemany(_SQL_UPSERT_COURSE, list_courses)
+                for sql in (_SQL_DELETE_LAB, _SQL_DELETE_MEETINGS, _SQL_DELETE_RESTRICTIONS, _SQL_DELETE_PRIORITIES):
+                    self._connection.executemany(sql, list_soc_numbers)
+                self._connection.executemany(_SQL_INSERT_LAB, list_labs)
+                self._connection.executemany(_SQL_INSERT_MEETING, list_meetings)
+                self._connection.executemany(_SQL_INSERT_RESTRICTION, list_restrictions)
+                self._connection.executemany(_SQL_INSERT_PRIORITY, list_priorities)
+                self._connection.executemany(_SQL_UPSERT_ENROLLMENT, list_enrollments)
+
+        return run_id
+
+    def enrollment_history(self, soc_number) -> list:
+        '''Returns a section's enrollment and capacity in every run that saw it.
+
+        Returns:
+            list_history [list]: A list of (scraped_at, enrolled, capacity), oldest first.
+        '''
+
+        return [tuple(row) for row in self.query(_SQL_ENROLLMENT_HISTORY, (soc_number,))]
+
+    def meeting_at(self, day, at) -> list:
+        '''Returns the SOC numbers of sections (or their labs) meeting on a day at a time.
+
+        Args:
+            day [str]: Day name, e.g. 'Monday'.
+            at [datetime.time]: Time, or minutes after midnight.
+
+        Returns:
+            list_soc_numbers [list]: A list of SOC numbers.
+        '''
+
+        minute = _minutes(at)
+        return [row[0] for row in self.query(_SQL_MEETING_AT, (_DICT_DAY_INDICES[day], minute, minute))]
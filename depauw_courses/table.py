@@ -0,0 +1,267 @@
+'''Columnar storage for courses.
+
+`CourseTable` keeps one column per field instead of one object per course:
+typed arrays for the numeric fields, dictionary-encoded interned strings for
+the repetitive text fields and a packed minutes-of-week encoding for
+schedules. `Course` objects are rebuilt on demand with `CourseTable.row`.
+
+`CourseTable.save` writes the columns to a binary snapshot: the typed
+arrays as raw bytes, then the string values and the remaining per-row
+objects pickled. `CourseTable.load` memory-maps the file and copies the
+arrays straight out of it, so a whole term loads without parsing anything.
+Snapshots are pickles, so only load files you wrote.
+'''
+
+from array import array
+import math
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+
+from depauw_courses.main import Course
+from depauw_courses.schedule import Schedule
+from scrape.columns import StringColumn
+
+_MISSING_INT = -1
+
+_MAGIC = b'DPCT'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sH?xQQ')  # Magic, version, big endian, manifest offset, manifest length
+_ALIGNMENT = 8
+
+_ARRAY_COLUMNS = ('soc_numbers', 'credits', 'enrolled', 'capacities', 'schedule_offsets', 'schedule_intervals')
+_STRING_COLUMNS = ('departments', 'courses', 'methods', 'areas', 'competencies', 'interdisciplinary_programs',
+                   'pass_fails', 'instructors', 'rooms', 'descriptions')
+_OBJECT_COLUMNS = ('book_links', 'restrictions', 'priorities', 'labs', 'selections')
+
+
+def _pack_schedule(schedule) -> list:
+    '''Packs a schedule into a flat list of (start, end) minutes of the week.'''
+
+    return [minute for interval in Schedule.from_dict(schedule).intervals for minute in interval]
+
+
+def _unpack_schedule(intervals) -> Schedule:
+    '''Rebuilds a schedule from packed minutes of the week.'''
+
+    return Schedule(zip(intervals[::2], intervals[1::2]))
+
+
+def _int_or_missing(value) -> int:
+    return _MISSING_INT if value is None else value
+
+
+def _int_or_none(value) -> int:
+    return None if value == _MISSING_INT else value
+
+
+class CourseTable(object):
+    '''Stores courses column by column.
+
+    Attributes:
+        soc_numbers: SOC numbers (-1 if missing).
+        credits: Credits (NaN if missing).
+        enrolled: Enrollment counts (-1 if missing).
+        capacities: Enrollment capacities (-1 if missing).
+        departments: Department abbreviations.
+        instructors: Instructor names.
+        schedule_offsets: Start of each row's intervals in `schedule_intervals`.
+        schedule_intervals: Flat (start, end) minutes of the week of every row.
+    '''
+
+    def __init__(self) -> None:
+        self.soc_numbers = array('l')
+        self.credits = array('d')
+        self.enrolled = array('l')
+        self.capacities = array('l')
+
+        self.departments = StringColumn()
+        self.courses = StringColumn()
+        self.methods = StringColumn()
+        self.areas = StringColumn()
+        self.competencies = StringColumn()
+        self.interdisciplinary_programs = StringColumn()
+        self.pass_fails = StringColumn()
+        self.instructors = StringColumn()
+        self.rooms = StringColumn()
+        self.descriptions = StringColumn()
+
+        self.schedule_offsets = array('I', [0])
+        self.schedule_intervals = array('H')
+
+        self.book_links = []
+        self.restrictions = []
+        self.priorities = []
+        self.labs = []
+        self.selections = []
+
+    @classmethod
+    def from_courses(cls, courses) -> 'CourseTable':
+        table = cls()
+        table.extend(courses)
+        return table
+
+    def append(self, course) -> None:
+        self.soc_numbers.append(_int_or_missing(course._soc_number))
+        self.credits.append(math.nan if course._credit is None else course._credit)
+        self.enrolled.append(_int_or_missing(course._enrolled))
+        self.capacities.append(_int_or_missing(course._capacity))
+
+        self.departments.append(course._department)
+        self.courses.append(course._course)
+        self.methods.append(course._method)
+        self.areas.append(course._area)
+        self.competencies.append(course._competency)
+        self.interdisciplinary_programs.append(course._interdisciplinary_program)
+        self.pass_fails.append(course._pass_fail)
+        self.instructors.append(course._instructor)
+        self.rooms.append(course._room)
+        self.descriptions.append(course._description)
+
+        self.schedule_intervals.extend(_pack_schedule(course._schedule))
+        self.schedule_offsets.append(len(self.schedule_intervals))
+
+        self.book_links.append(course._book_link)
+        self.restrictions.append(course._restrictions)
+        self.priorities.append(course._priorities)
+        self.labs.append(course.lab)
+        self.selections.append(course.selection)
+
+    def extend(self, courses) -> None:
+        for course in courses:
+            self.append(course)
+
+    def save(self, path) -> None:
+        '''Writes the table to a binary snapshot at `path` atomically.'''
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(bytes(_HEADER.size))
+
+                dict_arrays = {}
+                for name, column in self._arrays():
+                    padding = -f.tell() % _ALIGNMENT
+                    f.write(bytes(padding))
+                    dict_arrays[name] = (column.typecode, column.itemsize, f.tell(), len(column))
+                    column.tofile(f)
+
+                dict_manifest = {
+                    'arrays': dict_arrays,
+                    'strings': {name: getattr(self, name).values for name in _STRING_COLUMNS},
+                    'objects': {name: getattr(self, name) for name in _OBJECT_COLUMNS}
+                }
+                manifest_offset = f.tell()
+                pickle.dump(dict_manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+                manifest_length = f.tell() - manifest_offset
+
+                f.seek(0)
+                f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, sys.byteorder == 'big',
+                                     manifest_offset, manifest_length))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path) -> 'CourseTable':
+        '''Loads a table written by `save`.
+
+        Raises:
+            ValueError: If the file is not a snapshot of this format, or was written on a
+                platform with different integer sizes.
+        '''
+
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if len(mm) < _HEADER.size:
+                raise ValueError(f'{path} is not a course table snapshot')
+            magic, version, big_endian, manifest_offset, manifest_length = _HEADER.unpack_from(mm)
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                raise ValueError(f'{path} is not a course table snapshot of version {_FORMAT_VERSION}')
+
+            dict_manifest = pickle.loads(mm[manifest_offset:manifest_offset + manifest_length])
+            byteswap = big_endian != (sys.byteorder == 'big')
+
+            dict_columns = {}
+            with memoryview(mm) as view:
+                for name, (typecode, itemsize, offset, length) in dict_manifest['arrays'].items():
+                    column = array(typecode)
+                    if column.itemsize != itemsize:
+                        raise ValueError(f'{path} stores {name} with {itemsize}-byte items, '
+                                         f'{column.itemsize}-byte items expected')
+                    column.frombytes(view[offset:offset + length * itemsize])
+                    if byteswap:
+                        column.byteswap()
+                    dict_columns[name] = column
+
+        table = cls()
+        for name in _ARRAY_COLUMNS:
+            setattr(table, name, dict_columns[name])
+        for name in _STRING_COLUMNS:
+            setattr(table, name, StringColumn.from_codes(dict_columns[name], dict_manifest['strings'][name]))
+        n_rows = len(dict_columns['soc_numbers'])
+        for name in _OBJECT_COLUMNS:
+            # Snapshots written before a column was added read it as missing
+            setattr(table, name, dict_manifest['objects'].get(name, [None] * n_rows))
+        return table
+
+    def _arrays(self):
+        for name in _ARRAY_COLUMNS:
+            yield name, getattr(self, name)
+        for name in _STRING_COLUMNS:
+            yield name, getattr(self, name).codes
+
+    def schedule_of(self, index) -> Schedule:
+        '''Returns a row's schedule.'''
+
+        return _unpack_schedule(self.schedule_intervals[self.schedule_offsets[index]:self.schedule_offsets[index + 1]])
+
+    def row(self, index) -> Course:
+        '''Rebuilds the course stored at a row.'''
+
+        if index < 0:
+            index += len(self)
+
+        credit = self.credits[index]
+
+        course = Course(soc_number=_int_or_none(self.soc_numbers[index]),
+                        department=self.departments[index],
+                        course=self.courses[index],
+                        description=self.descriptions[index],
+                        credit=None if math.isnan(credit) else credit,
+                        method=self.methods[index],
+                        schedule=self.schedule_of(index),
+                        area=self.areas[index],
+                        competency=self.competencies[index],
+                        interdisciplinary_program=self.interdisciplinary_programs[index],
+                        pass_fail=self.pass_fails[index],
+                        enrolled=_int_or_none(self.enrolled[index]),
+                        capacity=_int_or_none(self.capacities[index]),
+                        instructor=self.instructors[index],
+                        room=self.rooms[index],
+                        restrictions=self.restrictions[index],
+                        priorities=self.priorities[index],
+                        book_link=self.book_links[index])
+        course.lab = self.labs[index]
+        course.selection = self.selections[index]
+
+        return course
+
+    def __getitem__(self, index) -> Course:
+        if not -len(self) <= index < len(self):
+            raise IndexError('CourseTable index out of range')
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def __len__(self) -> int:
+        return len(self.soc_numbers)
+
+    def __repr__(self) -> str:
+        return f'CourseTable({len(self)} courses)'
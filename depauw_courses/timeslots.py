@@ -0,0 +1,177 @@
+'''Time-slot index over course and lab meetings.
+
+Every meeting of every section (a `Course` or its `Lab`) becomes one
+minutes-of-week interval in flat NumPy arrays, so overlap queries, cart
+conflicts and all-pairs conflict matrices run as batch array operations
+instead of Python scans over `_schedule` dictionaries.
+'''
+
+from datetime import time
+
+import numpy as np
+
+from depauw_courses.schedule import _DICT_DAY_INDICES, _MINUTES_PER_DAY, Schedule
+
+_BLOCK_SIZE = 1024  # Meetings compared at once when building conflict matrices
+
+
+def _minutes(value) -> int:
+    '''Returns minutes after midnight of a `datetime.time` or an int.'''
+
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    return int(value)
+
+
+def _week_minutes(day, value) -> int:
+    return _DICT_DAY_INDICES[day] * _MINUTES_PER_DAY + _minutes(value)
+
+
+class TimeSlotIndex(object):
+    '''Indexes the meetings of courses and their labs.
+
+    Attributes:
+        sections: Indexed courses and labs, in insertion order.
+        rooms: Distinct rooms of the indexed sections.
+    '''
+
+    def __init__(self, courses=()) -> None:
+        self.sections = []
+        self._list_rooms = []
+        self._list_owners = []
+        self._list_starts = []
+        self._list_ends = []
+        self._arrays = None
+
+        for course in courses:
+            self.add(course)
+
+    def add(self, course) -> None:
+        '''Indexes a course and its lab, if any.'''
+
+        self._add_section(course)
+        if getattr(course, 'lab', None) is not None:
+            self._add_section(course.lab)
+
+    def _add_section(self, section) -> None:
+        section_id = len(self.sections)
+        self.sections.append(section)
+        self._list_rooms.append(section._room)
+
+        for start, end in Schedule.from_dict(section._schedule).intervals:
+            self._list_owners.append(section_id)
+            self._list_starts.append(start)
+            self._list_ends.append(end)
+
+        self._arrays = None
+
+    def _meetings(self) -> tuple:
+        '''Returns (owners, starts, ends) arrays, rebuilt after sections are added.'''
+
+        if self._arrays is None:
+            self._arrays = (np.array(self._list_owners, dtype=np.int32),
+                            np.array(self._list_starts, dtype=np.int32),
+                            np.array(self._list_ends, dtype=np.int32))
+        return self._arrays
+
+    @property
+    def rooms(self) -> set:
+        return {room for room in self._list_rooms if room is not None}
+
+    def _section_ids_overlapping(self, starts, ends) -> np.ndarray:
+        '''Returns ids of sections meeting during any of the given intervals.'''
+
+        owners, meeting_starts, meeting_ends = self._meetings()
+        if len(owners) == 0 or len(starts) == 0:
+            return np.empty(0, dtype=np.int32)
+
+        starts = np.asarray(starts, dtype=np.int32)
+        ends = np.asarray(ends, dtype=np.int32)
+
+        overlaps = (meeting_starts[:, None] < ends[None, :]) & (meeting_ends[:, None] > starts[None, :])
+
+        return np.unique(owners[overlaps.any(axis=1)])
+
+    def overlapping(self, day, start, end) -> list:
+        '''Returns sections meeting on a day between two times.
+
+        Args:
+            day [str]: Day name, e.g. 'Tuesday'.
+            start [datetime.time or int]: Start time, or minutes after midnight.
+            end [datetime.time or int]: End time, or minutes after midnight.
+
+        Returns:
+            list_sections [list]: Courses and labs meeting in that window.
+        '''
+
+        section_ids = self._section_ids_overlapping([_week_minutes(day, start)], [_week_minutes(day, end)])
+        return [self.sections[section_id] for section_id in section_ids]
+
+    def meeting_at(self, day, at) -> list:
+        '''Returns sections meeting on a day at a time.'''
+
+        return self.overlapping(day, at, _minutes(at) + 1)
+
+    def conflicts_with(self, cart) -> list:
+        '''Returns sections conflicting with any course or lab in a cart.
+
+        Args:
+            cart [iterable]: Courses (with their labs) or labs.
+
+        Returns:
+            list_sections [list]: Indexed sections other than the cart's that overlap it.
+        '''
+
+        list_cart_sections = []
+        for section in cart:
+            list_cart_sections.append(section)
+            if getattr(section, 'lab', None) is not None:
+                list_cart_sections.append(section.lab)
+
+        list_starts = []
+        list_ends = []
+        for section in list_cart_sections:
+            for start, end in Schedule.from_dict(section._schedule).intervals:
+                list_starts.append(start)
+                list_ends.append(end)
+
+        set_cart_ids = {id(section) for section in list_cart_sections}
+
+        return [self.sections[section_id]
+                for section_id in self._section_ids_overlapping(list_starts, list_ends)
+                if id(self.sections[section_id]) not in set_cart_ids]
+
+    def conflict_matrix(self) -> np.ndarray:
+        '''Returns which indexed sections overlap each other.
+
+        Returns:
+            matrix [numpy.ndarray]: Boolean matrix of shape (sections, sections).
+                `matrix[i, j]` is True if `sections[i]` and `sections[j]` overlap.
+        '''
+
+        owners, starts, ends = self._meetings()
+        matrix = np.zeros((len(self.sections), len(self.sections)), dtype=bool)
+
+        for offset in range(0, len(owners), _BLOCK_SIZE):
+            block = slice(offset, offset + _BLOCK_SIZE)
+            overlaps = (starts[block, None] < ends[None, :]) & (ends[block, None] > starts[None, :])
+            rows, columns = np.nonzero(overlaps)
+            matrix[owners[block][rows], owners[columns]] = True
+
+        np.fill_diagonal(matrix, False)
+
+        return matrix
+
+    def free_rooms(self, day, at) -> set:
+        '''Returns rooms of the indexed sections not in use on a day at a time.'''
+
+        set_busy = {self.sections[section_id]._room for section_id in self._section_ids_overlapping(
+            [_week_minutes(day, at)], [_week_minutes(day, at) + 1])}
+
+        return self.rooms - set_busy
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def __repr__(self) -> str:
+        return f'TimeSlotIndex({len(self.sections)} sections, {len(self._list_owners)} meetings)'
@@ -0,0 +1,197 @@
+'''Fetches every page of several GitHub Jobs searches at once.
+
+Listings are newest first, so a search stops as soon as it reaches a job
+published before the cutoff or one that was already seen, and pages past
+the last short page, or past a page holding only jobs the search already
+read, are never requested. Pages of all searches share one
+cap on pages in flight, and jobs found by several searches are kept once.
+
+    list_jobs = fetch_jobs([JobQuery('Python'), JobQuery('Go', location='Berlin')],
+                           since=date.today() - timedelta(days=7))
+'''
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+from urllib.parse import urlencode
+
+from github_jobs.main import _build_job, _fetch_job_fields
+from scrape.metrics import NULL_METRICS
+from scrape.scheduler import FetchScheduler
+
+_POSITIONS_URL = 'https://jobs.github.com/positions'
+_PAGE_SIZE = 50  # Jobs per full listing page
+_FIRST_PAGE = 0
+_MAX_PAGES_IN_FLIGHT = 4
+
+
+class JobQuery(object):
+    '''Stores one search of GitHub Jobs.
+
+    Attributes:
+        description: Search terms, e.g. 'Python'.
+        location: City, state, ZIP code or country.
+        full_time: Only full time positions.
+    '''
+
+    __slots__ = ('description', 'location', 'full_time')
+
+    def __init__(self, description: str = '', location: str = '', full_time: bool = False) -> None:
+        self.description = description
+        self.location = location
+        self.full_time = full_time
+
+    def url(self, page: int = _FIRST_PAGE) -> str:
+        '''Returns the URL of a listing page of the search.'''
+
+        dict_params = {}
+        if self.description:
+            dict_params['description'] = self.description
+        if self.location:
+            dict_params['location'] = self.location
+        if self.full_time:
+            dict_params['full_time'] = 'true'
+        if page != _FIRST_PAGE:
+            dict_params['page'] = page
+
+        return f'{_POSITIONS_URL}?{urlencode(dict_params)}' if dict_params else _POSITIONS_URL
+
+    def __repr__(self) -> str:
+        return f'JobQuery(description={self.description!r}, location={self.location!r}, full_time={self.full_time})'
+
+
+class _QueryState(object):
+    __slots__ = ('query', 'next_page', 'next_page_to_read', 'dict_pages', 'done', 'list_jobs', 'set_links')
+
+    def __init__(self, query) -> None:
+        self.query = query
+        self.next_page = _FIRST_PAGE
+        self.next_page_to_read = _FIRST_PAGE
+        self.dict_pages = {}  # page -> job fields, fetched but not read yet
+        self.done = False
+        self.list_jobs = []
+        self.set_links = set()  # Description links read so far
+
+    def can_request(self, max_pages) -> bool:
+        return not self.done and (max_pages is None or self.next_page - _FIRST_PAGE < max_pages)
+
+    def read_pages(self, since, set_seen, today) -> None:
+        '''Reads the fetched pages in order, stopping at an old or already seen job, a short page or a page
+        without any job not read yet.'''
+
+        while not self.done and self.next_page_to_read in self.dict_pages:
+            list_fields = self.dict_pages.pop(self.next_page_to_read)
+            self.next_page_to_read += 1
+
+            n_new_jobs = 0
+            for dict_fields in list_fields:
+                job = _build_job(dict_fields, today)
+                if (since is not None and job._published < since) or job._desc_link in set_seen:
+                    self.done = True
+                    break
+                if job._desc_link in self.set_links:
+                    continue
+                self.set_links.add(job._desc_link)
+                self.list_jobs.append(job)
+                n_new_jobs += 1
+
+            # A server that ignores or clamps `page` would otherwise repeat its last full page forever
+            if len(list_fields) < _PAGE_SIZE or n_new_jobs == 0:
+                self.done = True
+
+
+def _fetch_page(url, cache, metrics, scheduler) -> list:
+    return list(_fetch_job_fields(url, cache=cache, metrics=metrics, scheduler=scheduler))
+
+
+def fetch_jobs(queries,
+               since: date = None,
+               seen=(),
+               max_pages_in_flight: int = _MAX_PAGES_IN_FLIGHT,
+               max_pages: int = None,
+               cache=None,
+               metrics=None,
+               scheduler=None) -> list:
+    '''Fetches every page of several searches concurrently.
+
+    Args:
+        queries [list]: A list of `JobQuery`.
+        since [datetime.date]: Stops a search at the first job published before this date.
+        seen [iterable]: Description links of jobs already known. Stops a search at the first of them.
+        max_pages_in_flight [int]: Maximum number of pages fetched at a time across all searches.
+        max_pages [int]: Maximum number of pages per search. Unbounded if None.
+        cache [scrape.http_cache.HttpCache]: Response cache for the listing pages.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters. Nothing is recorded if None.
+        scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP requests. One is created if None.
+
+    Returns:
+        list_jobs [list]: A list of GitHub jobs in query order, then listing order, each job once.
+    '''
+
+    if metrics is None:
+        metrics = NULL_METRICS
+
+    own_scheduler = scheduler is None
+    if own_scheduler:
+        scheduler = FetchScheduler(max_concurrency=max_pages_in_flight, metrics=metrics)
+
+    list_states = [_QueryState(query) for query in queries]
+    set_seen = set(seen)
+    today = date.today()
+
+    dict_futures = {}  # future -> (query state, page)
+    executor = ThreadPoolExecutor(max_workers=max_pages_in_flight)
+
+    try:
+        while True:
+            # Request the next page of each search in turn while there is room
+            requested = True
+            while requested and len(dict_futures) < max_pages_in_flight:
+                requested = False
+                for state in list_states:
+                    if len(dict_futures) >= max_pages_in_flight:
+                        break
+                    if state.can_request(max_pages):
+                        future = executor.submit(_fetch_page,
+                                                 url=state.query.url(state.next_page),
+                                                 cache=cache,
+                                                 metrics=metrics,
+                                                 scheduler=scheduler)
+                        dict_futures[future] = (state, state.next_page)
+                        state.next_page += 1
+                        requested = True
+
+            if not dict_futures:
+                break
+
+            set_done, _ = wait(dict_futures, return_when=FIRST_COMPLETED)
+            for future in set_done:
+                state, page = dict_futures.pop(future)
+                if state.done:
+                    metrics.increment('pages_discarded')
+                    continue
+
+                state.dict_pages[page] = future.result()
+                metrics.increment('pages_read')
+                state.read_pages(since=since, set_seen=set_seen, today=today)
+
+                if state.done:
+                    for other_future, (other_state, _) in list(dict_futures.items()):
+                        if other_state is state and other_future.cancel():
+                            del dict_futures[other_future]
+    finally:
+        for future in dict_futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        if own_scheduler:
+            scheduler.close()
+
+    list_jobs = []
+    set_links = set()
+    for state in list_states:
+        for job in state.list_jobs:
+            if job._desc_link in set_links:
+                metrics.increment('jobs_deduplicated')
+                continue
+            set_links.add(job._desc_link)
+            list_jobs.append(job)
+    return list_jobs
@@ -1,8 +1,17 @@
 from datetime import date, timedelta
 import re
+import time
 
-from bs4 import BeautifulSoup
-import requests
+from scrape.extract import Element, Field, Key, RowSchema
+from scrape.metrics import NULL_METRICS
+from scrape.parsing import LazyStrainer, parse_html
+from scrape.scheduler import FetchScheduler
+
+_GITHUB_JOBS_URL = 'https://jobs.github.com/positions?description=Python'
+
+_JOB_ROWS_ONLY = LazyStrainer('tr', class_='job')
+
+_RE_NUMBER = re.compile(r'\d+')
 
 
 class Job(object):
@@ -17,6 +26,8 @@ class Job(object):
         location: Location name.
     '''
 
+    __slots__ = ('_position', '_desc_link', '_name', '_url', '_job_type', '_location', '_published')
+
     def __init__(self, position, description_link, company_name, company_url, job_type, location, published):
         self._position = position
         self._desc_link = description_link
@@ -32,6 +43,35 @@ class Job(object):
     def __repr__(self) -> str:
         return self.detailed_string()
 
+    def to_dict(self) -> dict:
+        '''Returns the fields as plain values, keyed like the constructor's arguments.'''
+
+        return {
+            'position': self._position,
+            'description_link': self._desc_link,
+            'company_name': self._name,
+            'company_url': self._url,
+            'job_type': self._job_type,
+            'location': self._location,
+            'published': self._published
+        }
+
+    @classmethod
+    def from_dict(cls, dict_fields) -> 'Job':
+        '''Rebuilds a job from `to_dict`, also as read back from NDJSON or CSV (publication as an ISO string).'''
+
+        published = dict_fields['published']
+        if isinstance(published, str):
+            published = date.fromisoformat(published)
+
+        return cls(position=dict_fields['position'],
+                   description_link=dict_fields['description_link'],
+                   company_name=dict_fields['company_name'],
+                   company_url=dict_fields['company_url'],
+                   job_type=dict_fields['job_type'],
+                   location=dict_fields['location'],
+                   published=published)
+
     def detailed_string(self) -> str:
         return ('Job(\n'
             f'\tPosition: {self._position},\n'
@@ -56,6 +96,8 @@ class GitHubJob(Job):
         location: Location name.
     '''
 
+    __slots__ = ()
+
     def __init__(self, position, description_link, company_name, company_url, job_type, location, published):
         Job.__init__(self,
                      position=position,
@@ -78,34 +120,150 @@ class GitHubJob(Job):
             ')')
 
 
-def entry_point():
-    '''Entry point.'''
+def _days_ago(when) -> int:
+    '''Reads the number of days of a relative date, e.g. `3 days ago`.'''
+
+    return int(_RE_NUMBER.search(when).group())
+
+
+def _days_before(days, today) -> date:
+    return today - timedelta(days=days)
+
+
+# Fields of a `tr.job` row. Publication is kept relative so the fields can be cached as JSON
+_JOB_SCHEMA = RowSchema([
+    Field('position', Element('h4')),
+    Field('description_link', Element('h4 a', attribute='href')),
+    Field('company_name', Element('a.company')),
+    Field('company_url', Element('a.company', attribute='href')),
+    Field('job_type', Element('strong')),
+    Field('location', Element('span.location')),
+    Field('published_days_ago', Element('span.when'), convert=_days_ago),
+])
+
+# Arguments of `GitHubJob` from the fields of a row, dated relative to the `today` constant
+_JOB_ARGUMENTS_SCHEMA = RowSchema([
+    Field('position', Key('position')),
+    Field('description_link', Key('description_link')),
+    Field('company_name', Key('company_name')),
+    Field('company_url', Key('company_url')),
+    Field('job_type', Key('job_type')),
+    Field('location', Key('location')),
+    Field('published', Key('published_days_ago'), convert=_days_before, constants=('today',)),
+])
+
+
+def _parse_jobs(html) -> list:
+    '''Parses a GitHub Jobs listing page.
+
+    Args:
+        html [str]: HTML of the listing page.
+
+    Returns:
+        list_jobs [list]: A list of job fields. Publication is kept relative
+            (`published_days_ago`) so the result can be cached as JSON.
+    '''
+
+    return list(_iter_job_fields(html))
+
+
+def _iter_job_fields(html, metrics=NULL_METRICS):
+    '''Yields the fields of each `tr.job` row of a GitHub Jobs listing page as soon as it is extracted.'''
 
-    url = 'https://jobs.github.com/positions?description=Python'
-    request = requests.get(url)
-    bs = BeautifulSoup(request.text, 'html.parser')
+    with metrics.stage('html_parse'):
+        bs = parse_html(html, parse_only=_JOB_ROWS_ONLY)
 
     for tr in bs.find_all('tr', class_='job'):
-        position = tr.td.h4.text
-        description_link = tr.td.h4.a.attrs['href']
-        company_name = tr.find('a', class_='company').text
-        company_url = tr.find('a', class_='company').attrs['href']
-        job_type = tr.find('strong').text
-        location = tr.find('span', class_='location').text
-        when_relaitze_relatized \
-            = tr.find('span', class_='when relatize relatized').text
-        published_days_ago \
-            = int(re.search(r'\d+', when_relaitze_relatized).group())
-        published = date.today() - timedelta(days=published_days_ago)
-
-        _ \
-            = GitHubJob(position=position,
-                        description_link=description_link,
-                        company_name=company_name,
-                        company_url=company_url,
-                        job_type=job_type,
-                        location=location,
-                        published=published)
+        metrics.increment('rows_read')
+        with metrics.stage('row_extraction'):
+            dict_fields = _JOB_SCHEMA.record(tr)
+        yield dict_fields
+
+
+def _fetch_job_fields(url, cache, metrics, scheduler):
+    '''Fetches a listing page and returns the fields of its jobs.'''
+
+    start = time.perf_counter()
+    if cache is not None:
+        response = cache.fetch(url, session=scheduler, parse=_parse_jobs)
+        if response.from_cache:
+            metrics.increment('cache_hits')
+        else:
+            metrics.record_fetch(url, time.perf_counter() - start, response.n_bytes, response.status_code)
+            if response.revalidated:
+                metrics.increment('cache_revalidated')
+        response.raise_for_status()
+        return response.parsed
+
+    request = scheduler.get(url)
+    metrics.record_fetch(url, time.perf_counter() - start, len(request.content), request.status_code)
+    request.raise_for_status()
+    return _iter_job_fields(request.text, metrics=metrics)
+
+
+def _build_job(dict_fields, today) -> GitHubJob:
+    '''Builds a job from its fields, dating it relative to `today`.'''
+
+    return GitHubJob(**_JOB_ARGUMENTS_SCHEMA.record(dict_fields, today=today))
+
+
+def iter_jobs(url: str = _GITHUB_JOBS_URL, cache=None, metrics=None, scheduler=None):
+    '''Scrapes a GitHub Jobs listing page, yielding each job as soon as it is parsed.
+
+    Args:
+        url [str]: Listing page URL.
+        cache [scrape.http_cache.HttpCache]: Response cache. An unchanged page
+            is neither downloaded nor parsed again.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters. Nothing is recorded if None.
+        scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP request within per-host rate limits,
+            with timeouts and retries. One is created if None.
+
+    Yields:
+        job [GitHubJob]: GitHub job.
+    '''
+
+    if metrics is None:
+        metrics = NULL_METRICS
+
+    own_scheduler = scheduler is None
+    if own_scheduler:
+        scheduler = FetchScheduler(metrics=metrics)
+
+    try:
+        job_fields = _fetch_job_fields(url, cache=cache, metrics=metrics, scheduler=scheduler)
+    finally:
+        if own_scheduler:
+            scheduler.close()
+
+    today = date.today()
+
+    for dict_fields in job_fields:
+        metrics.increment('jobs_built')
+        yield _build_job(dict_fields, today)
+
+
+def entry_point(cache=None, metrics=None, scheduler=None):
+    '''Entry point.
+
+    Args:
+        cache [scrape.http_cache.HttpCache]: Response cache. An unchanged page
+            is neither downloaded nor parsed again.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters, and is flushed
+            to its sinks at the end of the run. Nothing is recorded if None.
+        scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP request. See `iter_jobs`.
+
+    Returns:
+        list_jobs [list]: A list of GitHub jobs.
+    '''
+
+    if metrics is None:
+        metrics = NULL_METRICS
+
+    try:
+        with metrics.stage('total'):
+            return list(iter_jobs(cache=cache, metrics=metrics, scheduler=scheduler))
+    finally:
+        metrics.flush()
 
 
 if __name__ == '__main__':
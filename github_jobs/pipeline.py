@@ -0,0 +1,220 @@
+'''Fetches GitHub Jobs searches as a pipeline that overlaps fetching with parsing.
+
+    (search, page) -> fetch (threads) -> parse (processes) -> build (thread) -> sink
+
+Listing pages download while earlier ones are parsed in worker processes,
+and jobs reach the sink as soon as their page is built:
+
+    with CsvWriter('jobs.csv') as writer:
+        run([JobQuery('Python'), JobQuery('Go')], sink=writer, since=date.today() - timedelta(days=7))
+
+Pages of each search are requested in order until one of them is short,
+repeats only jobs the search already read, or holds a job published before
+`since` or already seen; the few pages already
+in flight past that point are fetched but their jobs are dropped. Jobs found
+by several searches are kept once and arrive in completion order.
+'''
+
+from datetime import date
+import threading
+import time
+
+from github_jobs.fetcher import _FIRST_PAGE, _MAX_PAGES_IN_FLIGHT, _PAGE_SIZE
+from github_jobs.main import _build_job, _iter_job_fields
+from scrape.metrics import NULL_METRICS
+from scrape.pipeline import Pipeline, Stage, default_processes
+from scrape.scheduler import FetchScheduler
+
+
+def _parse(item, metrics=NULL_METRICS) -> tuple:
+    '''Extracts the job fields of a fetched page. Runs in a worker process.'''
+
+    index, page, html = item
+    return index, page, list(_iter_job_fields(html, metrics=metrics))
+
+
+class _Searches(object):
+    '''Tracks which searches still need pages, shared by the source and the build stage.
+
+    The build stage has one worker and reads the pages of each search in
+    order, so a search stops at the same job as `github_jobs.fetcher.fetch_jobs`.
+    '''
+
+    def __init__(self, queries, since, seen, max_pages, today) -> None:
+        self._list_queries = list(queries)
+        self._since = since
+        self._set_seen = set(seen)
+        self._max_pages = max_pages
+        self._today = today
+
+        n_queries = len(self._list_queries)
+        self._lock = threading.Lock()
+        self._list_last_pages = [None] * n_queries  # Last page read of each stopped search
+        self._list_next_pages = [_FIRST_PAGE] * n_queries  # Next page to read of each search
+        self._list_dict_pages = [{} for _ in range(n_queries)]  # page -> job fields, parsed but not read yet
+        self._list_set_links = [set() for _ in range(n_queries)]  # Description links read by each search
+        self._set_kept = set()  # Description links of jobs passed on
+
+    def iter_pages(self):
+        '''Yields (search index, page, URL) round robin until every search has stopped.'''
+
+        page = _FIRST_PAGE
+        while self._max_pages is None or page - _FIRST_PAGE < self._max_pages:
+            list_pages = [(index, page, query.url(page)) for index, query in enumerate(self._list_queries)
+                          if not self._stopped_before(index, page)]
+            if not list_pages:
+                return
+            yield from list_pages
+            page += 1
+
+    def build(self, item, metrics=NULL_METRICS) -> list:
+        '''Builds the jobs of the pages of a search that are ready to be read, in page order.'''
+
+        index, page, list_fields = item
+        dict_pages = self._list_dict_pages[index]
+        dict_pages[page] = list_fields
+        set_links = self._list_set_links[index]
+
+        list_kept = []
+        while self._list_next_pages[index] in dict_pages:
+            page = self._list_next_pages[index]
+            list_fields = dict_pages.pop(page)
+            self._list_next_pages[index] += 1
+
+            if self._stopped_before(index, page):
+                metrics.increment('pages_discarded')
+                continue
+            metrics.increment('pages_read')
+
+            n_new_jobs = 0
+            for dict_fields in list_fields:
+                job = _build_job(dict_fields, self._today)
+                if (self._since is not None and job._published < self._since) or job._desc_link in self._set_seen:
+                    self._stop(index, page)
+                    break
+                if job._desc_link in set_links:
+                    continue
+                set_links.add(job._desc_link)
+                n_new_jobs += 1
+
+                if job._desc_link in self._set_kept:
+                    metrics.increment('jobs_deduplicated')
+                    continue
+                self._set_kept.add(job._desc_link)
+                list_kept.append(job)
+
+            # A server that ignores or clamps `page` would otherwise repeat its last full page forever
+            if len(list_fields) < _PAGE_SIZE or n_new_jobs == 0:
+                self._stop(index, page)
+
+        metrics.increment('jobs_built', len(list_kept))
+        return list_kept
+
+    def _stop(self, index, page) -> None:
+        with self._lock:
+            last_page = self._list_last_pages[index]
+            if last_page is None or page < last_page:
+                self._list_last_pages[index] = page
+
+    def _stopped_before(self, index, page) -> bool:
+        with self._lock:
+            last_page = self._list_last_pages[index]
+        return last_page is not None and page > last_page
+
+
+class _PageFetcher(object):
+    def __init__(self, cache, scheduler) -> None:
+        self._cache = cache
+        self._scheduler = scheduler
+
+    def __call__(self, item, metrics=NULL_METRICS) -> tuple:
+        index, page, url = item
+
+        start = time.perf_counter()
+        if self._cache is not None:
+            response = self._cache.fetch(url, session=self._scheduler)
+            if response.from_cache:
+                metrics.increment('cache_hits')
+            else:
+                metrics.record_fetch(url, time.perf_counter() - start, response.n_bytes, response.status_code)
+            response.raise_for_status()
+            return index, page, response.text
+
+        request = self._scheduler.get(url)
+        metrics.record_fetch(url, time.perf_counter() - start, len(request.content), request.status_code)
+        request.raise_for_status()
+        return index, page, request.text
+
+
+def iter_jobs(queries,
+              since: date = None,
+              seen=(),
+              max_pages_in_flight: int = _MAX_PAGES_IN_FLIGHT,
+              max_pages: int = None,
+              max_processes: int = None,
+              cache=None,
+              metrics=None,
+              scheduler=None):
+    '''Fetches several searches through the pipeline, yielding jobs as their pages are built.
+
+    Args:
+        queries [list]: A list of `github_jobs.fetcher.JobQuery`.
+        since [datetime.date]: Stops a search at the first job published before this date.
+        seen [iterable]: Description links of jobs already known. Stops a search at the first of them.
+        max_pages_in_flight [int]: Maximum number of pages fetched at a time across all searches.
+        max_pages [int]: Maximum number of pages per search. Unbounded if None.
+        max_processes [int]: Worker processes parsing pages. Defaults to one per CPU, or none on a
+            single CPU. Pages are parsed in threads if 0.
+        cache [scrape.http_cache.HttpCache]: Response cache for the listing pages.
+        metrics [scrape.metrics.Metrics]: Receives stage timings, fetches and counters. Nothing is recorded if None.
+        scheduler [scrape.scheduler.FetchScheduler]: Sends the HTTP requests. One is created if None.
+
+    Yields:
+        job [github_jobs.main.GitHubJob]: GitHub job, each once, in completion order.
+    '''
+
+    if metrics is None:
+        metrics = NULL_METRICS
+    if max_processes is None:
+        max_processes = default_processes()
+
+    searches = _Searches(queries, since=since, seen=seen, max_pages=max_pages, today=date.today())
+
+    own_scheduler = scheduler is None
+    if own_scheduler:
+        scheduler = FetchScheduler(max_concurrency=max_pages_in_flight, pool_size=max_pages_in_flight, metrics=metrics)
+
+    # Queues of one page keep the pages requested past the end of a search few
+    pipeline = Pipeline([Stage('fetch', _PageFetcher(cache, scheduler), workers=max_pages_in_flight, metrics=True),
+                         Stage('parse', _parse, workers=max(1, max_processes), processes=True, metrics=True),
+                         Stage('build', searches.build, workers=1, flat=True, metrics=True)],
+                        queue_size=1,
+                        max_processes=max_processes,
+                        metrics=metrics)
+
+    try:
+        yield from pipeline.iter_results(searches.iter_pages())
+    finally:
+        if own_scheduler:
+            scheduler.close()
+
+
+def run(queries, sink, **kwargs) -> int:
+    '''Fetches several searches through the pipeline into a sink.
+
+    Args:
+        queries [list]: A list of `github_jobs.fetcher.JobQuery`.
+        sink: Object with a `write(job)` (e.g. `scrape.export.CsvWriter`), or a callable.
+        **kwargs: Other arguments of `iter_jobs`.
+
+    Returns:
+        n_jobs [int]: Jobs written to the sink.
+    '''
+
+    write = sink.write if hasattr(sink, 'write') else sink
+
+    n_jobs = 0
+    for job in iter_jobs(queries, **kwargs):
+        write(job)
+        n_jobs += 1
+    return n_jobs
@@ -0,0 +1,29 @@
+'''Keyword search over GitHub jobs.
+
+    index = JobIndex(list_jobs)
+    index.search('python berlin')  # Jobs, best match first
+    index.update(list_new_jobs)    # Jobs already indexed are replaced
+
+A job is indexed under its description link with its position, company name
+and location.
+'''
+
+from scrape.search import TextIndex
+
+
+class JobIndex(TextIndex):
+    '''Inverted index of jobs keyed by description link.
+
+    Attributes:
+        prefix: Whether query terms also match tokens they are a prefix of.
+        max_prefix_expansions: Maximum number of longer tokens a query term matches as a prefix. Unbounded if None.
+    '''
+
+    _FIELDS = (
+        ('position', lambda job: job._position, 3.0),
+        ('company_name', lambda job: job._name, 2.0),
+        ('location', lambda job: job._location, 1.0)
+    )
+
+    def _key(self, job):
+        return job._desc_link
@@ -0,0 +1,90 @@
+'''Stores scraped jobs in SQLite.
+
+One row per job is upserted into `jobs` keyed by its description link, and
+every save is recorded as a run, so a job's first and last sighting are kept.
+
+    with JobStore('jobs.sqlite3') as store:
+        store.save(list_jobs)
+        store.jobs_of('Acme')
+'''
+
+from scrape.sqlite import SqliteStore, batches
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    description_link TEXT PRIMARY KEY,
+    position TEXT,
+    company_name TEXT,
+    company_url TEXT,
+    job_type TEXT,
+    location TEXT,
+    published TEXT,
+    first_seen_run INTEGER NOT NULL REFERENCES runs (run_id),
+    last_seen_run INTEGER NOT NULL REFERENCES runs (run_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_company_name ON jobs (company_name);
+CREATE INDEX IF NOT EXISTS jobs_published ON jobs (published);
+'''
+
+_SQL_UPSERT_JOB = '''
+INSERT INTO jobs (description_link, position, company_name, company_url, job_type, location, published,
+                  first_seen_run, last_seen_run)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (description_link) DO UPDATE SET
+    position = excluded.position,
+    company_name = excluded.company_name,
+    company_url = excluded.company_url,
+    job_type = excluded.job_type,
+    location = excluded.location,
+    published = excluded.published,
+    last_seen_run = excluded.last_seen_run
+'''
+
+_SQL_JOBS_OF = '''
+SELECT description_link, position, job_type, location, published FROM jobs
+WHERE company_name = ?
+ORDER BY published DESC
+'''
+
+
+class JobStore(SqliteStore):
+    '''Stores GitHub jobs in SQLite.
+
+    Attributes:
+        path: Database file, or ':memory:'.
+        batch_size: Jobs written per transaction.
+    '''
+
+    _SCHEMA = _SCHEMA
+
+    def save(self, jobs, scraped_at=None) -> int:
+        '''Saves the jobs of one scrape as a new run.
+
+        Args:
+            jobs [iterable]: Jobs.
+            scraped_at [datetime.datetime]: Time of the scrape. Defaults to now.
+
+        Returns:
+            run_id [int]: Run the jobs were saved as.
+        '''
+
+        run_id = self._start_run(scraped_at)
+
+        for list_batch in batches(jobs, self.batch_size):
+            list_rows = [(job._desc_link, job._position, job._name, job._url, job._job_type, job._location,
+                          job._published.isoformat() if job._published is not None else None, run_id, run_id)
+                         for job in list_batch]
+
+            with self._connection:
+                self._connection.executemany(_SQL_UPSERT_JOB, list_rows)
+
+        return run_id
+
+    def jobs_of(self, company_name) -> list:
+        '''Returns the jobs of a company, newest first.
+
+        Returns:
+            list_jobs [list]: A list of `sqlite3.Row`.
+        '''
+
+        return self.query(_SQL_JOBS_OF, (company_name,))
@@ -0,0 +1,88 @@
+'''Columnar storage for jobs.
+
+`JobTable` keeps one column per field instead of one object per job:
+dictionary-encoded interned strings for the repetitive text fields and
+date ordinals for the publication dates. `GitHubJob` objects are rebuilt on
+demand with `JobTable.row`.
+'''
+
+from array import array
+from datetime import date
+
+from github_jobs.main import GitHubJob
+from scrape.columns import StringColumn
+
+_MISSING_ORDINAL = 0
+
+
+class JobTable(object):
+    '''Stores GitHub jobs column by column.
+
+    Attributes:
+        positions: Position titles.
+        description_links: Description links.
+        company_names: Company names.
+        company_urls: Company URLs.
+        job_types: Job types.
+        locations: Location names.
+        published: Publication dates as ordinals (0 if missing).
+    '''
+
+    def __init__(self) -> None:
+        self.positions = StringColumn()
+        self.description_links = []
+        self.company_names = StringColumn()
+        self.company_urls = StringColumn()
+        self.job_types = StringColumn()
+        self.locations = StringColumn()
+        self.published = array('l')
+
+    @classmethod
+    def from_jobs(cls, jobs) -> 'JobTable':
+        table = cls()
+        table.extend(jobs)
+        return table
+
+    def append(self, job) -> None:
+        self.positions.append(job._position)
+        self.description_links.append(job._desc_link)
+        self.company_names.append(job._name)
+        self.company_urls.append(job._url)
+        self.job_types.append(job._job_type)
+        self.locations.append(job._location)
+        self.published.append(_MISSING_ORDINAL if job._published is None else job._published.toordinal())
+
+    def extend(self, jobs) -> None:
+        for job in jobs:
+            self.append(job)
+
+    def row(self, index) -> GitHubJob:
+        '''Rebuilds the job stored at a row.'''
+
+        if index < 0:
+            index += len(self)
+
+        ordinal = self.published[index]
+
+        return GitHubJob(position=self.positions[index],
+                         description_link=self.description_links[index],
+                         company_name=self.company_names[index],
+                         company_url=self.company_urls[index],
+                         job_type=self.job_types[index],
+                         location=self.locations[index],
+                         published=None if ordinal == _MISSING_ORDINAL else date.fromordinal(ordinal))
+
+    def __getitem__(self, index) -> GitHubJob:
+        if not -len(self) <= index < len(self):
+            raise IndexError('JobTable index out of range')
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def __len__(self) -> int:
+        return len(self.published)
+
+    def __repr__(self) -> str:
+        return f'JobTable({len(self)} jobs)'
@@ -0,0 +1 @@
+'''Helpers shared by the scrapers in this repository.'''
@@ -0,0 +1,7 @@
+'''Runs the command line interface: `python -m scrape --help`.'''
+
+import sys
+
+from scrape.cli import main
+
+sys.exit(main())
@@ -0,0 +1,338 @@
+'''Command line interface of the scrapers.
+
+    python -m scrape depauw --mode requests --output courses.ndjson
+    python -m scrape depauw --field term=202120 --field dept=CSC --sqlite courses.sqlite3
+    python -m scrape github-jobs --description Python --since-days 7 --output jobs.csv
+    python -m scrape depauw --profile depauw.pstats
+
+Only the standard library is imported up front. Each subcommand imports its
+scraper, and the scraper imports Selenium only in the browser modes, so
+`--help` and requests-only runs skip what they do not use.
+
+`--profile PATH` runs the command under cProfile and writes the stats to
+PATH (for `pstats` or snakeviz) and a report to PATH.txt with the time every
+module took to import, slowest first, and the most expensive functions.
+'''
+
+import argparse
+import builtins
+import logging
+import os
+import sys
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+_FORMAT_NDJSON = 'ndjson'
+_FORMAT_CSV = 'csv'
+_FORMATS = (_FORMAT_NDJSON, _FORMAT_CSV)
+
+_STDOUT = '-'
+
+_DEFAULT_MAX_WORKERS = 8
+_DEFAULT_RATE = 5.0
+
+_LOG_LEVELS = (logging.WARNING, logging.INFO, logging.DEBUG)
+
+_PROFILE_REPORT_SUFFIX = '.txt'
+_PROFILE_N_IMPORTS = 30
+_PROFILE_N_FUNCTIONS = 40
+
+
+class _ImportTimer(object):
+    '''Times every module imported while it is active.
+
+    Attributes:
+        imports: A list of (module, own seconds, seconds including the modules it imported).
+    '''
+
+    def __init__(self) -> None:
+        self.imports = []
+
+        self._original_import = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> '_ImportTimer':
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        builtins.__import__ = self._original_import
+
+    def _import(self, name, *args, **kwargs):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        n_modules = len(sys.modules)
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            children_seconds = stack.pop()
+            if stack:
+                stack[-1] += seconds
+
+            # Only imports that loaded something are worth reporting
+            if len(sys.modules) > n_modules:
+                with self._lock:
+                    self.imports.append((_absolute_name(name, *args), seconds - children_seconds, seconds))
+
+    def report(self, n_imports: int = _PROFILE_N_IMPORTS) -> str:
+        total = sum(own for _, own, _ in self.imports)
+        list_lines = [f'Imports: {total * 1000:.1f} ms in {len(self.imports)} imports',
+                      f'{"cumulative":>12} {"own":>10}  module']
+        for name, own, cumulative in sorted(self.imports, key=lambda item: -item[2])[:n_imports]:
+            list_lines.append(f'{cumulative * 1000:9.1f} ms {own * 1000:7.1f} ms  {name}')
+        return '\n'.join(list_lines)
+
+
+def _absolute_name(name, globals_=None, locals_=None, fromlist=(), level=0) -> str:
+    '''Returns the module name of an `__import__` call, resolving relative imports.'''
+
+    if level == 0 or not globals_:
+        return name
+
+    package = globals_.get('__package__') or ''
+    if level > 1:
+        package = package.rsplit('.', level - 1)[0]
+    return f'{package}.{name}' if name else package
+
+
+def _parse_field(value) -> tuple:
+    name, separator, field_value = value.partition('=')
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f'Expected NAME=VALUE: {value}')
+    return name, field_value
+
+
+def _output_format(args) -> str:
+    if args.format is not None:
+        return args.format
+    return _FORMAT_CSV if args.output.lower().endswith('.csv') else _FORMAT_NDJSON
+
+
+def _write(records, args, new_store) -> int:
+    '''Writes records to the output file and/or the SQLite store as they arrive.
+
+    Args:
+        records [iterable]: Records with a `to_dict()`.
+        args [argparse.Namespace]: Parsed arguments.
+        new_store [callable]: Opens the scraper's SQLite store at a path.
+
+    Returns:
+        n_records [int]: Records written.
+    '''
+
+    from scrape.export import CsvWriter, NdjsonWriter
+
+    writer = None
+    if args.output is not None or args.sqlite is None:
+        if args.output is None:
+            args.output = _STDOUT
+        target = sys.stdout if args.output == _STDOUT else args.output
+        writer_class = CsvWriter if _output_format(args) == _FORMAT_CSV else NdjsonWriter
+        writer = writer_class(target, flush_every=args.flush_every)
+
+    list_count = [0]
+
+    def _tee():
+        for record in records:
+            if writer is not None:
+                writer.write(record)
+            list_count[0] += 1
+            yield record
+
+    try:
+        if args.sqlite is not None:
+            with new_store(args.sqlite) as store:
+                store.save(_tee())
+        else:
+            for _ in _tee():
+                pass
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return list_count[0]
+
+
+def _new_cache(args):
+    if args.cache is None:
+        return None
+
+    from scrape.http_cache import HttpCache
+
+    return HttpCache(directory=args.cache, ttl=args.cache_ttl)
+
+
+def _new_scheduler(args, metrics, **kwargs):
+    from scrape.scheduler import FetchScheduler
+
+    return FetchScheduler(rate=args.rate,
+                          max_concurrency=args.max_workers,
+                          pool_size=args.max_workers,
+                          deadline=args.deadline,
+                          metrics=metrics,
+                          **kwargs)
+
+
+def _run_depauw(args, metrics) -> int:
+    from depauw_courses.main import _RETRY_METHODS, iter_courses
+    from depauw_courses.storage import CourseStore
+
+    with _new_scheduler(args, metrics, retry_methods=_RETRY_METHODS) as scheduler:
+        courses = iter_courses(mode=args.mode,
+                               max_workers=args.max_workers,
+                               cache=_new_cache(args),
+                               metrics=metrics,
+                               selection=dict(args.field) or None,
+                               scheduler=scheduler)
+        return _write(courses, args, new_store=CourseStore)
+
+
+def _run_github_jobs(args, metrics) -> int:
+    from datetime import date, timedelta
+
+    from github_jobs.fetcher import JobQuery, fetch_jobs
+    from github_jobs.storage import JobStore
+
+    list_queries = [JobQuery(description, location=args.location, full_time=args.full_time)
+                    for description in args.description]
+    since = date.today() - timedelta(days=args.since_days) if args.since_days is not None else None
+
+    with _new_scheduler(args, metrics) as scheduler:
+        list_jobs = fetch_jobs(list_queries,
+                               since=since,
+                               max_pages_in_flight=args.max_workers,
+                               max_pages=args.max_pages,
+                               cache=_new_cache(args),
+                               metrics=metrics,
+                               scheduler=scheduler)
+    return _write(list_jobs, args, new_store=JobStore)
+
+
+def _add_common_arguments(parser) -> None:
+    group = parser.add_argument_group('output')
+    group.add_argument('-o', '--output', help='NDJSON or CSV file, or - for stdout (the default without --sqlite)')
+    group.add_argument('--format', choices=_FORMATS, help='Output format. Guessed from the extension if omitted')
+    group.add_argument('--sqlite', help='Also upsert the records into this SQLite database')
+    group.add_argument('--flush-every', type=int, default=100, help='Records written between flushes')
+
+    group = parser.add_argument_group('fetching')
+    group.add_argument('-j', '--max-workers', type=int, default=_DEFAULT_MAX_WORKERS,
+                       help='Maximum number of pages fetched concurrently')
+    group.add_argument('--rate', type=float, default=_DEFAULT_RATE, help='Requests per second per host')
+    group.add_argument('--deadline', type=float, help='Seconds a request may take including retries')
+    group.add_argument('--cache', help='Directory of the HTTP response cache. No cache if omitted')
+    group.add_argument('--cache-ttl', type=float, help='Seconds cached responses are used without revalidation')
+
+    group = parser.add_argument_group('diagnostics')
+    group.add_argument('--metrics', help='Write stage timings, fetches and counters to this JSON file')
+    group.add_argument('--profile', help='Write cProfile stats to this file and an import-time report next to it')
+    group.add_argument('-v', '--verbose', action='count', default=0, help='Log progress (-vv for debug)')
+
+
+def _new_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m scrape', description='Runs a scraper.')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    depauw = subparsers.add_parser('depauw', help='Scrape the DePauw schedule of classes')
+    depauw.add_argument('--mode', choices=('browser', 'page_source', 'requests'), default='requests',
+                        help='How the course table is read (default: requests, no browser)')
+    depauw.add_argument('--field', type=_parse_field, action='append', default=[], metavar='NAME=VALUE',
+                        help='SOC form field, e.g. term=202120 or dept=CSC. Repeatable')
+    _add_common_arguments(depauw)
+    depauw.set_defaults(run=_run_depauw)
+
+    github_jobs = subparsers.add_parser('github-jobs', help='Search GitHub Jobs')
+    github_jobs.add_argument('-d', '--description', action='append', default=None,
+                             help='Search terms. Repeatable, one search each (default: Python)')
+    github_jobs.add_argument('--location', default='', help='City, state, ZIP code or country')
+    github_jobs.add_argument('--full-time', action='store_true', help='Only full time positions')
+    github_jobs.add_argument('--since-days', type=int, help='Stop at jobs older than this many days')
+    github_jobs.add_argument('--max-pages', type=int, help='Maximum number of pages per search')
+    _add_common_arguments(github_jobs)
+    github_jobs.set_defaults(run=_run_github_jobs)
+
+    return parser
+
+
+def _run(args) -> int:
+    metrics = None
+    if args.metrics is not None:
+        from scrape.metrics import JsonFileSink, Metrics
+
+        metrics = Metrics(sinks=[JsonFileSink(args.metrics)])
+
+    start = time.perf_counter()
+    try:
+        n_records = args.run(args, metrics)
+    finally:
+        if metrics is not None:
+            metrics.flush()
+
+    _LOGGER.info('%s: %d records in %.2f s', args.command, n_records, time.perf_counter() - start)
+    return n_records
+
+
+def _run_profiled(args) -> None:
+    import cProfile
+    import pstats
+
+    profile = cProfile.Profile()
+    with _ImportTimer() as import_timer:
+        profile.enable()
+        try:
+            _run(args)
+        finally:
+            profile.disable()
+
+    profile.dump_stats(args.profile)
+
+    with open(args.profile + _PROFILE_REPORT_SUFFIX, 'w') as f:
+        f.write(import_timer.report())
+        f.write('\n\n')
+        pstats.Stats(profile, stream=f).sort_stats('cumulative').print_stats(_PROFILE_N_FUNCTIONS)
+
+    _LOGGER.info('Profile written to %s and %s', args.profile, args.profile + _PROFILE_REPORT_SUFFIX)
+
+
+def main(argv=None) -> int:
+    '''Runs the command line interface.
+
+    Args:
+        argv [list]: Arguments without the program name. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        status [int]: Exit status.
+    '''
+
+    args = _new_parser().parse_args(argv)
+
+    if args.command == 'github-jobs' and args.description is None:
+        args.description = ['Python']
+
+    logging.basicConfig(level=_LOG_LEVELS[min(args.verbose, len(_LOG_LEVELS) - 1)],
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+                        stream=sys.stderr)
+
+    try:
+        if args.profile is not None:
+            _run_profiled(args)
+        else:
+            _run(args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # The reader of stdout went away, e.g. `| head`
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+    return 0
@@ -0,0 +1,49 @@
+'''Column types shared by the columnar tables.'''
+
+from array import array
+import sys
+
+
+class StringColumn(object):
+    '''Dictionary-encoded column of interned strings.
+
+    Attributes:
+        codes: Code of each row, an index into `values`.
+        values: Distinct values in order of first appearance.
+    '''
+
+    def __init__(self) -> None:
+        self.codes = array('I')
+        self.values = []
+        self._dict_codes = {}
+
+    @classmethod
+    def from_codes(cls, codes, values) -> 'StringColumn':
+        '''Rebuilds a column from its codes and distinct values, e.g. after loading them from disk.'''
+
+        column = cls()
+        column.codes = codes
+        column.values = [sys.intern(value) if isinstance(value, str) else value for value in values]
+        column._dict_codes = {value: code for code, value in enumerate(column.values)}
+        return column
+
+    def append(self, value) -> None:
+        code = self._dict_codes.get(value)
+        if code is None:
+            code = len(self.values)
+            if isinstance(value, str):
+                value = sys.intern(value)
+            self.values.append(value)
+            self._dict_codes[value] = code
+        self.codes.append(code)
+
+    def code_of(self, value) -> int:
+        '''Returns the code of a value, or None if no row has it.'''
+
+        return self._dict_codes.get(value)
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
@@ -0,0 +1,250 @@
+'''Streaming NDJSON and CSV export of scraped records.
+
+Records are anything with a `to_dict()` (courses, labs, jobs) or plain
+dictionaries. Each record is written as soon as it is received and the
+file is flushed every `flush_every` records, so a scrape can be piped to
+disk while it runs without holding its results in memory.
+
+    with NdjsonWriter('courses.ndjson') as writer:
+        writer.write_all(iter_courses(mode='requests'))
+
+Dates and times are written in ISO 8601 and tuples as lists. In CSV files
+the nested fields (schedule, restrictions, priorities, lab, selection) are
+JSON in their cell, None is an empty cell, and an empty string, like any
+text starting with a double quote, is written as a JSON string.
+
+`iter_ndjson` and `iter_csv` read the dictionaries back. They do not know
+the record types, so dates stay ISO strings, and CSV cells of other fields
+stay strings, numbers included. Pass the record's `from_dict` to get typed
+records back:
+
+    list_courses = list(iter_csv('courses.csv', from_dict=Course.from_dict))
+'''
+
+from collections.abc import Mapping
+import csv
+from datetime import date, time
+import json
+
+_FLUSH_EVERY = 100
+
+_CSV_NONE = ''
+_CSV_QUOTE = '"'  # Starts a text cell written as a JSON string
+
+# Fields of the records written as JSON in CSV cells
+_JSON_FIELDS = frozenset(('schedule', 'restrictions', 'priorities', 'lab', 'selection'))
+
+
+def _to_dict(record) -> dict:
+    return record if isinstance(record, dict) else record.to_dict()
+
+
+def _json_default(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _open(target, mode):
+    '''Returns (file, whether it was opened here) for a path or an open text file.'''
+
+    if hasattr(target, 'write') or hasattr(target, 'read'):
+        return target, False
+    newline = '' if 'w' in mode or 'a' in mode else None
+    return open(target, mode, encoding='utf-8', newline=newline), True
+
+
+class _Writer(object):
+    def __init__(self, target, flush_every: int = _FLUSH_EVERY) -> None:
+        self.flush_every = flush_every
+        self.n_records = 0
+
+        self._file, self._own_file = _open(target, 'w')
+
+    def write(self, record) -> None:
+        self._write(_to_dict(record))
+        self.n_records += 1
+        if self.flush_every and self.n_records % self.flush_every == 0:
+            self._file.flush()
+
+    def write_all(self, records) -> int:
+        '''Writes every record of an iterable and returns how many were written.'''
+
+        n_before = self.n_records
+        for record in records:
+            self.write(record)
+        return self.n_records - n_before
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        '''Flushes, and closes the file if the writer opened it.'''
+
+        self._file.flush()
+        if self._own_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _write(self, dict_record) -> None:
+        raise NotImplementedError
+
+
+class NdjsonWriter(_Writer):
+    '''Writes one JSON object per line.
+
+    Attributes:
+        flush_every: Records written between flushes. Only flushed on close if 0.
+        n_records: Records written so far.
+    '''
+
+    def _write(self, dict_record) -> None:
+        self._file.write(_dumps(dict_record))
+        self._file.write('\n')
+
+
+class CsvWriter(_Writer):
+    '''Writes one row per record under a header row.
+
+    Attributes:
+        flush_every: Records written between flushes. Only flushed on close if 0.
+        n_records: Records written so far.
+        fieldnames: Columns, in order. Taken from the first record if None.
+        json_fields: Columns always written as JSON, for `iter_csv` to decode.
+    '''
+
+    def __init__(self, target, fieldnames=None, flush_every: int = _FLUSH_EVERY, json_fields=_JSON_FIELDS) -> None:
+        _Writer.__init__(self, target, flush_every=flush_every)
+        self.fieldnames = list(fieldnames) if fieldnames is not None else None
+        self.json_fields = frozenset(json_fields)
+
+        self._writer = None
+
+    def _write(self, dict_record) -> None:
+        if self._writer is None:
+            if self.fieldnames is None:
+                self.fieldnames = list(dict_record)
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.fieldnames)
+
+        self._writer.writerow([_csv_cell(dict_record.get(field), field in self.json_fields)
+                               for field in self.fieldnames])
+
+
+def _csv_cell(value, is_json) -> str:
+    if value is None:
+        return _CSV_NONE
+    if is_json:
+        return _dumps(value)
+    if isinstance(value, str):
+        # '' would read back as None and a leading quote as a JSON string
+        return _dumps(value) if value == '' or value.startswith(_CSV_QUOTE) else value
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return _dumps(value)
+
+
+def write_ndjson(records, target, flush_every: int = _FLUSH_EVERY) -> int:
+    '''Writes records to an NDJSON file and returns how many were written.
+
+    Args:
+        records [iterable]: Records with a `to_dict()`, or dictionaries.
+        target [str]: Path, or an open text file.
+        flush_every [int]: Records written between flushes.
+
+    Returns:
+        n_records [int]: Records written.
+    '''
+
+    with NdjsonWriter(target, flush_every=flush_every) as writer:
+        return writer.write_all(records)
+
+
+def write_csv(records, target, fieldnames=None, flush_every: int = _FLUSH_EVERY, json_fields=_JSON_FIELDS) -> int:
+    '''Writes records to a CSV file and returns how many were written.
+
+    Args:
+        records [iterable]: Records with a `to_dict()`, or dictionaries.
+        target [str]: Path, or an open text file.
+        fieldnames [list]: Columns, in order. Taken from the first record if None.
+        flush_every [int]: Records written between flushes.
+        json_fields [iterable]: Columns always written as JSON.
+
+    Returns:
+        n_records [int]: Records written.
+    '''
+
+    with CsvWriter(target, fieldnames=fieldnames, flush_every=flush_every, json_fields=json_fields) as writer:
+        return writer.write_all(records)
+
+
+def iter_ndjson(source, from_dict=None):
+    '''Reads the dictionaries of an NDJSON file back one by one.
+
+    Args:
+        source [str]: Path, or an open text file.
+        from_dict [callable]: Builds a record from each dictionary, e.g. `Course.from_dict`.
+            The dictionaries are yielded as they are if None.
+
+    Yields:
+        record: Dictionary, or the record built from it.
+    '''
+
+    f, own_file = _open(source, 'r')
+    try:
+        for line in f:
+            if line.strip():
+                dict_record = json.loads(line)
+                yield from_dict(dict_record) if from_dict is not None else dict_record
+    finally:
+        if own_file:
+            f.close()
+
+
+def iter_csv(source, from_dict=None, json_fields=_JSON_FIELDS):
+    '''Reads the rows of a CSV file back as dictionaries, decoding JSON cells.
+
+    Empty cells are read as None and the cells of `json_fields` are decoded.
+    Other cells, numbers included, are kept as strings.
+
+    Args:
+        source [str]: Path, or an open text file.
+        from_dict [callable]: Builds a record from each row, converting its strings, e.g. `Course.from_dict`.
+            The rows are yielded as they are if None.
+        json_fields [iterable]: Columns written as JSON.
+
+    Yields:
+        record: Dictionary, or the record built from it.
+    '''
+
+    set_json_fields = frozenset(json_fields)
+
+    f, own_file = _open(source, 'r')
+    try:
+        for dict_row in csv.DictReader(f):
+            dict_record = {field: _read_csv_cell(value, field in set_json_fields) for field, value in dict_row.items()}
+            yield from_dict(dict_record) if from_dict is not None else dict_record
+    finally:
+        if own_file:
+            f.close()
+
+
+def _read_csv_cell(value, is_json):
+    if not value:  # Also None for the missing cells of a short row
+        return None
+    if is_json or value.startswith(_CSV_QUOTE):
+        return json.loads(value)
+    return value
@@ -0,0 +1,316 @@
+'''Declarative row extraction shared by the scrapers.
+
+A `RowSchema` lists the fields of a table row as (name, selector, convert)
+and compiles them once per page layout into a plan:
+
+    _JOB_SCHEMA = RowSchema([
+        Field('position', Element('h4')),
+        Field('description_link', Element('h4 a', attribute='href')),
+        Field('company_url', Element('a.company', attribute='href')),
+    ])
+    list_fields = _JOB_SCHEMA.records(list_trs)
+
+Selectors address one value of a row:
+
+- `Element` the first element of a parsed (BeautifulSoup) row matching a
+  path such as 'h4 a' or 'span.when', by its text or an attribute. Every
+  element selector of a schema is matched in one walk of the row, which
+  stops once all of them are found, and fields sharing a path share the
+  match.
+- `Cell` a cell of a row read as a list of cell texts, or one line of it.
+  Each cell is split into lines at most once.
+- `Key` a value of a row that is already a dictionary, e.g. cached fields.
+
+`records` converts column by column: each field's converter is looked up
+once per batch and mapped over the column, and constants a converter needs
+(e.g. today's date) are bound once per call instead of once per row.
+'''
+
+from functools import partial
+
+_REQUIRED = object()
+_MISSING = object()
+
+
+class Cell(object):
+    '''Selects a cell of a row read as a list of cell texts.
+
+    Attributes:
+        index: Index of the cell.
+        line: Index of the line of the cell, or None for the whole cell.
+    '''
+
+    __slots__ = ('index', 'line')
+
+    def __init__(self, index: int, line: int = None) -> None:
+        self.index = index
+        self.line = line
+
+    def __repr__(self) -> str:
+        return f'Cell({self.index}, line={self.line})'
+
+
+class Element(object):
+    '''Selects the first element of a parsed row matching a path.
+
+    A path is a space separated list of steps, each a tag name followed by
+    the classes the element must have (e.g. 'span.when' or 'h4 a'); every
+    step is a descendant of the previous one. The classes are matched as a
+    set, so their order and any other classes of the element do not matter.
+
+    Attributes:
+        path: Path of the element.
+        attribute: Attribute read, or None for the element's text.
+    '''
+
+    __slots__ = ('path', 'attribute', '_steps')
+
+    def __init__(self, path: str, attribute: str = None) -> None:
+        self.path = path
+        self.attribute = attribute
+
+        list_steps = []
+        for step in path.split():
+            tag, *list_classes = step.split('.')
+            list_steps.append((tag, frozenset(list_classes)))
+        self._steps = tuple(list_steps)
+
+    def __repr__(self) -> str:
+        return f'Element({self.path!r}, attribute={self.attribute!r})'
+
+
+class Key(object):
+    '''Selects a value of a row that is a dictionary.
+
+    Attributes:
+        key: Key of the value.
+    '''
+
+    __slots__ = ('key',)
+
+    def __init__(self, key) -> None:
+        self.key = key
+
+    def __repr__(self) -> str:
+        return f'Key({self.key!r})'
+
+
+class Field(object):
+    '''Stores one field of a row schema.
+
+    Attributes:
+        name: Name of the field, or a tuple of names the converted value is unpacked into.
+        selector: `Cell`, `Element` or `Key`.
+        convert: Called with the raw value (and the field's constants as keywords). Kept as is if None.
+        default: Raw value of a field missing from the row. Missing fields raise if omitted.
+        constants: Names of the constants passed to `convert`.
+    '''
+
+    __slots__ = ('name', 'selector', 'convert', 'default', 'constants')
+
+    def __init__(self, name, selector, convert=None, default=_REQUIRED, constants=()) -> None:
+        self.name = name
+        self.selector = selector
+        self.convert = convert
+        self.default = default
+        self.constants = tuple(constants)
+
+    def __repr__(self) -> str:
+        return f'Field({self.name!r}, {self.selector!r})'
+
+
+def _element_matches(element, tag, set_classes) -> bool:
+    if element.name != tag:
+        return False
+    if not set_classes:
+        return True
+    return set_classes.issubset(element.get('class') or ())
+
+
+class RowSchema(object):
+    '''Extraction plan compiled from a list of fields.
+
+    Attributes:
+        fields: Fields, in order.
+        names: Names of the extracted record, in order, tuple names unpacked.
+    '''
+
+    def __init__(self, fields) -> None:
+        self.fields = tuple(fields)
+
+        list_names = []
+        for field in self.fields:
+            if isinstance(field.name, tuple):
+                list_names.extend(field.name)
+            else:
+                list_names.append(field.name)
+        self.names = tuple(list_names)
+
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f'Duplicate field names: {self.names}')
+
+        self._n_fields = len(self.fields)
+        self._list_defaults = [field.default for field in self.fields]
+        self._has_unpacked = any(isinstance(field.name, tuple) for field in self.fields)
+
+        # Cells: (index, [(line, slot)]), each cell split once
+        dict_cells = {}
+        # Elements: [(steps, [(attribute, slot)])], one entry per distinct path
+        dict_paths = {}
+        self._list_keys = []  # (key, slot)
+
+        for slot, field in enumerate(self.fields):
+            selector = field.selector
+            if isinstance(selector, Cell):
+                dict_cells.setdefault(selector.index, []).append((selector.line, slot))
+            elif isinstance(selector, Element):
+                dict_paths.setdefault(selector._steps, []).append((selector.attribute, slot))
+            elif isinstance(selector, Key):
+                self._list_keys.append((selector.key, slot))
+            else:
+                raise TypeError(f'Unknown selector of field {field.name!r}: {selector!r}')
+
+        self._list_cells = list(dict_cells.items())
+        self._list_paths = list(dict_paths.items())
+
+        self._list_converters = [(slot, field) for slot, field in enumerate(self.fields) if field.convert is not None]
+
+    def extract(self, row) -> list:
+        '''Returns the raw values of a row's fields, in field order, without converting them.
+
+        Args:
+            row: A list of cell texts for `Cell` fields, a parsed element for `Element` fields,
+                or a dictionary for `Key` fields.
+
+        Returns:
+            list_values [list]: Raw values.
+        '''
+
+        list_values = [_MISSING] * self._n_fields
+
+        if self._list_cells:
+            self._extract_cells(row, list_values)
+        if self._list_paths:
+            self._extract_elements(row, list_values)
+        for key, slot in self._list_keys:
+            if key in row:
+                list_values[slot] = row[key]
+
+        for slot, value in enumerate(list_values):
+            if value is _MISSING:
+                default = self._list_defaults[slot]
+                if default is _REQUIRED:
+                    raise LookupError(f'Field {self.fields[slot].name!r} not found in the row')
+                list_values[slot] = default
+
+        return list_values
+
+    def record(self, row, **constants) -> dict:
+        '''Extracts and converts the fields of one row.
+
+        Args:
+            row: Row. See `extract`.
+            **constants: Constants of the fields' converters.
+
+        Returns:
+            dict_record [dict]: Converted values keyed by name.
+        '''
+
+        list_values = self.extract(row)
+        for slot, field in self._list_converters:
+            dict_constants = {name: constants[name] for name in field.constants}
+            list_values[slot] = field.convert(list_values[slot], **dict_constants)
+
+        return dict(zip(self.names, self._flatten(list_values)))
+
+    def records(self, rows, **constants) -> list:
+        '''Extracts the fields of every row, then converts them column by column.
+
+        Args:
+            rows [iterable]: Rows. See `extract`.
+            **constants: Constants of the fields' converters, bound once for all rows.
+
+        Returns:
+            list_records [list]: Converted values of each row keyed by name, in row order.
+        '''
+
+        list_rows = [self.extract(row) for row in rows]
+        if not list_rows:
+            return []
+
+        list_columns = [list(column) for column in zip(*list_rows)]
+        for slot, field in self._list_converters:
+            convert = field.convert
+            if field.constants:
+                convert = partial(convert, **{name: constants[name] for name in field.constants})
+            list_columns[slot] = list(map(convert, list_columns[slot]))
+
+        names = self.names
+        if self._has_unpacked:
+            return [dict(zip(names, self._flatten(list_values))) for list_values in zip(*list_columns)]
+        return [dict(zip(names, list_values)) for list_values in zip(*list_columns)]
+
+    def _flatten(self, list_values):
+        if not self._has_unpacked:
+            return list_values
+
+        list_flat = []
+        for field, value in zip(self.fields, list_values):
+            if isinstance(field.name, tuple):
+                list_flat.extend(value)
+            else:
+                list_flat.append(value)
+        return list_flat
+
+    def _extract_cells(self, list_cells, list_values) -> None:
+        n_cells = len(list_cells)
+        for index, list_lines in self._list_cells:
+            if index >= n_cells:
+                continue
+
+            cell = list_cells[index]
+            list_cell_lines = None
+            for line, slot in list_lines:
+                if line is None:
+                    list_values[slot] = cell
+                    continue
+
+                if list_cell_lines is None:
+                    list_cell_lines = cell.split('\n')
+                if line < len(list_cell_lines):
+                    list_values[slot] = list_cell_lines[line]
+
+    def _extract_elements(self, root, list_values) -> None:
+        '''Matches every element path in one walk of the row, in document order.'''
+
+        list_paths = self._list_paths
+        n_missing = len(list_paths)
+        list_found = [False] * n_missing
+
+        # (element, steps of each path matched by its ancestors), children pushed in reverse
+        list_stack = [(child, (0,) * n_missing) for child in reversed(root.contents) if not isinstance(child, str)]
+        while list_stack:
+            element, progress = list_stack.pop()
+
+            list_progress = list(progress)
+            for index, (steps, list_outputs) in enumerate(list_paths):
+                if list_found[index]:
+                    continue
+
+                tag, set_classes = steps[progress[index]]
+                if not _element_matches(element, tag, set_classes):
+                    continue
+
+                list_progress[index] += 1
+                if list_progress[index] == len(steps):
+                    list_found[index] = True
+                    n_missing -= 1
+                    for attribute, slot in list_outputs:
+                        list_values[slot] = element.text if attribute is None else element.get(attribute)
+
+            if n_missing == 0:
+                return
+
+            progress = tuple(list_progress)
+            # Text and comments are strings
+            list_stack.extend((child, progress) for child in reversed(element.contents) if not isinstance(child, str))
@@ -0,0 +1,295 @@
+'''Persistent HTTP response cache with conditional revalidation.
+
+Responses are stored on disk keyed by URL together with their `ETag` and
+`Last-Modified` validators. A stale entry is revalidated with a conditional
+GET; a `304 Not Modified` reuses the stored body and the stored parse result,
+so nothing is transferred or parsed again.
+'''
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+_DEFAULT_DIRECTORY = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+                                  'scraping')
+_DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_META_SUFFIX = '.json'
+_BODY_SUFFIX = '.body'
+
+
+class CachedResponse(object):
+    '''Stores a response served through `HttpCache`.
+
+    Attributes:
+        url: Requested URL.
+        status_code: HTTP status of the stored or received response.
+        text: Decoded body.
+        parsed: Result of the parse function, reused while the page is unchanged.
+        from_cache: True if no request was made because the entry was fresh.
+        revalidated: True if the server answered 304 Not Modified.
+        n_bytes: Body bytes transferred over the network (0 when served from the cache).
+    '''
+
+    def __init__(self, url, status_code, text, parsed=None, from_cache=False, revalidated=False, n_bytes=0) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.parsed = parsed
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+        self.n_bytes = n_bytes
+
+    def raise_for_status(self) -> None:
+        '''Raises `requests.HTTPError` unless the status is 2xx, i.e. unless the page was parsed.'''
+
+        if not 200 <= self.status_code < 300:
+            raise requests.HTTPError(f'{self.status_code} for url: {self.url}')
+
+    def __repr__(self) -> str:
+        return (f'CachedResponse(url={self.url!r}, status_code={self.status_code}, '
+                f'from_cache={self.from_cache}, revalidated={self.revalidated})')
+
+
+class HttpCache(object):
+    '''Stores responses on disk and revalidates them with conditional GETs.
+
+    Attributes:
+        directory: Directory holding the cache entries.
+        ttl: Seconds an entry is served without revalidation. Always revalidates if None.
+        max_bytes: Upper bound of stored bodies in bytes. Least recently used entries are evicted first.
+        max_entries: Upper bound of stored entries. Unbounded if None.
+    '''
+
+    def __init__(self, directory=None, ttl=None, max_bytes=_DEFAULT_MAX_BYTES, max_entries=None) -> None:
+        self.directory = directory if directory is not None else _DEFAULT_DIRECTORY
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._lru = None  # key -> body size, least recently used first
+        self._total_bytes = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __getstate__(self) -> dict:
+        # Worker processes get their own lock and reload the index from disk
+        return {'directory': self.directory, 'ttl': self.ttl, 'max_bytes': self.max_bytes, 'max_entries': self.max_entries}
+
+    def __setstate__(self, dict_state) -> None:
+        self.__init__(**dict_state)
+
+    def fetch(self, url, session=None, parse=None) -> CachedResponse:
+        '''Fetches a URL through the cache.
+
+        Args:
+            url [str]: URL to fetch.
+            session [requests.Session]: Session used on a miss or revalidation.
+            parse [callable]: Turns the body text into a JSON-serializable value.
+                Stored with the entry and reused until the page changes.
+
+        Returns:
+            response [CachedResponse]: Cached or fresh response. Responses other than 2xx are
+                neither parsed nor stored.
+
+        Raises:
+            requests.HTTPError: The server answered with a 4xx or 5xx status.
+        '''
+
+        key = _key(url)
+        dict_meta = self._read_meta(key)
+
+        if dict_meta is not None and self.ttl is not None \
+                and time.time() - dict_meta['validated_at'] < self.ttl:
+            return self._hit(key, dict_meta, parse=parse, from_cache=True)
+
+        dict_headers = {}
+        if dict_meta is not None:
+            if dict_meta.get('etag'):
+                dict_headers['If-None-Match'] = dict_meta['etag']
+            if dict_meta.get('last_modified'):
+                dict_headers['If-Modified-Since'] = dict_meta['last_modified']
+
+        http = session if session is not None else requests
+        response = http.get(url, headers=dict_headers)
+
+        if response.status_code == 304 and dict_meta is not None:
+            dict_meta['validated_at'] = time.time()
+            dict_meta['etag'] = response.headers.get('ETag', dict_meta.get('etag'))
+            dict_meta['last_modified'] = response.headers.get('Last-Modified', dict_meta.get('last_modified'))
+            return self._hit(key, dict_meta, parse=parse, revalidated=True)
+
+        if not 200 <= response.status_code < 300:
+            # Error pages are neither parsed nor stored, so callers cannot take them for an empty page
+            response.raise_for_status()
+            return CachedResponse(url=url,
+                                  status_code=response.status_code,
+                                  text=response.text,
+                                  n_bytes=len(response.content))
+
+        text = response.text
+        parsed = parse(text) if parse is not None else None
+
+        if response.status_code == 200:
+            self._store(key, url=url, response=response, parsed=parsed, has_parsed=parse is not None)
+
+        return CachedResponse(url=url,
+                              status_code=response.status_code,
+                              text=text,
+                              parsed=parsed,
+                              n_bytes=len(response.content))
+
+    def invalidate(self, url) -> None:
+        '''Removes the entry of a URL.'''
+
+        with self._lock:
+            self._load_index()
+            self._remove(_key(url))
+
+    def clear(self) -> None:
+        '''Removes every entry.'''
+
+        with self._lock:
+            self._load_index()
+            for key in list(self._lru):
+                self._remove(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load_index()
+            return len(self._lru)
+
+    def _path(self, key, suffix) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def _read_meta(self, key) -> dict:
+        try:
+            with open(self._path(key, _META_SUFFIX), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _hit(self, key, dict_meta, parse, from_cache=False, revalidated=False) -> CachedResponse:
+        try:
+            with open(self._path(key, _BODY_SUFFIX), 'rb') as f:
+                body = f.read()
+        except OSError:
+            body = b''
+
+        text = body.decode(dict_meta.get('encoding') or 'utf-8', errors='replace')
+
+        has_parsed = 'parsed' in dict_meta
+        if parse is not None and not has_parsed:
+            dict_meta['parsed'] = parse(text)
+        parsed = dict_meta.get('parsed')
+
+        if revalidated or (parse is not None and not has_parsed):
+            self._write_meta(key, dict_meta)
+
+        with self._lock:
+            self._load_index()
+            if key in self._lru:
+                self._lru.move_to_end(key)
+        try:
+            os.utime(self._path(key, _META_SUFFIX))
+        except OSError:
+            pass
+
+        return CachedResponse(url=dict_meta['url'],
+                              status_code=dict_meta['status_code'],
+                              text=text,
+                              parsed=parsed,
+                              from_cache=from_cache,
+                              revalidated=revalidated)
+
+    def _store(self, key, url, response, parsed, has_parsed) -> None:
+        body = response.content
+        dict_meta = {
+            'url': url,
+            'status_code': response.status_code,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'encoding': response.encoding or response.apparent_encoding,
+            'validated_at': time.time(),
+            'size': len(body)
+        }
+        if has_parsed:
+            dict_meta['parsed'] = parsed
+
+        _atomic_write(self._path(key, _BODY_SUFFIX), body)
+        self._write_meta(key, dict_meta)
+
+        with self._lock:
+            self._load_index()
+            if key in self._lru:
+                self._total_bytes -= self._lru.pop(key)
+            self._lru[key] = len(body)
+            self._total_bytes += len(body)
+            self._evict()
+
+    def _write_meta(self, key, dict_meta) -> None:
+        _atomic_write(self._path(key, _META_SUFFIX), json.dumps(dict_meta).encode('utf-8'))
+
+    def _load_index(self) -> None:
+        '''Builds the LRU order from the entries on disk on first use.'''
+
+        if self._lru is not None:
+            return
+
+        list_entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(_META_SUFFIX):
+                continue
+            key = name[:-len(_META_SUFFIX)]
+            try:
+                accessed = os.stat(self._path(key, _META_SUFFIX)).st_mtime
+                size = os.stat(self._path(key, _BODY_SUFFIX)).st_size
+            except OSError:
+                continue
+            list_entries.append((accessed, key, size))
+
+        self._lru = OrderedDict()
+        for _, key, size in sorted(list_entries):
+            self._lru[key] = size
+            self._total_bytes += size
+
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._lru and self._over_limit():
+            self._remove(next(iter(self._lru)))
+
+    def _over_limit(self) -> bool:
+        if self._total_bytes > self.max_bytes:
+            return True
+        return self.max_entries is not None and len(self._lru) > self.max_entries
+
+    def _remove(self, key) -> None:
+        self._total_bytes -= self._lru.pop(key, 0)
+        for suffix in (_META_SUFFIX, _BODY_SUFFIX):
+            try:
+                os.remove(self._path(key, suffix))
+            except OSError:
+                pass
+
+
+def _key(url) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _atomic_write(path, data) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,303 @@
+'''Per-stage timing and counters for the scrapers.
+
+Pass a `Metrics` to an `entry_point` to record stage latency histograms,
+per-URL fetch timings, bytes downloaded and row counters, then `flush()` it to
+one or more sinks (logging, a JSON file or Prometheus text). Without one the
+scrapers use `NULL_METRICS`, whose methods do nothing.
+'''
+
+import json
+import logging
+import threading
+import time
+
+_DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_PROMETHEUS_PREFIX = 'scrape'
+
+
+class Histogram(object):
+    '''Stores latency observations in cumulative buckets.
+
+    Attributes:
+        buckets: Upper bounds of the buckets in seconds.
+        counts: Observations at or below each bound.
+        count: Number of observations.
+        total: Sum of observations in seconds.
+        minimum: Smallest observation.
+        maximum: Largest observation.
+    '''
+
+    __slots__ = ('buckets', 'counts', 'count', 'total', 'minimum', 'maximum')
+
+    def __init__(self, buckets=_DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def observe(self, seconds) -> None:
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.minimum = seconds if self.minimum is None else min(self.minimum, seconds)
+        self.maximum = seconds if self.maximum is None else max(self.maximum, seconds)
+
+    def merge(self, dict_histogram) -> None:
+        '''Adds the observations of a histogram serialized by `to_dict`.'''
+
+        if tuple(dict_histogram['buckets']) != self.buckets:
+            raise ValueError('Histograms have different buckets')
+
+        for index, count in enumerate(dict_histogram['buckets'].values()):
+            self.counts[index] += count
+        self.count += dict_histogram['count']
+        self.total += dict_histogram['sum']
+        for value in (dict_histogram['min'], dict_histogram['max']):
+            if value is not None:
+                self.minimum = value if self.minimum is None else min(self.minimum, value)
+                self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def to_dict(self) -> dict:
+        return {
+            'buckets': dict(zip(self.buckets, self.counts)),
+            'count': self.count,
+            'sum': self.total,
+            'min': self.minimum,
+            'max': self.maximum
+        }
+
+
+class _Timer(object):
+    __slots__ = ('_metrics', '_stage', '_start')
+
+    def __init__(self, metrics, stage) -> None:
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self) -> '_Timer':
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._metrics.observe(self._stage, time.perf_counter() - self._start)
+
+
+class Metrics(object):
+    '''Collects stage latencies, fetch timings and counters. Thread-safe.
+
+    Attributes:
+        sinks: Sinks written by `flush`.
+    '''
+
+    enabled = True
+
+    def __init__(self, sinks=(), buckets=_DEFAULT_BUCKETS) -> None:
+        self.sinks = list(sinks)
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._dict_histograms = {}
+        self._dict_counters = {}
+        self._dict_fetches = {}
+
+    def stage(self, name) -> _Timer:
+        '''Returns a context manager timing a stage.'''
+
+        return _Timer(self, name)
+
+    def observe(self, stage, seconds) -> None:
+        '''Records the latency of a stage.'''
+
+        with self._lock:
+            self._histogram(stage).observe(seconds)
+
+    def increment(self, name, value=1) -> None:
+        '''Adds to a counter.'''
+
+        with self._lock:
+            self._dict_counters[name] = self._dict_counters.get(name, 0) + value
+
+    def record_fetch(self, url, seconds, n_bytes, status_code=None) -> None:
+        '''Records one HTTP fetch.'''
+
+        with self._lock:
+            dict_fetch = self._dict_fetches.get(url)
+            if dict_fetch is None:
+                dict_fetch = self._dict_fetches[url] = {'count': 0, 'seconds': 0.0, 'bytes': 0, 'status_code': None}
+            dict_fetch['count'] += 1
+            dict_fetch['seconds'] += seconds
+            dict_fetch['bytes'] += n_bytes
+            dict_fetch['status_code'] = status_code
+
+            self._histogram('fetch').observe(seconds)
+
+            self._dict_counters['bytes_downloaded'] = self._dict_counters.get('bytes_downloaded', 0) + n_bytes
+
+    def merge(self, dict_snapshot) -> None:
+        '''Adds a snapshot, e.g. one recorded in a worker process.
+
+        Args:
+            dict_snapshot [dict]: A dictionary returned by `snapshot`.
+        '''
+
+        with self._lock:
+            for stage, dict_histogram in dict_snapshot['stages'].items():
+                self._histogram(stage).merge(dict_histogram)
+            for name, value in dict_snapshot['counters'].items():
+                self._dict_counters[name] = self._dict_counters.get(name, 0) + value
+            for url, dict_other in dict_snapshot['fetches'].items():
+                dict_fetch = self._dict_fetches.get(url)
+                if dict_fetch is None:
+                    self._dict_fetches[url] = dict(dict_other)
+                else:
+                    dict_fetch['count'] += dict_other['count']
+                    dict_fetch['seconds'] += dict_other['seconds']
+                    dict_fetch['bytes'] += dict_other['bytes']
+                    dict_fetch['status_code'] = dict_other['status_code']
+
+    def snapshot(self) -> dict:
+        '''Returns everything recorded so far.
+
+        Returns:
+            dict_snapshot [dict]: A dictionary with 'stages', 'counters' and 'fetches'.
+        '''
+
+        with self._lock:
+            return {
+                'stages': {stage: histogram.to_dict() for stage, histogram in self._dict_histograms.items()},
+                'counters': dict(self._dict_counters),
+                'fetches': {url: dict(dict_fetch) for url, dict_fetch in self._dict_fetches.items()}
+            }
+
+    def flush(self) -> None:
+        '''Writes a snapshot to every sink.'''
+
+        dict_snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.write(dict_snapshot)
+
+    def _histogram(self, stage) -> Histogram:
+        histogram = self._dict_histograms.get(stage)
+        if histogram is None:
+            histogram = self._dict_histograms[stage] = Histogram(self._buckets)
+        return histogram
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _NullMetrics(object):
+    '''Metrics that record nothing.'''
+
+    enabled = False
+    sinks = ()
+
+    def stage(self, name) -> _NullTimer:
+        return _NULL_TIMER
+
+    def observe(self, stage, seconds) -> None:
+        pass
+
+    def increment(self, name, value=1) -> None:
+        pass
+
+    def record_fetch(self, url, seconds, n_bytes, status_code=None) -> None:
+        pass
+
+    def merge(self, dict_snapshot) -> None:
+        pass
+
+    def snapshot(self) -> dict:
+        return {'stages': {}, 'counters': {}, 'fetches': {}}
+
+    def flush(self) -> None:
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+class LoggingSink(object):
+    '''Logs a one-line summary per stage and the counters.'''
+
+    def __init__(self, logger=None, level=logging.INFO) -> None:
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+        self._level = level
+
+    def write(self, dict_snapshot) -> None:
+        for stage, dict_histogram in sorted(dict_snapshot['stages'].items()):
+            self._logger.log(self._level, 'stage=%s count=%d sum=%.6fs min=%.6fs max=%.6fs',
+                             stage, dict_histogram['count'], dict_histogram['sum'],
+                             dict_histogram['min'], dict_histogram['max'])
+        for name, value in sorted(dict_snapshot['counters'].items()):
+            self._logger.log(self._level, 'counter=%s value=%s', name, value)
+
+
+class JsonFileSink(object):
+    '''Writes the snapshot as JSON, replacing the file on every flush.'''
+
+    def __init__(self, path) -> None:
+        self._path = path
+
+    def write(self, dict_snapshot) -> None:
+        with open(self._path, 'w', encoding='utf-8') as f:
+            json.dump(dict_snapshot, f, indent=2, default=str)
+
+
+class PrometheusTextSink(object):
+    '''Writes the snapshot in the Prometheus text exposition format.'''
+
+    def __init__(self, path) -> None:
+        self._path = path
+
+    def write(self, dict_snapshot) -> None:
+        with open(self._path, 'w', encoding='utf-8') as f:
+            f.write(prometheus_text(dict_snapshot))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def prometheus_text(dict_snapshot) -> str:
+    '''Renders a snapshot in the Prometheus text exposition format.'''
+
+    list_lines = []
+
+    name = f'{_PROMETHEUS_PREFIX}_stage_seconds'
+    list_lines.append(f'# TYPE {name} histogram')
+    for stage, dict_histogram in sorted(dict_snapshot['stages'].items()):
+        label = f'stage="{_escape_label(stage)}"'
+        for bound, count in dict_histogram['buckets'].items():
+            list_lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+        list_lines.append(f'{name}_bucket{{{label},le="+Inf"}} {dict_histogram["count"]}')
+        list_lines.append(f'{name}_sum{{{label}}} {dict_histogram["sum"]}')
+        list_lines.append(f'{name}_count{{{label}}} {dict_histogram["count"]}')
+
+    for counter, value in sorted(dict_snapshot['counters'].items()):
+        name = f'{_PROMETHEUS_PREFIX}_{counter}_total'
+        list_lines.append(f'# TYPE {name} counter')
+        list_lines.append(f'{name} {value}')
+
+    if dict_snapshot['fetches']:
+        for field in ('seconds', 'bytes'):
+            name = f'{_PROMETHEUS_PREFIX}_url_fetch_{field}_total'
+            list_lines.append(f'# TYPE {name} counter')
+            for url, dict_fetch in sorted(dict_snapshot['fetches'].items()):
+                list_lines.append(f'{name}{{url="{_escape_label(url)}"}} {dict_fetch[field]}')
+
+    return '\n'.join(list_lines) + '\n'
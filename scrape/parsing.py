@@ -0,0 +1,98 @@
+'''HTML parsing with the fastest installed BeautifulSoup tree builder.
+
+`parse_html` builds the tree with lxml when it is installed and falls back to
+the pure-Python `html.parser`. Pass a `SoupStrainer` as `parse_only` to build
+only the elements a scraper reads (e.g. `tr.job` rows or tables) instead of
+the whole document, or a `LazyStrainer` to declare it at module level.
+
+Neither bs4 nor lxml is imported before the first page is parsed, so a run
+answered from the cache (or a `--help`) does not pay for loading them.
+'''
+
+import os
+
+BACKEND_LXML = 'lxml'
+BACKEND_HTML_PARSER = 'html.parser'
+
+_ENV_BACKEND = 'SCRAPE_HTML_BACKEND'
+
+_list_backends = None  # Installed backends, probed on first use
+
+
+class LazyStrainer(object):
+    '''Arguments of a `bs4.SoupStrainer` that is only created when a page is first parsed with it.
+
+    Attributes:
+        args: Positional arguments of `SoupStrainer`.
+        kwargs: Keyword arguments of `SoupStrainer`.
+    '''
+
+    __slots__ = ('args', 'kwargs', '_strainer')
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.args = args
+        self.kwargs = kwargs
+        self._strainer = None
+
+    def strainer(self):
+        '''Returns the `bs4.SoupStrainer`, creating it on first use.'''
+
+        if self._strainer is None:
+            from bs4 import SoupStrainer
+
+            self._strainer = SoupStrainer(*self.args, **self.kwargs)
+        return self._strainer
+
+
+def available_backends() -> list:
+    '''Returns the installed backends, fastest first. lxml is probed on the first call.'''
+
+    global _list_backends
+
+    if _list_backends is None:
+        try:
+            import lxml.etree  # noqa: F401
+        except ImportError:
+            _list_backends = [BACKEND_HTML_PARSER]
+        else:
+            _list_backends = [BACKEND_LXML, BACKEND_HTML_PARSER]
+    return list(_list_backends)
+
+
+def default_backend() -> str:
+    '''Returns the backend `parse_html` uses when none is given.
+
+    The `SCRAPE_HTML_BACKEND` environment variable overrides the fastest installed backend.
+    '''
+
+    backend = os.environ.get(_ENV_BACKEND)
+    if backend:
+        if backend not in available_backends():
+            raise ValueError(f'HTML backend is not installed: {backend}')
+        return backend
+    return available_backends()[0]
+
+
+def parse_html(html, parse_only=None, backend=None):
+    '''Parses HTML into a BeautifulSoup tree.
+
+    Args:
+        html [str]: HTML.
+        parse_only [bs4.SoupStrainer]: Builds only the matching elements and their descendants. May be a `LazyStrainer`.
+        backend [str]: 'lxml' or 'html.parser'. Defaults to `default_backend()`.
+
+    Returns:
+        bs [bs4.BeautifulSoup]: Parsed tree.
+    '''
+
+    if backend is None:
+        backend = default_backend()
+    elif backend not in available_backends():
+        raise ValueError(f'HTML backend is not installed: {backend}')
+
+    if isinstance(parse_only, LazyStrainer):
+        parse_only = parse_only.strainer()
+
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, backend, parse_only=parse_only)
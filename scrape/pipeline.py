@@ -0,0 +1,277 @@
+'''Runs a scrape as a pipeline of stages joined by bounded queues.
+
+Each stage is a function of one item run by its own worker threads, so
+fetching, parsing, normalizing and writing overlap instead of taking turns:
+
+    pipeline = Pipeline([
+        Stage('fetch', fetch_page, workers=8),
+        Stage('parse', parse_page, processes=True, flat=True),
+        Stage('build', build_record, processes=True),
+    ])
+    pipeline.run(urls, sink=writer)
+
+I/O stages block on the network in their threads. Stages with
+`processes=True` send each item to a process pool shared by the pipeline,
+so HTML parsing and normalization use every core; their functions and items
+must be picklable. The queue after each stage holds at most `queue_size`
+items and a full queue blocks the stage before it, so memory stays bounded
+however fast the source is. The sink runs in the caller's thread and is
+anything with a `write(record)` (e.g. `scrape.export.NdjsonWriter`) or a
+callable; `iter_results` hands the records to code that wants to iterate,
+e.g. `store.save(pipeline.iter_results(urls))`.
+
+Records reach the sink in completion order, not in source order. The first
+error of any stage stops the pipeline and is raised by `run`.
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import queue
+import threading
+import time
+
+from scrape.metrics import NULL_METRICS, Metrics
+
+_QUEUE_SIZE = 16
+_POLL_SECONDS = 0.1  # How often blocked workers check whether the pipeline stopped
+
+_DONE = object()  # End of a stage's input
+_STOPPED = object()  # Returned by `_Run.get` once the pipeline stopped
+
+
+def default_processes() -> int:
+    '''Returns the default size of a pipeline's process pool: one process per CPU, none on a single CPU.'''
+
+    n_cpus = os.cpu_count() or 1
+    return n_cpus if n_cpus > 1 else 0
+
+
+class Stage(object):
+    '''Stores one stage of a pipeline.
+
+    Attributes:
+        name: Name of the stage, also its metrics stage.
+        func: Called with each item. Called with `metrics=` too if `metrics` is set.
+        workers: Number of items the stage works on at a time.
+        processes: Runs `func` in the pipeline's process pool instead of the worker threads.
+        flat: `func` returns an iterable of items, each passed on separately.
+        metrics: Passes a `scrape.metrics.Metrics` to `func`. In processes, it is merged back per item.
+    '''
+
+    __slots__ = ('name', 'func', 'workers', 'processes', 'flat', 'metrics')
+
+    def __init__(self, name, func, workers: int = 1, processes: bool = False, flat: bool = False,
+                 metrics: bool = False) -> None:
+        if workers < 1:
+            raise ValueError(f'A stage needs at least one worker: {name}')
+
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.processes = processes
+        self.flat = flat
+        self.metrics = metrics
+
+    def __repr__(self) -> str:
+        return f'Stage({self.name!r}, workers={self.workers}, processes={self.processes}, flat={self.flat})'
+
+
+def _call_in_process(func, item, flat, pass_metrics, record_metrics) -> tuple:
+    '''Runs a stage function in a worker process and returns (result, metrics snapshot or None).'''
+
+    metrics = Metrics() if record_metrics else NULL_METRICS
+    result = func(item, metrics=metrics) if pass_metrics else func(item)
+    if flat:
+        result = list(result)  # Generators cannot be pickled
+    return result, metrics.snapshot() if record_metrics else None
+
+
+class Pipeline(object):
+    '''Runs items through stages on worker threads and a process pool.
+
+    Attributes:
+        stages: Stages, in order.
+        queue_size: Maximum number of items waiting between two stages.
+        max_processes: Size of the process pool. Defaults to `default_processes()`. Stages marked
+            `processes` run on their worker threads instead if 0, where a pool would only add pickling.
+    '''
+
+    def __init__(self, stages, queue_size: int = _QUEUE_SIZE, max_processes: int = None, metrics=None) -> None:
+        self.stages = tuple(stages)
+        self.queue_size = queue_size
+        self.max_processes = max_processes if max_processes is not None else default_processes()
+
+        if not self.stages:
+            raise ValueError('A pipeline needs at least one stage.')
+
+        self._metrics = metrics if metrics is not None else NULL_METRICS
+
+    def run(self, items, sink) -> int:
+        '''Runs items through the pipeline into a sink.
+
+        Args:
+            items [iterable]: Inputs of the first stage. Read lazily, as the first stage has room.
+            sink: Object with a `write(record)`, or a callable, receiving every record of the last stage.
+
+        Returns:
+            n_records [int]: Records written to the sink.
+        '''
+
+        write = sink.write if hasattr(sink, 'write') else sink
+
+        n_records = 0
+        for record in self.iter_results(items):
+            write(record)
+            n_records += 1
+        return n_records
+
+    def iter_results(self, items):
+        '''Runs items through the pipeline, yielding the records of the last stage as they complete.
+
+        Closing the generator early stops the pipeline.
+
+        Args:
+            items [iterable]: Inputs of the first stage.
+
+        Yields:
+            record: Output of the last stage.
+        '''
+
+        run = _Run(self)
+        run.start(items)
+        try:
+            while True:
+                record = run.get(run.list_queues[-1])
+                if record is _DONE or record is _STOPPED:
+                    break
+                yield record
+        finally:
+            run.stop()
+
+        if run.list_errors:
+            raise run.list_errors[0]
+
+
+class _Run(object):
+    '''State of one run of a pipeline: queues, worker threads and process pool.'''
+
+    def __init__(self, pipeline) -> None:
+        self.pipeline = pipeline
+        self.list_queues = [queue.Queue(maxsize=pipeline.queue_size) for _ in pipeline.stages] \
+            + [queue.Queue(maxsize=pipeline.queue_size)]
+        self.list_errors = []
+
+        self._metrics = pipeline._metrics
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._list_remaining = [stage.workers for stage in pipeline.stages]  # Workers still running per stage
+        self._list_threads = []
+        self._pool = None
+
+        if pipeline.max_processes > 0 and any(stage.processes for stage in pipeline.stages):
+            self._pool = ProcessPoolExecutor(max_workers=pipeline.max_processes)
+
+    def start(self, items) -> None:
+        self._start_thread('pipeline-source', self._feed, items)
+        for index, stage in enumerate(self.pipeline.stages):
+            for n in range(stage.workers):
+                self._start_thread(f'pipeline-{stage.name}-{n}', self._work, index)
+
+    def stop(self) -> None:
+        '''Stops the workers, waits for them and shuts the process pool down.'''
+
+        self._stopped.set()
+        for thread in self._list_threads:
+            thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def get(self, q):
+        '''Takes an item from a queue, or returns `_STOPPED` once the pipeline stopped.'''
+
+        while not self._stopped.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _STOPPED
+
+    def put(self, q, item) -> bool:
+        '''Puts an item on a queue, waiting for room. Returns False if the pipeline stopped first.'''
+
+        while not self._stopped.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _start_thread(self, name, target, *args) -> None:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        self._list_threads.append(thread)
+        thread.start()
+
+    def _fail(self, error) -> None:
+        with self._lock:
+            self.list_errors.append(error)
+        self._stopped.set()
+
+    def _feed(self, items) -> None:
+        try:
+            for item in items:
+                if not self.put(self.list_queues[0], item):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.pipeline.stages[0].workers):
+                self.put(self.list_queues[0], _DONE)
+
+    def _work(self, index) -> None:
+        stage = self.pipeline.stages[index]
+        q_in = self.list_queues[index]
+        q_out = self.list_queues[index + 1]
+
+        try:
+            while True:
+                item = self.get(q_in)
+                if item is _DONE or item is _STOPPED:
+                    break
+
+                start = time.perf_counter()
+                result = self._call(stage, item)
+                self._metrics.observe(f'pipeline_{stage.name}', time.perf_counter() - start)
+
+                list_results = result if stage.flat else (result,)
+                for record in list_results:
+                    if not self.put(q_out, record):
+                        return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self._list_remaining[index] -= 1
+                last = self._list_remaining[index] == 0
+
+            # The last worker of a stage ends the next stage's input
+            if last:
+                n_next = self.pipeline.stages[index + 1].workers if index + 1 < len(self.pipeline.stages) else 1
+                for _ in range(n_next):
+                    self.put(q_out, _DONE)
+
+    def _call(self, stage, item):
+        if not stage.processes or self._pool is None:
+            if stage.metrics:
+                return stage.func(item, metrics=self._metrics)
+            return stage.func(item)
+
+        result, dict_snapshot = self._pool.submit(_call_in_process,
+                                                  stage.func,
+                                                  item,
+                                                  flat=stage.flat,
+                                                  pass_metrics=stage.metrics,
+                                                  record_metrics=stage.metrics and self._metrics.enabled).result()
+        if dict_snapshot is not None:
+            self._metrics.merge(dict_snapshot)
+        return result
@@ -0,0 +1,300 @@
+'''Polite HTTP fetching shared by the scrapers.
+
+`FetchScheduler` sends every request of a scrape and keeps it from being
+throttled or banned:
+
+- a token bucket per host caps the sustained request rate and its bursts,
+- an adaptive concurrency limit per host grows while responses are healthy
+  and halves on 429/5xx responses or latency spikes,
+- failed requests of idempotent methods are retried after a jittered
+  exponential backoff, or after the server's `Retry-After`; POST requests
+  are only retried if the caller opts in with `retry_methods`,
+- every attempt has a connect/read timeout and every call an optional
+  deadline.
+
+It exposes `get` and `post` like a `requests.Session`, so it can be passed
+wherever a session is expected, e.g. to `HttpCache.fetch`.
+'''
+
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scrape.metrics import NULL_METRICS
+
+_DEFAULT_RATE = 5.0  # Requests per second per host
+_DEFAULT_BURST = 10
+_DEFAULT_MAX_CONCURRENCY = 8
+_DEFAULT_TIMEOUT = (5.0, 30.0)  # Connect and read timeouts in seconds
+_DEFAULT_RETRIES = 3
+_DEFAULT_BACKOFF = 0.5
+_MAX_BACKOFF = 30.0
+
+_IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'))
+_RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+_THROTTLE_STATUS_CODES = frozenset((429, 503))
+
+_LATENCY_SMOOTHING = 0.2
+_LATENCY_SPIKE_FACTOR = 3.0
+_LATENCY_WARMUP = 5  # Responses seen before latency spikes count
+
+
+class DeadlineExceeded(requests.Timeout):
+    '''Raised when a request cannot finish before its deadline.'''
+
+
+class _HostState(object):
+    '''Rate limit, concurrency limit and latency of one host.'''
+
+    def __init__(self, rate, burst, max_concurrency, min_concurrency) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+
+        self.condition = threading.Condition()
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.latency = None
+        self.n_responses = 0
+
+    def acquire(self, deadline) -> None:
+        '''Waits for a concurrency slot and a token.'''
+
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+                self.refilled_at = now
+
+                if self.in_flight < int(self.limit) and now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+
+                if self.in_flight >= int(self.limit):
+                    wait = None
+                else:
+                    wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        raise DeadlineExceeded('Deadline exceeded while waiting for the rate limit')
+                    wait = remaining if wait is None else wait
+
+                self.condition.wait(wait)
+
+    def release(self, throttled, latency=None, retry_after=None) -> None:
+        '''Returns a slot and adapts the concurrency limit to the outcome.'''
+
+        with self.condition:
+            self.in_flight -= 1
+
+            if latency is not None:
+                spike = self.n_responses >= _LATENCY_WARMUP and latency > _LATENCY_SPIKE_FACTOR * self.latency
+                self.latency = latency if self.latency is None \
+                    else (1 - _LATENCY_SMOOTHING) * self.latency + _LATENCY_SMOOTHING * latency
+                self.n_responses += 1
+                throttled = throttled or spike
+
+            if throttled:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+            self.condition.notify_all()
+
+
+def _new_session(pool_size) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _retry_after(response):
+    '''Returns the seconds a response asks to wait, or None.'''
+
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class FetchScheduler(object):
+    '''Sends requests within per-host rate and concurrency limits, with retries.
+
+    Attributes:
+        rate: Sustained requests per second per host.
+        burst: Requests a host may receive at once after being idle.
+        max_concurrency: Upper bound of the adaptive concurrency limit per host.
+        min_concurrency: Lower bound of the adaptive concurrency limit per host.
+        timeout: Connect and read timeouts of each attempt in seconds.
+        retries: Retries after a connection error, a timeout or a 429/5xx response.
+        retry_methods: HTTP methods that are retried. Idempotent ones by default, as a failed POST
+            may still have been applied; add 'POST' where resending it is harmless, e.g. a search form.
+        backoff: Base of the exponential backoff between retries in seconds.
+        deadline: Seconds a call may take including waits and retries. Unbounded if None.
+
+    Without a `session`, the scheduler creates (and closes) a keep-alive session
+    whose connection pool holds `pool_size` connections (`max_concurrency` if None).
+    '''
+
+    def __init__(self,
+                 session=None,
+                 rate: float = _DEFAULT_RATE,
+                 burst: int = _DEFAULT_BURST,
+                 max_concurrency: int = _DEFAULT_MAX_CONCURRENCY,
+                 min_concurrency: int = 1,
+                 timeout=_DEFAULT_TIMEOUT,
+                 retries: int = _DEFAULT_RETRIES,
+                 retry_methods=_IDEMPOTENT_METHODS,
+                 backoff: float = _DEFAULT_BACKOFF,
+                 deadline: float = None,
+                 pool_size: int = None,
+                 metrics=None) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_methods = frozenset(method.upper() for method in retry_methods)
+        self.backoff = backoff
+        self.deadline = deadline
+
+        self._own_session = session is None
+        self._session = session if session is not None else _new_session(pool_size or max_concurrency)
+        self._metrics = metrics if metrics is not None else NULL_METRICS
+        self._lock = threading.Lock()
+        self._dict_hosts = {}
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, deadline: float = None, **kwargs) -> requests.Response:
+        '''Sends a request, retrying it on connection errors, timeouts and 429/5xx responses if its method is
+        one of `retry_methods`.
+
+        Args:
+            method [str]: HTTP method.
+            url [str]: URL.
+            deadline [float]: Seconds the call may take. Defaults to the scheduler's `deadline`.
+            **kwargs: Other arguments of `requests.Session.request`.
+
+        Returns:
+            response [requests.Response]: Last response. A 429/5xx response is returned once retries run out.
+
+        Raises:
+            DeadlineExceeded: If the deadline passed before a response arrived.
+            requests.RequestException: If the last attempt failed without a response.
+        '''
+
+        if deadline is None:
+            deadline = self.deadline
+        deadline_at = time.monotonic() + deadline if deadline is not None else None
+
+        host = self._host(urlsplit(url).netloc)
+        retries = self.retries if method.upper() in self.retry_methods else 0
+
+        for attempt in range(retries + 1):
+            host.acquire(deadline_at)
+
+            start = time.monotonic()
+            try:
+                response = self._session.request(method, url, timeout=self._timeout(deadline_at), **kwargs)
+            except DeadlineExceeded:
+                host.release(throttled=False)
+                raise
+            except (requests.ConnectionError, requests.Timeout) as error:
+                host.release(throttled=True)
+                last_error, retry_after = error, None
+            except BaseException:
+                host.release(throttled=False)
+                raise
+            else:
+                status_code = response.status_code
+                retry_after = _retry_after(response) if status_code in _THROTTLE_STATUS_CODES else None
+                host.release(throttled=status_code in _RETRY_STATUS_CODES,
+                             latency=time.monotonic() - start,
+                             retry_after=retry_after)
+
+                if status_code not in _RETRY_STATUS_CODES or attempt == retries:
+                    return response
+                # Releases the connection of a response that is dropped for a retry, e.g. one sent with stream=True
+                response.close()
+                self._metrics.increment('http_throttled' if status_code in _THROTTLE_STATUS_CODES else 'http_5xx')
+                last_error = None
+
+            if attempt == retries:
+                break
+
+            wait = random.uniform(0, min(_MAX_BACKOFF, self.backoff * 2 ** attempt))
+            if retry_after is not None:
+                wait = max(wait, retry_after)
+            if deadline_at is not None and time.monotonic() + wait >= deadline_at:
+                raise DeadlineExceeded(f'Deadline exceeded before retrying {url}')
+
+            self._metrics.increment('http_retries')
+            time.sleep(wait)
+
+        raise last_error
+
+    def close(self) -> None:
+        '''Closes the session if the scheduler created it.'''
+
+        if self._own_session:
+            self._session.close()
+
+    def __enter__(self) -> 'FetchScheduler':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _host(self, netloc) -> _HostState:
+        with self._lock:
+            host = self._dict_hosts.get(netloc)
+            if host is None:
+                host = self._dict_hosts[netloc] = _HostState(rate=self.rate,
+                                                             burst=self.burst,
+                                                             max_concurrency=self.max_concurrency,
+                                                             min_concurrency=self.min_concurrency)
+            return host
+
+    def _timeout(self, deadline_at):
+        if deadline_at is None:
+            return self.timeout
+
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded('Deadline exceeded before sending the request')
+
+        connect_timeout, read_timeout = self.timeout if isinstance(self.timeout, tuple) else (self.timeout,) * 2
+        return min(connect_timeout, remaining), min(read_timeout, remaining)
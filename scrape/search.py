@@ -0,0 +1,219 @@
+'''In-process keyword search shared by the scrapers.
+
+`TextIndex` is an inverted index: every field of every record is split into
+normalized tokens (lower case, accents removed) and each token maps to the
+records containing it with a log-scaled, field-weighted frequency. A query
+matches the records containing every query term, either exactly or as a
+prefix of a token, ranked by tf-idf. Terms are matched rarest first and each
+later term only scores the records still matching, so common terms stay
+cheap. Adding a record whose key is already indexed
+replaces it, so fresh scrape results can be fed in as they arrive.
+
+Subclasses declare `_FIELDS` as (name, getter, weight) and `_key`.
+'''
+
+from bisect import bisect_left
+import heapq
+import math
+from operator import itemgetter
+import re
+import unicodedata
+
+_RE_TOKEN = re.compile(r'[0-9a-z]+')
+
+_DEFAULT_LIMIT = 10
+_PREFIX_PENALTY = 0.5  # Score multiplier of a prefix match relative to an exact match
+_MAX_PREFIX_EXPANSIONS = 64  # Tokens a query term may expand to as a prefix
+
+
+def tokenize(text) -> list:
+    '''Splits text into lower-case ASCII tokens, dropping accents and punctuation.'''
+
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return _RE_TOKEN.findall(text.lower())
+
+
+class TextIndex(object):
+    '''Base class of the scrapers' inverted indexes.
+
+    Attributes:
+        prefix: Whether query terms also match tokens they are a prefix of.
+        max_prefix_expansions: Maximum number of longer tokens a query term matches as a prefix, in
+            alphabetical order. A term matching more tokens misses the records of the others. Unbounded if None.
+    '''
+
+    _FIELDS = ()  # (name, getter, weight)
+
+    def __init__(self, records=(), prefix: bool = True, max_prefix_expansions: int = _MAX_PREFIX_EXPANSIONS) -> None:
+        self.prefix = prefix
+        self.max_prefix_expansions = max_prefix_expansions
+
+        self._dict_postings = {}  # token -> {doc id: log(1 + weighted frequency)}
+        self._list_tokens = []  # Sorted vocabulary for prefix lookups
+        self._list_records = []  # doc id -> record, None once removed
+        self._list_doc_tokens = []  # doc id -> {token: weighted frequency}
+        self._dict_doc_ids = {}  # key -> doc id
+        self._list_free_ids = []  # Doc ids of removed records, reused by the next records added
+
+        self.update(records)
+
+    def add(self, record) -> None:
+        '''Indexes a record, replacing the one indexed under the same key.'''
+
+        key = self._key(record)
+        self.remove(key)
+
+        dict_doc_tokens = {}
+        for _, getter, weight in self._FIELDS:
+            for token in tokenize(getter(record)):
+                dict_doc_tokens[token] = dict_doc_tokens.get(token, 0.0) + weight
+
+        # Reusing freed ids keeps an index of replaced records from growing
+        if self._list_free_ids:
+            doc_id = self._list_free_ids.pop()
+            self._list_records[doc_id] = record
+            self._list_doc_tokens[doc_id] = dict_doc_tokens
+        else:
+            doc_id = len(self._list_records)
+            self._list_records.append(record)
+            self._list_doc_tokens.append(dict_doc_tokens)
+        self._dict_doc_ids[key] = doc_id
+
+        for token, frequency in dict_doc_tokens.items():
+            dict_docs = self._dict_postings.get(token)
+            if dict_docs is None:
+                dict_docs = self._dict_postings[token] = {}
+                self._list_tokens.insert(bisect_left(self._list_tokens, token), token)
+            dict_docs[doc_id] = math.log1p(frequency)
+
+    def update(self, records) -> None:
+        '''Indexes every record of an iterable. See `add`.'''
+
+        for record in records:
+            self.add(record)
+
+    def remove(self, key) -> bool:
+        '''Removes the record indexed under a key. Returns whether there was one.'''
+
+        doc_id = self._dict_doc_ids.pop(key, None)
+        if doc_id is None:
+            return False
+
+        for token in self._list_doc_tokens[doc_id]:
+            dict_docs = self._dict_postings[token]
+            del dict_docs[doc_id]
+            if not dict_docs:
+                del self._dict_postings[token]
+                del self._list_tokens[bisect_left(self._list_tokens, token)]
+
+        self._list_records[doc_id] = None
+        self._list_doc_tokens[doc_id] = None
+        self._list_free_ids.append(doc_id)
+        return True
+
+    def search(self, query, limit: int = _DEFAULT_LIMIT) -> list:
+        '''Returns the records matching every term of a query, best first.
+
+        Args:
+            query [str]: Search terms.
+            limit [int]: Maximum number of records returned. Unbounded if None.
+
+        Returns:
+            list_records [list]: Matching records.
+        '''
+
+        return [record for _, record in self.search_scored(query, limit=limit)]
+
+    def search_scored(self, query, limit: int = _DEFAULT_LIMIT) -> list:
+        '''Like `search`, but returns (score, record) pairs.'''
+
+        list_terms = list(dict.fromkeys(tokenize(query)))
+        if not list_terms:
+            return []
+
+        n_docs = len(self._dict_doc_ids)
+
+        list_term_expansions = [self._expansions(term) for term in list_terms]
+        list_term_expansions.sort(key=self._n_postings)
+
+        dict_scores = None
+        for list_expansions in list_term_expansions:
+            dict_scores = self._term_scores(list_expansions, n_docs, dict_scores)
+            if not dict_scores:
+                return []
+
+        # Ties keep insertion order, as `nlargest` is stable
+        list_ranked = heapq.nlargest(limit if limit is not None else len(dict_scores),
+                                     dict_scores.items(),
+                                     key=itemgetter(1))
+        return [(score, self._list_records[doc_id]) for doc_id, score in list_ranked]
+
+    def _n_postings(self, list_expansions) -> int:
+        return sum(len(self._dict_postings[token]) for token, _ in list_expansions)
+
+    def _term_scores(self, list_expansions, n_docs, dict_candidates) -> dict:
+        '''Adds a term's best score to every candidate matching it, or scores every match without candidates.'''
+
+        if dict_candidates is None and len(list_expansions) == 1:
+            token, multiplier = list_expansions[0]
+            dict_docs = self._dict_postings[token]
+            factor = multiplier * math.log(1 + n_docs / len(dict_docs))
+            return {doc_id: factor * weight for doc_id, weight in dict_docs.items()}
+
+        dict_term_scores = {}
+
+        for token, multiplier in list_expansions:
+            dict_docs = self._dict_postings[token]
+            factor = multiplier * math.log(1 + n_docs / len(dict_docs))
+
+            if dict_candidates is not None and len(dict_candidates) < len(dict_docs):
+                items = ((doc_id, dict_docs[doc_id]) for doc_id in dict_candidates if doc_id in dict_docs)
+            else:
+                items = dict_docs.items()
+
+            for doc_id, weight in items:
+                score = factor * weight
+                if score > dict_term_scores.get(doc_id, 0.0):
+                    dict_term_scores[doc_id] = score
+
+        if dict_candidates is None:
+            return dict_term_scores
+        return {doc_id: score + dict_term_scores[doc_id]
+                for doc_id, score in dict_candidates.items() if doc_id in dict_term_scores}
+
+    def _expansions(self, term) -> list:
+        '''Returns the indexed tokens a query term matches, with their score multipliers.'''
+
+        list_expansions = [(term, 1.0)] if term in self._dict_postings else []
+        if not self.prefix:
+            return list_expansions
+
+        max_expansions = self.max_prefix_expansions
+        n_expansions = 0
+
+        index = bisect_left(self._list_tokens, term)
+        n_tokens = len(self._list_tokens)
+        while index < n_tokens and (max_expansions is None or n_expansions < max_expansions):
+            token = self._list_tokens[index]
+            if not token.startswith(term):
+                break
+            if token != term:
+                list_expansions.append((token, _PREFIX_PENALTY))
+                n_expansions += 1
+            index += 1
+
+        return list_expansions
+
+    def __contains__(self, key) -> bool:
+        return key in self._dict_doc_ids
+
+    def __len__(self) -> int:
+        return len(self._dict_doc_ids)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({len(self)} records, {len(self._dict_postings)} tokens)'
+
+    def _key(self, record):
+        raise NotImplementedError
@@ -0,0 +1,92 @@
+'''SQLite storage shared by the scrapers.
+
+`SqliteStore` owns one connection for its lifetime, so the statements a
+store repeats on every run are compiled once and served from the
+connection's statement cache. Subclasses declare their schema and write rows
+in batched transactions with `executemany` upserts.
+'''
+
+from datetime import datetime, timezone
+from itertools import islice
+import sqlite3
+
+_STATEMENT_CACHE_SIZE = 256
+
+_DEFAULT_BATCH_SIZE = 500
+
+_SQL_RUNS = '''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    scraped_at TEXT NOT NULL
+);
+'''
+
+_SQL_INSERT_RUN = 'INSERT INTO runs (scraped_at) VALUES (?)'
+
+
+def batches(iterable, size: int = _DEFAULT_BATCH_SIZE):
+    '''Yields lists of up to `size` items.'''
+
+    iterator = iter(iterable)
+    while True:
+        list_batch = list(islice(iterator, size))
+        if not list_batch:
+            return
+        yield list_batch
+
+
+class SqliteStore(object):
+    '''Base class of the scrapers' SQLite stores.
+
+    Every save is recorded as a run, so rows can be traced to the scrapes
+    that saw them.
+
+    Attributes:
+        path: Database file, or ':memory:'.
+        batch_size: Rows written per transaction.
+    '''
+
+    _SCHEMA = ''
+
+    def __init__(self, path, batch_size: int = _DEFAULT_BATCH_SIZE) -> None:
+        self.path = path
+        self.batch_size = batch_size
+
+        self._connection = sqlite3.connect(path, cached_statements=_STATEMENT_CACHE_SIZE)
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        if path != ':memory:':
+            self._connection.execute('PRAGMA journal_mode = WAL')
+            self._connection.execute('PRAGMA synchronous = NORMAL')
+        self._connection.executescript(_SQL_RUNS + self._SCHEMA)
+
+    def query(self, sql, parameters=()) -> list:
+        '''Runs a read query.
+
+        Args:
+            sql [str]: SQL statement.
+            parameters [tuple]: Statement parameters.
+
+        Returns:
+            list_rows [list]: A list of `sqlite3.Row`.
+        '''
+
+        cursor = self._connection.cursor()
+        cursor.row_factory = sqlite3.Row
+        return cursor.execute(sql, parameters).fetchall()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> 'SqliteStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _start_run(self, scraped_at=None) -> int:
+        if scraped_at is None:
+            scraped_at = datetime.now(timezone.utc)
+
+        with self._connection:
+            cursor = self._connection.execute(_SQL_INSERT_RUN, (scraped_at.isoformat(),))
+        return cursor.lastrowid
@@ -0,0 +1,258 @@
+'''Incremental HTML table parsing with bounded memory.
+
+`TableRowParser` is fed a page in chunks and emits each row of one table as
+soon as the row closes, then forgets it. No document tree is built, so
+memory holds one row at a time however long the table is, and rows can be
+read while the rest of the page is still downloading:
+
+    for row in iter_table_rows(ResponseChunks(response), table_index=2):
+        row.cells  # Visible text of each cell
+
+`ResponseChunks` turns a `requests` response sent with `stream=True` into
+text chunks and counts the bytes read.
+'''
+
+import codecs
+from html.parser import HTMLParser
+import re
+
+_CHUNK_SIZE = 64 * 1024
+
+_RE_WHITESPACE = re.compile(r'\s+')
+
+
+def _render(list_chunks) -> str:
+    '''Renders collapsed text chunks the way WebDriver's `.text` does: lines are stripped.'''
+
+    return '\n'.join(line.strip() for line in ''.join(list_chunks).split('\n')).strip()
+
+
+class StreamedRow(object):
+    '''Stores one table row read by `TableRowParser`.
+
+    Attributes:
+        attrs: (name, value) attributes of the `tr` element.
+        cells: Visible text of each `td`, whitespace collapsed and `<br>` as a line break.
+        strings: Text nodes of each `td`, as in the page.
+        links: (visible text, href) of each link in the row, in order.
+    '''
+
+    __slots__ = ('attrs', 'cells', 'strings', 'links')
+
+    def __init__(self, attrs) -> None:
+        self.attrs = attrs
+        self.cells = []
+        self.strings = []
+        self.links = []
+
+    def __repr__(self) -> str:
+        return f'StreamedRow({self.cells!r})'
+
+
+class TableRowParser(HTMLParser):
+    '''Emits the rows of one table of a page fed in chunks.
+
+    Tables are counted in document order, nested ones included, like
+    `find_all('table')`. Rows of tables nested in the target table belong to
+    the cell holding them. End tags HTML lets pages omit (`</td>`, `</tr>`)
+    are implied by the next cell, row or the table's end.
+
+    Attributes:
+        table_index: Index of the table whose rows are emitted.
+    '''
+
+    def __init__(self, table_index: int = 0) -> None:
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.table_index = table_index
+
+        self._n_tables = 0
+        self._depth = 0  # Tables open
+        self._target_depth = None  # Depth of the target table while it is open
+        self._done = False
+
+        self._list_rows = []  # Rows closed since the last `pop_rows`
+        self._row = None
+        self._cell_chunks = None
+        self._cell_strings = None
+        self._list_links = []  # Open links as [href, chunks]
+        self._list_text = []  # Text since the last tag
+
+    @property
+    def done(self) -> bool:
+        '''Whether the target table has ended.'''
+
+        return self._done
+
+    def pop_rows(self) -> list:
+        '''Returns the rows closed so far and forgets them.'''
+
+        list_rows, self._list_rows = self._list_rows, []
+        return list_rows
+
+    def close(self) -> None:
+        HTMLParser.close(self)
+        self._flush_text()
+        self._close_row()
+
+    def handle_starttag(self, tag, attrs) -> None:
+        self._flush_text()
+
+        if tag == 'table':
+            if self._n_tables == self.table_index and not self._done:
+                self._target_depth = self._depth + 1
+            self._n_tables += 1
+            self._depth += 1
+        elif tag == 'br':
+            self._line_break()
+        elif tag == 'a':
+            if self._row is not None:
+                self._list_links.append([dict(attrs).get('href'), []])
+        elif self._depth == self._target_depth:
+            if tag == 'tr':
+                self._close_row()
+                self._row = StreamedRow(attrs)
+            elif tag == 'td' and self._row is not None:
+                self._close_cell()
+                self._cell_chunks = []
+                self._cell_strings = []
+
+    def handle_startendtag(self, tag, attrs) -> None:
+        if tag == 'br':
+            self._flush_text()
+            self._line_break()
+        else:
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag) -> None:
+        self._flush_text()
+
+        if tag == 'table':
+            if self._depth == self._target_depth:
+                self._close_row()
+                self._target_depth = None
+                self._done = True
+            self._depth = max(0, self._depth - 1)
+        elif tag == 'a':
+            if self._list_links:
+                href, list_chunks = self._list_links.pop()
+                self._row.links.append((_render(list_chunks), href))
+        elif self._depth == self._target_depth:
+            if tag == 'tr':
+                self._close_row()
+            elif tag == 'td':
+                self._close_cell()
+
+    def handle_data(self, data) -> None:
+        if self._row is not None:
+            self._list_text.append(data)
+
+    def _flush_text(self) -> None:
+        if not self._list_text:
+            return
+
+        string = ''.join(self._list_text)
+        self._list_text = []
+
+        collapsed = _RE_WHITESPACE.sub(' ', string)
+        if self._cell_chunks is not None:
+            self._cell_chunks.append(collapsed)
+            self._cell_strings.append(string)
+        for _, list_chunks in self._list_links:
+            list_chunks.append(collapsed)
+
+    def _line_break(self) -> None:
+        if self._cell_chunks is not None:
+            self._cell_chunks.append('\n')
+        for _, list_chunks in self._list_links:
+            list_chunks.append('\n')
+
+    def _close_cell(self) -> None:
+        if self._cell_chunks is None:
+            return
+
+        self._row.cells.append(_render(self._cell_chunks))
+        self._row.strings.append(self._cell_strings)
+        self._cell_chunks = None
+        self._cell_strings = None
+
+    def _close_row(self) -> None:
+        if self._row is None:
+            return
+
+        self._close_cell()
+        while self._list_links:
+            href, list_chunks = self._list_links.pop(0)
+            self._row.links.append((_render(list_chunks), href))
+
+        self._list_rows.append(self._row)
+        self._row = None
+
+
+def iter_table_rows(chunks, table_index: int = 0):
+    '''Yields the rows of one table of a page as the page's chunks arrive.
+
+    Stops reading chunks once the table ends.
+
+    Args:
+        chunks [iterable]: Text chunks of the page, e.g. `ResponseChunks`, or the whole page as one string.
+        table_index [int]: Index of the table in document order.
+
+    Yields:
+        row [StreamedRow]: Row, as soon as it closes.
+    '''
+
+    if isinstance(chunks, str):
+        chunks = iter_text_chunks(chunks)
+
+    parser = TableRowParser(table_index=table_index)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_rows()
+        if parser.done:
+            return
+
+    parser.close()
+    yield from parser.pop_rows()
+
+
+def iter_text_chunks(text, chunk_size: int = _CHUNK_SIZE):
+    '''Yields a string in chunks of `chunk_size` characters.'''
+
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size]
+
+
+class ResponseChunks(object):
+    '''Iterates the body of a streamed `requests` response as text chunks.
+
+    The body is decoded incrementally with the response's encoding (UTF-8 if
+    it has none) and the response is closed once the body has been read or
+    the iteration stops early.
+
+    Attributes:
+        n_bytes: Bytes of the body read so far.
+    '''
+
+    def __init__(self, response, chunk_size: int = _CHUNK_SIZE) -> None:
+        self.n_bytes = 0
+
+        self._response = response
+        self._chunk_size = chunk_size
+
+    def __iter__(self):
+        decoder = codecs.getincrementaldecoder(self._response.encoding or 'utf-8')(errors='replace')
+
+        try:
+            for chunk in self._response.iter_content(chunk_size=self._chunk_size):
+                self.n_bytes += len(chunk)
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+
+            text = decoder.decode(b'', final=True)
+            if text:
+                yield text
+        finally:
+            self._response.close()
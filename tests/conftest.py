@@ -0,0 +1,65 @@
+from datetime import date
+
+import pytest
+
+from depauw_courses.codes import parse_priority, parse_restrictions
+from depauw_courses.main import Course, Lab
+from depauw_courses.schedule import parse_schedule
+from github_jobs.main import GitHubJob
+
+
+def _course(soc_number, department, course, schedule, restrictions='', priorities=(), lab=None) -> Course:
+    dict_restrictions = parse_restrictions(restrictions).resolve({'3': 'Majors only', '4': 'Meets in the lab'})
+    dict_priorities = dict(parse_priority(priority) for priority in priorities)
+
+    course = Course(soc_number=soc_number,
+                    department=department,
+                    course=course,
+                    description=f'{department} {course} Seminar',
+                    credit='1.00',
+                    method='S',
+                    schedule=parse_schedule(schedule),
+                    area='SS',
+                    competency=None,
+                    interdisciplinary_program=None,
+                    pass_fail='N',
+                    enrolled='12',
+                    capacity='20',
+                    instructor='Smith, J',
+                    room='JULIAN 150',
+                    restrictions=dict_restrictions,
+                    priorities=dict_priorities,
+                    book_link=f'https://my.depauw.edu/e/reg/books/?soc={soc_number}')
+    course.lab = lab
+    return course
+
+
+@pytest.fixture
+def courses() -> list:
+    return [
+        _course(1003, 'CSC', '121', '10:00-11:00 MWF', restrictions='+ 3', priorities=('1=FR,SO MAJ;JR NEEDS MAJ',)),
+        _course(1010, 'CHEM', '120', '8:20-9:50 TR', restrictions='@ 3,4', priorities=('0=SR',),
+                lab=Lab(course='CHEM 120L', description='Laboratory', schedule=parse_schedule('1:40-4:30 PM W'),
+                        room='ASB 223')),
+        _course(1015, 'MUS', '101', '2:20-3:20 PM MW'),
+    ]
+
+
+@pytest.fixture
+def jobs() -> list:
+    return [
+        GitHubJob(position='Python Developer',
+                  description_link='https://jobs.github.com/positions/1',
+                  company_name='Acme',
+                  company_url='https://acme.example',
+                  job_type='Full Time',
+                  location='Berlin, Germany',
+                  published=date(2020, 8, 1)),
+        GitHubJob(position='Data Engineer, "Platform"',
+                  description_link='https://jobs.github.com/positions/2',
+                  company_name='Zürich AG',
+                  company_url='https://zurich.example',
+                  job_type='Contract',
+                  location='Zürich',
+                  published=None),
+    ]
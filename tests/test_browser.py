@@ -0,0 +1,50 @@
+import gc
+
+import pytest
+
+from depauw_courses import browser
+from depauw_courses.browser import BrowserSession
+
+
+class _Driver(object):
+    service = None
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def session(monkeypatch, courses):
+    def _iter_courses(mode, driver, **kwargs):
+        yield from courses
+
+    monkeypatch.setattr(browser, '_new_driver', lambda headless: _Driver())
+    monkeypatch.setattr(browser, 'iter_courses', _iter_courses)
+    return BrowserSession()
+
+
+def test_iter_courses_checks_at_call(session):
+    with pytest.raises(ValueError):
+        session.iter_courses(mode='requests')
+
+    scrape = session.iter_courses()
+    with pytest.raises(RuntimeError):
+        session.iter_courses()
+    assert len(list(scrape)) == 3
+    assert len(session.scrape()) == 3
+
+
+def test_unstarted_scrape_releases_session(session):
+    session.iter_courses()
+    gc.collect()
+
+    scrape = session.iter_courses()
+    scrape.close()
+    assert list(scrape) == []
+    assert len(session.scrape()) == 3
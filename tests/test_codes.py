@@ -0,0 +1,25 @@
+import pytest
+
+from depauw_courses.codes import parse_priorities, parse_restrictions, parse_targets
+
+
+def test_parse_targets_clauses():
+    assert dict(parse_targets('FR,SO MAJ;JR NEEDS MAJ')) == {'FR': ('MAJ',), 'SO': ('MAJ',), 'JR': ('MAJ',)}
+    assert dict(parse_targets('SR')) == {'SR': ('ALL',)}
+    assert dict(parse_targets('MAJ JR')) == {'JR': ('MAJ',)}
+    assert dict(parse_targets('SR MAJ MIN')) == {'SR': (('MAJ', 'MIN'),)}
+
+
+def test_repeated_year_keeps_last_clause():
+    assert dict(parse_targets('JR MAJ;JR NEEDS MIN')) == {'JR': ('MIN',)}
+    assert dict(parse_targets('FR,JR MAJ;JR MIN')) == {'FR': ('MAJ',), 'JR': ('MIN',)}
+
+
+def test_parse_results_are_shared():
+    assert parse_priorities('1=FR,SO MAJ/2=SR') is parse_priorities('1=FR,SO MAJ/2=SR')
+    assert parse_restrictions('+ @ 3,4').needs_notes
+
+
+def test_unknown_year_is_rejected():
+    with pytest.raises(KeyError):
+        parse_targets('XX NEEDS MAJ')
@@ -0,0 +1,37 @@
+import copy
+
+from depauw_courses.crawl import merge_courses
+
+
+def _in_selection(courses, **selection) -> list:
+    list_courses = [copy.copy(course) for course in courses]
+    for course in list_courses:
+        course.selection = selection
+    return list_courses
+
+
+def test_merge_keeps_sections_of_other_terms(courses):
+    list_course_lists = [_in_selection(courses, term='202110'), _in_selection(courses, term='202120')]
+
+    list_courses = merge_courses(list_course_lists)
+
+    assert len(list_courses) == 2 * len(courses)
+    assert [course.selection['term'] for course in list_courses] == ['202110'] * 3 + ['202120'] * 3
+
+
+def test_merge_dedupes_cross_listed_sections_of_a_term(courses):
+    list_course_lists = [_in_selection(courses, term='202120', dept='CSC'),
+                         _in_selection(courses[:2], term='202120', dept='MATH')]
+
+    list_courses = merge_courses(list_course_lists)
+
+    assert [course._soc_number for course in list_courses] == [1003, 1010, 1015]
+    assert {course.selection['dept'] for course in list_courses} == {'CSC'}
+    assert len(merge_courses(list_course_lists, dedupe=False)) == 5
+
+
+def test_selection_survives_export(courses):
+    course = _in_selection(courses, term='202120')[0]
+
+    assert course.to_dict()['selection'] == {'term': '202120'}
+    assert type(course).from_dict(course.to_dict()).selection == {'term': '202120'}
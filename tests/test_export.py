@@ -0,0 +1,87 @@
+import io
+import json
+
+from depauw_courses.main import Course
+from github_jobs.main import GitHubJob
+from scrape.export import CsvWriter, NdjsonWriter, iter_csv, iter_ndjson, write_csv, write_ndjson
+
+
+def test_course_to_dict_is_plain(courses):
+    dict_course = courses[0].to_dict()
+
+    assert type(dict_course['priorities']['1']) is dict
+    assert dict_course['priorities'] == {'1': {'FR': ('MAJ',), 'SO': ('MAJ',), 'JR': ('MAJ',)}}
+    assert type(dict_course['restrictions']) is dict
+    assert json.loads(json.dumps(dict_course, default=str))['priorities']['1']['JR'] == ['MAJ']
+
+
+def test_ndjson_round_trip(tmp_path, courses):
+    path = tmp_path / 'courses.ndjson'
+
+    assert write_ndjson(courses, str(path)) == len(courses)
+
+    list_rows = list(iter_ndjson(str(path)))
+    assert [row['soc_number'] for row in list_rows] == [1003, 1010, 1015]
+    assert list_rows[1]['lab']['schedule'] == {'Wednesday': [{'start': '13:40:00', 'end': '16:30:00'}]}
+
+    list_courses = list(iter_ndjson(str(path), from_dict=Course.from_dict))
+    assert [course.to_dict() for course in list_courses] == [course.to_dict() for course in courses]
+
+
+def test_csv_round_trip(tmp_path, courses):
+    path = tmp_path / 'courses.csv'
+
+    assert write_csv(courses, str(path)) == len(courses)
+
+    # CSV keeps no types: plain cells come back as strings, nested fields decoded
+    list_rows = list(iter_csv(str(path)))
+    assert list_rows[0]['soc_number'] == '1003'
+    assert list_rows[0]['competency'] is None
+    assert list_rows[0]['restrictions'] == {'+': 'Not offered pass/fail', '3': 'Majors only'}
+
+    list_courses = list(iter_csv(str(path), from_dict=Course.from_dict))
+    assert [course.to_dict() for course in list_courses] == [course.to_dict() for course in courses]
+    assert list_courses[0]._soc_number == 1003
+    assert list_courses[0]._restrictions == {'+': 'Not offered pass/fail', 3: 'Majors only'}
+
+
+def test_csv_keeps_text_cells(courses):
+    courses[0]._description = '[Cross-listed] {CSC 121}'
+    courses[1]._description = ''
+    courses[2]._description = '"Quoted" title'
+    f = io.StringIO()
+    write_csv(courses, f)
+    f.seek(0)
+
+    list_rows = list(iter_csv(f))
+    assert [row['description'] for row in list_rows] == ['[Cross-listed] {CSC 121}', '', '"Quoted" title']
+    assert [row['competency'] for row in list_rows] == [None] * 3
+    assert list_rows[2]['lab'] is None
+
+
+def test_jobs_round_trip(jobs):
+    for writer, reader in ((write_ndjson, iter_ndjson), (write_csv, iter_csv)):
+        f = io.StringIO()
+        writer(jobs, f)
+        f.seek(0)
+
+        list_jobs = list(reader(f, from_dict=GitHubJob.from_dict))
+        assert [job.to_dict() for job in list_jobs] == [job.to_dict() for job in jobs]
+
+
+def test_writers_flush_and_keep_open_files(jobs):
+    f = io.StringIO()
+    with CsvWriter(f, fieldnames=['position', 'published'], flush_every=1) as writer:
+        writer.write_all(jobs)
+        writer.write({'position': 'Manual', 'published': None})
+
+    assert not f.closed
+    assert f.getvalue().splitlines() == ['position,published',
+                                         'Python Developer,2020-08-01',
+                                         '"Data Engineer, ""Platform""",',
+                                         'Manual,']
+
+    f = io.StringIO()
+    with NdjsonWriter(f, flush_every=0) as writer:
+        assert writer.write_all(jobs) == 2
+    assert [json.loads(line)['location'] for line in f.getvalue().splitlines()] == ['Berlin, Germany', 'Zürich']
@@ -0,0 +1,59 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from github_jobs import fetcher
+from github_jobs.fetcher import JobQuery, fetch_jobs
+from github_jobs.pipeline import iter_jobs
+
+_ROW = '''<tr class="job">
+  <td class="title"><h4><a href="/positions/{n}">Developer {n}</a></h4>
+    <p class="source"><a class="company" href="https://company{n}.example">Company {n}</a> &ndash;
+      <strong class="fulltime">Full Time</strong></p></td>
+  <td class="meta"><span class="location">Berlin</span><span class="when relatize">1 days ago</span></td>
+</tr>'''
+
+
+@pytest.fixture
+def repeating_server(monkeypatch):
+    '''Serves the same full page whatever `page` is asked for, as a server clamping `page` would.'''
+
+    list_pages = []
+    body = ('<table>' + ''.join(_ROW.format(n=n) for n in range(fetcher._PAGE_SIZE)) + '</table>').encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            list_pages.append(int(parse_qs(urlsplit(self.path).query).get('page', ['0'])[0]))
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(fetcher, '_POSITIONS_URL', f'http://127.0.0.1:{server.server_port}/positions')
+    yield list_pages
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_stops_when_a_page_repeats(repeating_server):
+    list_jobs = fetch_jobs([JobQuery('Python')], max_pages_in_flight=2, max_pages=20)
+
+    assert len(list_jobs) == fetcher._PAGE_SIZE
+    assert len({job._desc_link for job in list_jobs}) == fetcher._PAGE_SIZE
+    assert max(repeating_server) < 4
+
+
+def test_pipeline_stops_when_a_page_repeats(repeating_server):
+    list_jobs = list(iter_jobs([JobQuery('Python')], max_pages_in_flight=2, max_pages=20, max_processes=0))
+
+    assert len(list_jobs) == fetcher._PAGE_SIZE
+    assert len({job._desc_link for job in list_jobs}) == fetcher._PAGE_SIZE
+    # Pages queued between the stages are fetched before the stop reaches the source
+    assert max(repeating_server) < 10
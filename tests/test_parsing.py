@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+from scrape.parsing import LazyStrainer, available_backends, parse_html
+
+
+def test_importing_the_scrapers_loads_no_parser():
+    code = ('import sys, depauw_courses.main, github_jobs.main; '
+            'print(sorted(m for m in sys.modules if m.split(".")[0] in ("bs4", "lxml")))')
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.check_output([sys.executable, '-c', code], cwd=root, text=True).strip() == '[]'
+
+
+def test_lazy_strainer_builds_only_matching_elements():
+    html = '<table><tr class="job"><td>a</td></tr><tr><td>b</td></tr></table>'
+
+    for backend in available_backends():
+        bs = parse_html(html, parse_only=LazyStrainer('tr', class_='job'), backend=backend)
+        assert [tr.get_text() for tr in bs.find_all('tr')] == ['a']
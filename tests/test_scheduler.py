@@ -0,0 +1,51 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+
+from scrape.scheduler import FetchScheduler
+
+
+@pytest.fixture
+def unavailable_url():
+    '''Answers every request with a 503 and counts the requests by method.'''
+
+    dict_requests = {'GET': 0, 'POST': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _unavailable(self):
+            dict_requests[self.command] += 1
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        do_GET = do_POST = _unavailable
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/', dict_requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_post_is_not_retried_by_default(unavailable_url):
+    url, dict_requests = unavailable_url
+
+    with FetchScheduler(retries=2, backoff=0) as scheduler:
+        assert scheduler.get(url).status_code == 503
+        assert scheduler.post(url, data={'q': 'x'}).status_code == 503
+
+    assert dict_requests == {'GET': 3, 'POST': 1}
+
+
+def test_post_retries_are_opt_in(unavailable_url):
+    url, dict_requests = unavailable_url
+
+    with FetchScheduler(retries=2, backoff=0, retry_methods=('get', 'post')) as scheduler:
+        scheduler.post(url, data={'q': 'x'})
+
+    assert dict_requests['POST'] == 3
@@ -0,0 +1,40 @@
+import pytest
+
+from depauw_courses.table import CourseTable
+
+
+def test_snapshot_round_trip(tmp_path, courses):
+    path = str(tmp_path / 'term.dpct')
+
+    CourseTable.from_courses(courses).save(path)
+    table = CourseTable.load(path)
+
+    assert len(table) == len(courses)
+    assert [course.to_dict() for course in table] == [course.to_dict() for course in courses]
+    assert table[-1]._soc_number == 1015
+    assert table.schedule_of(1).intervals == courses[1]._schedule.intervals
+
+
+def test_snapshot_replaces_atomically(tmp_path, courses):
+    path = str(tmp_path / 'term.dpct')
+
+    CourseTable.from_courses(courses).save(path)
+    CourseTable.from_courses(courses[:1]).save(path)
+
+    assert len(CourseTable.load(path)) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ['term.dpct']
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'courses.csv'
+    path.write_bytes(b'soc_number,department\n1003,CSC\n' * 4)
+
+    with pytest.raises(ValueError):
+        CourseTable.load(str(path))
+
+
+def test_index_out_of_range(courses):
+    table = CourseTable.from_courses(courses)
+
+    with pytest.raises(IndexError):
+        table[len(courses)]